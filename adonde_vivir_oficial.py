@@ -1,22 +1,31 @@
-
 ## Proyecto a Donde Vivir
 ## ==========================
 
 ## Liberias
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
+import copy
 from pathlib import Path
-from streamlit_folium import st_folium
-import folium
-from folium.plugins import MarkerCluster, MiniMap, Fullscreen, MeasureControl, LocateControl
-from urllib.parse import quote
-import plotly.express as px
+
+# Las librerías de visualización (folium y sus plugins, streamlit-folium, plotly) no se importan
+# aquí: se importan dentro de la función que las usa la primera vez que se dibuja un mapa o un
+# gráfico, así el encabezado se muestra sin esperarlas. Ver `benchmarks/bench_arranque.py`.
+from conjuntos import CONJUNTO_POR_DEFECTO, cargar_conjunto, leer_registro, peso_conjunto, version_conjunto
+from indices import pagina, subconjunto
+from estadisticas import COLUMNAS_CUBO, kpis_precios, resumen_distritos
+from espacial import cercanos, distancia_m, en_rectangulo
+from comparables import comparables, precio_vs_comparables
+from busqueda import buscar
+from reportes import ARCHIVO_MANIFIESTO, DIRECTORIO_REPORTES, leer_manifiesto, mapa_precalculado, version_reportes
+from cache_artefactos import CacheArtefactos, clave_artefacto, peso_estimado
+from filtros import atipicos_box, columna_precio, datos_scatter, excluir_atipicos, filtrar_tabla
+from instrumentacion import activa as instrumentacion_activa, ejecucion, etapa, instrumentado
 
 
 st.set_page_config(layout="wide")
 ## Titulo
-st.set_page_config(layout="wide")
 st.title("Análisis Inmobiliario 🏡📊")
 
 """
@@ -42,73 +51,150 @@ La aplicación te permite:
 ## Lecturas de data  ##
 ## ==================##
 
-@st.cache_data # Decorador mágico de Streamlit
-def load_data(path):
-    """
-    Carga los datos desde un archivo CSV.
-    Gracias a @st.cache_data, esta función solo se ejecutará una vez
-    y el resultado (el DataFrame) se guardará en memoria caché.
-    Las siguientes veces que se necesiten los datos, se leerán directamente
-    de la caché, haciendo la app mucho más rápida.
-    """
-    df = pd.read_csv(path, sep="|", encoding="utf-8")
-    
-    # --- MEJORA: Deduplicación de Anuncios ---
-    # Identificamos y eliminamos anuncios duplicados que aparecen en múltiples fuentes (ej. Urbania y Adondevivir). 
-    # Un anuncio se considera único por la combinación de su dirección, área, precios y tipo de operación.
-    # Mantenemos la primera aparición ('first') que encuentre pandas.
-    subset_cols = ['distrito_oficial', 'direccion']
-    
-    # Eliminamos los duplicados basándonos en las columnas clave.
-    # `inplace=True` modifica el DataFrame directamente.
-    df.drop_duplicates(subset=subset_cols, keep='first', inplace=True)
-
-    # --- MEJORA: Creación de Categoría de Distrito ---
-    # Se crea una nueva columna 'distrito_categoria' para segmentar los distritos en zonas de Lima.
-    zonas_lima = {
-        'Lima Top': ['Miraflores', 'San Isidro', 'La Molina', 'Santiago de Surco', 'San Borja', 'Barranco'],
-        'Lima Moderna': ['Jesús María', 'Lince', 'Magdalena', 'San Miguel', 'Pueblo Libre', 'Surquillo'],
-        'Lima Centro': ['Lima Cercado', 'Breña', 'La Victoria', 'Rímac', 'San Luis'],
-        'Lima Este': ['Ate Vitarte', 'Cieneguilla', 'Chaclacayo', 'Chosica Lurigancho', 'Santa Anita', 'El Agustino', 'San Juan de Lurigancho'],
-        'Lima Norte': ['Carabayllo', 'Comas', 'Independencia', 'Los Olivos', 'Puente Piedra', 'San Martín de Porres', 'Ancón', 'Santa Rosa'],
-        'Lima Sur': ['Chorrillos', 'Lurín', 'Pachacámac', 'San Juan de Miraflores', 'Villa El Salvador', 'Villa María del Triunfo', 'Pucusana', 'Punta Hermosa', 'Punta Negra', 'San Bartolo', 'Santa María del Mar']
-    }
+# Tope de memoria para los conjuntos de datos cargados (compartido por todas las sesiones)
+# y peso máximo de un conjunto para entrar en esa caché compartida.
+MAX_BYTES_CONJUNTOS = 2 * 1024**3
+MAX_BYTES_CONJUNTO = 768 * 1024**2
 
-    # Se crea un mapeo inverso (distrito -> zona) para una asignación eficiente.
-    distrito_a_zona = {distrito: zona for zona, distritos_en_zona in zonas_lima.items() for distrito in distritos_en_zona}
-    # Se aplica el mapeo para crear la nueva columna.
-    df['distrito_categoria'] = df['distrito_oficial'].map(distrito_a_zona).fillna('Otra Zona')
-    df['distrito_categoria'] = df['distrito_categoria'].astype('category')
+# Tope de un conjunto más pesado que `MAX_BYTES_CONJUNTO`: se mantiene cargado uno solo a la vez.
+MAX_BYTES_CONJUNTO_GRANDE = 8 * 1024**3
 
-    # Se crean columnas categóricas para los rangos de precio y área, que se usarán en los filtros de las pestañas.
-    df['precio_pen'] = pd.to_numeric(df['precio_pen'], errors='coerce')
-    df['precio_usd'] = pd.to_numeric(df['precio_usd'], errors='coerce')
-    df['area'] = pd.to_numeric(df['area'], errors='coerce')
+@st.cache_resource
+def dataset_registry():
+    """Conjuntos de datos disponibles (ciudades, snapshots históricos), ver `conjuntos.py`."""
+    return leer_registro()
 
-    # Bins y labels para precio de alquiler (Soles)
-    bins_alquiler = [-1, 1000, 2500, 5000, 10000, float('inf')]
-    labels_alquiler = ["Hasta S/ 1000", "De S/ 1000 a S/ 2500", "De S/ 2500 a S/ 5000", "De S/ 5000 a S/ 10000", "De S/ 10000 a más"]
-    df['precio_alquiler_agp'] = pd.cut(df['precio_pen'], bins=bins_alquiler, labels=labels_alquiler, right=False)
+@st.cache_resource(max_entries=8)
+def prerendered_reports(id_conjunto, fecha_manifiesto):
+    """
+    Manifiesto de los reportes precalculados del conjunto (ver `reportes.py`), o {} si no hay.
+    La fecha de modificación del manifiesto es parte de la llave: una nueva corrida se lee sola.
+    """
+    return leer_manifiesto(id_conjunto)
+
+def prerendered_map(operation: str, inmueble: str, distrito: str):
+    """HTML del mapa precalculado de (operation, inmueble, distrito) si se generó con la data actual; si no, None."""
+    ruta_manifiesto = Path(DIRECTORIO_REPORTES) / id_conjunto / ARCHIVO_MANIFIESTO
+    if not ruta_manifiesto.exists():
+        return None
+    manifiesto = prerendered_reports(id_conjunto, ruta_manifiesto.stat().st_mtime_ns)
+    ruta = mapa_precalculado(manifiesto, version_reportes(registro_conjuntos[id_conjunto]), operation, inmueble, distrito)
+    if ruta is None or not ruta.exists():
+        return None
+    return cache_artefactos.obtener(
+        clave_artefacto("mapa_html", version_data, operation, inmueble, distrito),
+        lambda: ruta.read_text(encoding="utf-8"),
+        peso=ruta.stat().st_size,
+    )
 
-    # Bins y labels para precio de venta (Dólares)
-    bins_venta = [-1, 50000, 100000, 200000, 500000, float('inf')]
-    labels_venta = ["Hasta $ 50k", "De $ 50k a $ 100k", "De $ 100k a $ 200k", "De $ 200k a $ 500k", "De $ 500k a más"]
-    df['precio_venta_agp'] = pd.cut(df['precio_usd'], bins=bins_venta, labels=labels_venta, right=False)
+@st.cache_resource
+def dataset_cache():
+    """
+    Caché LRU de conjuntos de datos ya cargados (data, índices y cubo de precios), compartida entre
+    sesiones y acotada por el total de bytes, no por la cantidad de conjuntos.
+    """
+    return CacheArtefactos(max_bytes=MAX_BYTES_CONJUNTOS, max_bytes_entrada=MAX_BYTES_CONJUNTO)
 
-    # Bins y labels para área (m²)
-    bins_area = [-1, 50, 100, 200, 300, float('inf')]
-    labels_area = ["Hasta 50m2", "De 50m2 a 100m2", "De 100m2 a 200m2", "De 200m2 a 300m2", "De 300m2 a más"]
-    df['area_agp'] = pd.cut(df['area'], bins=bins_area, labels=labels_area, right=False)
-    
-    ## Estacionamiento
-    df["estacionamiento_gp"] = df["estacionamientos"].apply(lambda x: "Si" if x > 0 else "No")
-    
-    
+@st.cache_resource
+def large_dataset_cache():
+    """
+    Caché del único conjunto más pesado que `MAX_BYTES_CONJUNTO` que se mantiene cargado, compartida entre
+    sesiones: abrir otro conjunto grande desaloja al anterior en vez de sumar una copia por sesión.
+    """
+    return CacheArtefactos(max_bytes=MAX_BYTES_CONJUNTO_GRANDE, max_entradas=1)
 
-    return df
+def load_dataset(id_conjunto):
+    """
+    Carga el conjunto `id_conjunto` la primera vez que se pide y luego lo sirve desde la caché compartida.
+    La data viene del almacén incremental, el snapshot columnar (.feather) o, si no existe, del CSV
+    (ver `datos.cargar_datos`); la versión del archivo es parte de la llave, así que tras una ingesta
+    nueva el conjunto se vuelve a leer aunque la ruta sea la misma.
+
+    Un conjunto más pesado que `MAX_BYTES_CONJUNTO` (p. ej. un snapshot histórico grande) no entra en la
+    caché compartida, para no desalojar la data de las demás sesiones: va a `large_dataset_cache`, que
+    guarda uno solo.
+    """
+    conjunto = dataset_registry()[id_conjunto]
+    clave = clave_artefacto("conjunto", version_conjunto(id_conjunto, conjunto))
+    construir = lambda: cargar_conjunto(id_conjunto, conjunto)
+    grande = large_dataset_cache()
+    if clave in grande:
+        return grande.obtener(clave, construir, peso=peso_conjunto)
+
+    cache = dataset_cache()
+    cargado = cache.obtener(clave, construir, peso=peso_conjunto)
+    if clave not in cache:
+        grande.obtener(clave, lambda: cargado, peso=peso_conjunto)
+    return cargado
+
+# Columnas de `data` que usan las pestañas sobre sus subconjuntos (filtros, KPIs, gráficos y conteos);
+# la tabla de detalle, el mapa y los comparables toman lo demás de `data` por posición.
+COLUMNAS_PESTANAS = [
+    "distrito_oficial", "direccion", "precio_pen", "precio_usd", "area", "dormitorio", "precio_m2", "atipico",
+    "precio_alquiler_agp", "precio_venta_agp", "area_agp", "estacionamiento_gp", "status", "geo_valido", "lat", "lon",
+]
+
+# Máximo de propiedades con las que se ofrece el box plot con todos los puntos.
+MAX_PUNTOS_BOX = 5000
+
+# Distritos con más propiedades geolocalizadas que esto cargan en el mapa solo las de la vista actual.
+MAX_MARCADORES_MAPA = 2000
+
+# Zoom desde el que el mapa de precios por distrito muestra también las propiedades individuales.
+ZOOM_PROPIEDADES = 14
+
+# Filas que lista la búsqueda de propiedades cercanas a un punto.
+MAX_FILAS_CERCANOS = 200
+
+# Máximo de comparables que se pueden pedir para una propiedad.
+MAX_COMPARABLES = 50
+
+# Tope de memoria para los mapas y figuras cacheados (compartido por todas las sesiones).
+MAX_BYTES_ARTEFACTOS = 256 * 1024**2
+
+@st.cache_resource
+def artifact_cache():
+    """
+    Caché LRU de mapas y figuras ya construidos, compartida entre sesiones y acotada por memoria.
+    Así, cambiar un widget que no afecta a un gráfico no obliga a reconstruirlo.
+    """
+    return CacheArtefactos(max_bytes=MAX_BYTES_ARTEFACTOS)
+
+def guardar_registro_perf(registro):
+    """Guarda en la sesión las últimas ejecuciones medidas, para el panel de rendimiento."""
+    registros = st.session_state.setdefault("registros_perf", [])
+    registros.append(registro)
+    del registros[:-20]
+
+# Conjunto de datos (ciudad o snapshot histórico) que se está viendo.
+registro_conjuntos = dataset_registry()
+id_conjunto = st.sidebar.selectbox(
+    "Conjunto de datos", list(registro_conjuntos),
+    index=list(registro_conjuntos).index(CONJUNTO_POR_DEFECTO),
+    format_func=lambda id_: registro_conjuntos[id_]["nombre"],
+    key="conjunto",
+)
 
 # Cargamos los datos usando nuestra función cacheada
-data = load_data("./data/data_alquiler_venta.csv")
+# (cada bloque `etapa` se mide solo si la instrumentación está activa, ver `instrumentacion.py`)
+with ejecucion("carga", al_finalizar=guardar_registro_perf):
+    with etapa("load_dataset") as e:
+        conjunto = load_dataset(id_conjunto)
+        e.filas = len(conjunto["data"])
+    data = conjunto["data"]
+    version_data = conjunto["version"]
+    indice_filtros = conjunto["indice_filtros"]
+    indice_espacial = conjunto["indice_espacial"]
+    indice_comparables = conjunto["indice_comparables"]
+    indice_busqueda = conjunto["indice_busqueda"]
+    geometria_distritos = conjunto["geometria_distritos"]
+    # Proyección de `data` con las columnas que usan las pestañas: no copia (copy-on-write, pandas >= 3) y sus
+    # subconjuntos solo materializan estas columnas.
+    data_pestanas = data[[c for c in COLUMNAS_PESTANAS if c in data.columns]]
+    rangos_orden = conjunto["rangos_orden"]
+    cubo_precios = conjunto["cubo_precios"]
+    zonas_conjunto = list(conjunto["zonas"])
+    cache_artefactos = artifact_cache()
 
 ## Variables
 distritos = data["distrito_oficial"].unique()
@@ -133,60 +219,42 @@ def display_kpis(df: pd.DataFrame, operation: str, distrito: str, inmueble: str)
         symbol = "$"
         title = f"KPIs de precios en Venta ({symbol}) en {distrito}"
 
-    df_kpi = df.copy()
-    df_kpi[price_col] = pd.to_numeric(df_kpi[price_col], errors="coerce")
-    df_kpi.dropna(subset=[price_col], inplace=True)
+    # Los mismos KPIs que escribe `reportes.py` para el export estático.
+    kpis = kpis_precios(df[price_col], cubo_precios, inmueble, operation)
 
     st.subheader(title, divider="blue")
 
-    if df_kpi.empty:
+    if not kpis:
         st.info("No hay datos de precios para mostrar KPIs.")
         return
 
-    # --- MEJORA: Calcular métricas globales para comparación ---
-    df_global = data[
-        (data["inmueble"] == inmueble) &
-        (data["operacion"] == operation)
-    ].copy()
-    
-    
-    df_global[price_col] = pd.to_numeric(df_global[price_col], errors="coerce")
-    global_avg = df_global[price_col].mean()
-    global_md = df_global[price_col].median()
-
-    # --- Cálculo de métricas locales ---
-    
     fmt = lambda x: f"{symbol} {x:,.0f}"
-    
-    district_avg = df_kpi[price_col].mean()
-    delta_avg = district_avg - global_avg
 
-    district_md = df_kpi[price_col].median()
-    delta_md = district_md - global_md
-    
     c1, c2, c3 = st.columns(3)
-    with c1: st.metric(f"🚪 Total {inmueble}", len(df_kpi))
-    with c2: st.metric("📉 Mínimo", fmt(df_kpi[price_col].min()))
-    with c3: st.metric("📈 Máximo", fmt(df_kpi[price_col].max()))
+    with c1: st.metric(f"🚪 Total {inmueble}", kpis["n"])
+    with c2: st.metric("📉 Mínimo", fmt(kpis["min"]))
+    with c3: st.metric("📈 Máximo", fmt(kpis["max"]))
     
     c4, c5 = st.columns(2)
     with c4: 
         st.metric(
             label="📊 Promedio", 
-            value=fmt(district_avg), 
-            delta=f"{delta_avg:,.0f} vs. promedio general",
+            value=fmt(kpis["mean"]), 
+            delta=f"{kpis['delta_mean']:,.0f} vs. promedio general",
         )
     with c5: 
         st.metric(
             label="📊 Mediana", 
-            value=fmt(district_md), 
-            delta=f"{delta_md:,.0f} vs. mediana general",
+            value=fmt(kpis["median"]), 
+            delta=f"{kpis['delta_median']:,.0f} vs. mediana general",
         )
 
 def display_details_table(df: pd.DataFrame, operation: str):
-    """Muestra la tabla de detalles de propiedades para una operación específica."""
-    
-    df_display = df.copy()
+    """
+    Muestra la tabla de detalles de propiedades para una operación específica, paginada.
+    Solo la página visible se toma de `data` (ver `indices.pagina`); el orden sale de los rangos precalculados.
+    Devuelve la página mostrada, para el panel de comparables (`display_comparables`).
+    """
 
     # Configuración base común para ambas operaciones
     config = {
@@ -214,71 +282,295 @@ def display_details_table(df: pd.DataFrame, operation: str):
             "precio_usd": st.column_config.NumberColumn("Precio ($)", format="$ %d", disabled=True),
         })
 
-    existing_cols = [col for col in cols_to_show if col in df_display.columns]
-    
+    existing_cols = [col for col in cols_to_show if col in data.columns]
+    columnas_orden = [col for col in existing_cols if col in rangos_orden]
+
+    p1, p2, p3, p4 = st.columns(4, gap="small")
+    with p1:
+        col_orden = st.selectbox(
+            "Ordenar por", columnas_orden, index=columnas_orden.index(price_col),
+            format_func=lambda c: config[c].get("label", c),
+            key=f"orden_{operation}",
+        )
+    with p2:
+        ascendente = st.selectbox("Sentido", ["Ascendente", "Descendente"], key=f"sentido_{operation}") == "Ascendente"
+    with p3:
+        tamano = st.selectbox("Filas por página", [25, 50, 100, 250], index=1, key=f"tamano_{operation}")
+    n_paginas = max(1, -(-len(df) // tamano))
+    # Si otro filtro achicó la tabla, se vuelve a la primera página.
+    if st.session_state.get(f"pagina_{operation}", 1) > n_paginas:
+        st.session_state[f"pagina_{operation}"] = 1
+    with p4:
+        numero = st.number_input(f"Página (de {n_paginas:,})", min_value=1, max_value=n_paginas, step=1, key=f"pagina_{operation}")
+
+    # El índice de `df` son las posiciones de sus filas en `data` (ver `indices.subconjunto`).
+    df_pagina = pagina(data, df.index.to_numpy(), rangos_orden, col_orden, int(numero), tamano, ascendente=ascendente)
+    st.caption(f"{len(df):,} propiedades")
+
     st.data_editor(
-        df_display[existing_cols].sort_values(price_col, ascending=True),
+        df_pagina[existing_cols],
         hide_index=True, use_container_width=True, column_config=config, disabled=True
     )
+    return df_pagina
+
+def display_comparables(df_pagina: pd.DataFrame, operation: str):
+    """
+    Propiedades comparables a una de la página visible (misma operación e inmueble, parecidas en área,
+    dormitorios, baños, estacionamientos y ubicación), con el índice de comparables, y su precio contra el de ellas.
+    """
+    price_col = columna_precio(operation)
+    symbol = "$" if operation == "venta" else "S/"
+    fmt = lambda x: f"{symbol} {x:,.0f}"
+    with st.expander("🏘️ Propiedades comparables"):
+        if df_pagina.empty:
+            st.info("No hay propiedades en la página para comparar.")
+            return
+        c1, c2 = st.columns([3, 1], gap="small")
+        with c1:
+            etiquetas = (df_pagina["direccion"].astype(str) + " · " + df_pagina[price_col].map(fmt)).to_dict()
+            posicion = st.selectbox(
+                "Propiedad de la página", list(etiquetas), format_func=etiquetas.get, key=f"comparable_{operation}",
+            )
+        with c2:
+            k = st.slider("Comparables", 5, MAX_COMPARABLES, 10, 5, key=f"comparables_k_{operation}")
+
+        # El índice de la página son posiciones de fila en `data` (ver `indices.pagina`).
+        with etapa("comparables") as e:
+            pos, _ = comparables(indice_comparables, int(posicion), k=k)
+            e.filas = len(pos)
+        if not len(pos):
+            st.info("La propiedad no tiene área o precio para buscar comparables.")
+            return
+
+        precio, referencia, delta = precio_vs_comparables(data[price_col].to_numpy(dtype="float64"), int(posicion), pos)
+        st.metric(
+            "💲 Precio vs. comparables", fmt(precio),
+            delta=f"{delta:+.1%} vs. mediana de {len(pos)} comparables ({fmt(referencia)})",
+            delta_color="inverse",
+        )
+        filas = data.take(pos)
+        columnas = ["enlace", "distrito_oficial", "direccion", price_col, "area", "dormitorio", "baños", "estacionamientos"]
+        st.dataframe(
+            filas[columnas].assign(
+                distancia_m=np.round(distancia_m(data["lat"].iat[posicion], data["lon"].iat[posicion], filas["lat"], filas["lon"]))
+            ),
+            hide_index=True, use_container_width=True,
+            column_config={
+                "enlace": st.column_config.LinkColumn("Anuncio", display_text="🔗 Abrir"),
+                "distancia_m": st.column_config.NumberColumn("Distancia", format="%d m"),
+            },
+        )
     
-def create_map(df: pd.DataFrame):
-    """Genera y muestra un mapa de Folium con las propiedades de un DataFrame."""
-    
-    # Filtra propiedades con geolocalización válida.
-    status_validos = {'geo', 'ok', 'geocoded', 'found'}
-    
-    # .loc con una máscara booleana devuelve una copia. Se añade .copy() para ser explícitos.
-    gdf = df.loc[
-        df['status'].astype(str).str.lower().isin(status_validos) &
-        df['lat'].notna() &
-        df['lon'].notna()
-    ].copy()
+def create_map(df: pd.DataFrame, clave: tuple = None, modo: str = "lote"):
+    """
+    Genera y muestra un mapa de Folium con las propiedades de un DataFrame.
+    Por defecto usa el modo "lote" de `mapas.construir_mapa` (una sola capa con los popups
+    armados en el navegador); "marcadores" mantiene el camino de un marcador por fila.
+    Si se pasa `clave` (los filtros que definen `df`), el mapa se guarda en la caché de artefactos.
+    """
     
-    if gdf.empty:
+    # Posiciones en `data` de las propiedades con geolocalización válida (columna precalculada en
+    # `datos.preparar_datos`); las filas del mapa se materializan solo si hay que construirlo.
+    pos = df.index.to_numpy()[df["geo_valido"].to_numpy(dtype=bool)]
+
+    if not len(pos):
         st.info("No hay propiedades con geolocalización válida para graficar.")
         return
 
-    # Centro del mapa
-    center_lat, center_lon = gdf['lat'].mean(), gdf['lon'].mean()
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=15, tiles='OpenStreetMap')
-    
-    MiniMap(toggle_display=True).add_to(m)
-    Fullscreen(position='topright').add_to(m)
-
-    # Controles útiles
-    LocateControl().add_to(m)
-
-    # Cluster de marcadores
-    cluster = MarkerCluster(name="Propiedades").add_to(m)
-
-    # Construye popup/tooltip seguros
-    def safe(x): 
-        return "" if pd.isna(x) else str(x)
-
-    for _, r in gdf.iterrows():
-        gmaps_q = quote(f"{r.get('direccion', '')}, Lima, Perú")
-        popup_html = f"""
-        <b>Dirección:</b> {safe(r.get('direccion_fix') or r.get('direccion'))}<br>
-        <b>Caracteristicas:</b> {r.get('caracteristica','-')}<br>
-        <b>Precio PEN:</b> {f"S/ {r.get('precio_pen'):,.0f}" if pd.notna(r.get('precio_pen')) else '-'}<br/>
-        <b>Precio USD:</b> {f"US$ {r.get('precio_usd'):,.0f}" if pd.notna(r.get('precio_usd')) else '-'}<br/>
-        <b>Enlace:</b> <a href="{r['enlace']}" target="_blank">Abrir en {r.get('fuente','-')}</a><br>
-        <a href="https://www.google.com/maps/search/?api=1&query={gmaps_q}" target="_blank">Abrir en Google Maps</a>
-        """
-        
-        color = 'blue' if r.get('operacion') == 'alquiler' else 'green'
+    # Si `reportes.py` ya generó el mapa de este distrito con la data actual, se sirve su HTML tal cual
+    # (los distritos grandes usan siempre el mapa por vista, que envía menos marcadores).
+    if clave is not None and modo == "lote" and len(pos) <= MAX_MARCADORES_MAPA:
+        operation, distrito, inmueble_mapa = clave
+        with etapa("mapa_precalculado") as e:
+            html_mapa = prerendered_map(operation, inmueble_mapa, distrito)
+            e.filas = len(pos) if html_mapa is not None else 0
+        if html_mapa is not None:
+            components.html(html_mapa, height=600)
+            return
+
+    with etapa("importar_mapas"):
+        from mapas import COLUMNAS_MAPA, construir_mapa, peso_mapa
+
+    # Distritos con muchas propiedades: solo se envían las que caen en la vista actual del mapa.
+    if clave is not None and modo == "lote" and len(pos) > MAX_MARCADORES_MAPA:
+        create_map_ventana(pos, clave)
+        return
+
+    # Solo las columnas del mapa, y solo cuando no está en la caché.
+    filas_mapa = lambda: data[[c for c in COLUMNAS_MAPA if c in data.columns]].take(pos)
+    with etapa("construir_mapa", filas=len(pos)):
+        if clave is None:
+            m = construir_mapa(filas_mapa(), modo=modo)
+        else:
+            m = cache_artefactos.obtener(
+                clave_artefacto("mapa", version_data, modo, *clave),
+                lambda: construir_mapa(filas_mapa(), modo=modo),
+                peso=peso_mapa,
+            )
+    # returned_objects=[]: la app no usa lo que devuelve el mapa, así que mover o hacer
+    # zoom no dispara una nueva ejecución.
+    with etapa("st_folium", filas=len(pos)):
+        st_folium_copia(m, height=600, use_container_width=True, returned_objects=[])
+
+def posiciones_en_vista(pos: np.ndarray, limites: dict = None):
+    """
+    De las posiciones de fila `pos` (propiedades geolocalizadas de `data`), las que caen dentro de los
+    `limites` de la vista que devuelve `st_folium` (todas si no hay límites). Si son más de
+    `MAX_MARCADORES_MAPA`, quedan las más cercanas al centro.
+    Devuelve (posiciones, cuántas había en la vista, si se filtró por la vista).
+    """
+    sw, ne = (limites or {}).get("_southWest") or {}, (limites or {}).get("_northEast") or {}
+    en_vista = sw.get("lat") is not None and ne.get("lat") is not None
+    if en_vista:
+        dentro = en_rectangulo(indice_espacial, sw["lat"], sw["lng"], ne["lat"], ne["lng"])
+        pos = dentro[np.isin(dentro, pos)]
+        centro = ((sw["lat"] + ne["lat"]) / 2, (sw["lng"] + ne["lng"]) / 2)
+    else:
+        centro = (data["lat"].to_numpy()[pos].mean(), data["lon"].to_numpy()[pos].mean())
+    total = len(pos)
+    if total > MAX_MARCADORES_MAPA:
+        dist = distancia_m(centro[0], centro[1], data["lat"].to_numpy()[pos], data["lon"].to_numpy()[pos])
+        pos = pos[np.argpartition(dist, MAX_MARCADORES_MAPA - 1)[:MAX_MARCADORES_MAPA]]
+    return pos, total, en_vista
+
+def st_folium_copia(m, **kwargs):
+    """
+    `st_folium` sobre una copia de `m`. `st_folium` modifica el mapa que recibe: lo renderiza (folium le
+    agrega elementos en cada render), le cambia los ids y le agrega la capa de `feature_group_to_add`.
+    Los mapas de la caché de artefactos los comparten todas las sesiones y no deben modificarse; la
+    copia conserva los ids, así que el mapa no se vuelve a montar.
+    """
+    from streamlit_folium import st_folium
+
+    return st_folium(copy.deepcopy(m), **kwargs)
+
+def create_map_ventana(pos: np.ndarray, clave: tuple):
+    """
+    Mapa que carga solo los marcadores dentro de la vista actual (consultando el índice espacial).
+    El mapa base se monta una vez; al mover o hacer zoom, `st_folium` devuelve los nuevos límites
+    y solo se reemplaza la capa de marcadores (`feature_group_to_add`), sin volver a montar el mapa.
+    Si en la vista hay más de `MAX_MARCADORES_MAPA` propiedades, se muestran las más cercanas al centro.
+    `pos` son las posiciones en `data` de las propiedades geolocalizadas del distrito.
+    """
+    key_mapa = "mapa_" + clave_artefacto("ventana", *clave)[:16]
+    from mapas import capa_marcadores, construir_mapa, peso_mapa
+
+    with etapa("construir_mapa", filas=len(pos)):
+        base = cache_artefactos.obtener(
+            clave_artefacto("mapa_base", version_data, *clave),
+            lambda: construir_mapa(data[["lat", "lon"]].take(pos), marcadores=False),
+            peso=peso_mapa,
+        )
 
-        folium.CircleMarker(
-            location=[r['lat'], r['lon']],
-            radius=5,
-            color=color,
-            fill=True,
-            fill_opacity=0.8,
-            tooltip=safe(r.get('direccion_fix') or r.get('direccion')),
-            popup=folium.Popup(popup_html, max_width=350),
-        ).add_to(cluster)
+    # Límites de la vista que devolvió el mapa en la interacción anterior (None al montarlo).
+    limites = (st.session_state.get(key_mapa) or {}).get("bounds")
+    with etapa("consulta_espacial") as e:
+        pos, total_vista, en_vista = posiciones_en_vista(pos, limites)
+        ambito = "en la vista actual" if en_vista else "del distrito"
+        e.filas = len(pos)
 
-    st_folium(m, height=600, use_container_width=True)
+    with etapa("capa_marcadores", filas=len(pos)):
+        capa = capa_marcadores(data.take(pos))
+
+    st.caption(
+        f"Mostrando {len(pos):,} de {total_vista:,} propiedades {ambito}"
+        + (" (las más cercanas al centro; acerque el mapa para ver el resto)." if total_vista > len(pos) else ".")
+    )
+    with etapa("st_folium", filas=len(pos)):
+        st_folium_copia(
+            base, key=key_mapa, height=600, use_container_width=True,
+            feature_group_to_add=capa, returned_objects=["bounds"],
+        )
+
+@st.fragment
+def create_map_distritos(df: pd.DataFrame, resumen: pd.DataFrame, clave: tuple, simbolo: str):
+    """
+    Mapa de precios por distrito de las propiedades de `df`, con las estadísticas del cubo en `resumen`.
+    Alejado, solo se envían los contornos de los distritos coloreados según su precio (ver
+    `mapas.construir_mapa_distritos`); desde `ZOOM_PROPIEDADES` se agregan las propiedades de la vista,
+    consultando el índice espacial. Es un fragmento: mover el mapa no vuelve a ejecutar la pestaña.
+    """
+    metricas = {"median": "Precio mediano", "precio_m2": "Precio promedio por m²"}
+    metrica = st.radio("Color según", list(metricas), format_func=metricas.get, horizontal=True, key="coropleta_metrica")
+
+    with etapa("importar_mapas"):
+        from mapas import capa_marcadores, construir_mapa_distritos, peso_mapa
+
+    with etapa("mapa_distritos", filas=len(resumen)):
+        base = cache_artefactos.obtener(
+            clave_artefacto("mapa_distritos", version_data, *clave, metrica),
+            lambda: construir_mapa_distritos(geometria_distritos, resumen[metrica], resumen["n"], metricas[metrica], simbolo),
+            peso=peso_mapa,
+        )
+
+    # Zoom y límites que devolvió el mapa en la interacción anterior (None al montarlo).
+    key_mapa = "mapa_distritos_" + clave_artefacto("distritos", *clave)[:16]
+    estado = st.session_state.get(key_mapa) or {}
+    capa = None
+    if (estado.get("zoom") or 0) >= ZOOM_PROPIEDADES and estado.get("bounds"):
+        with etapa("consulta_espacial") as e:
+            geolocalizadas = df.index.to_numpy()[df["geo_valido"].to_numpy(dtype=bool)]
+            pos, total_vista, _ = posiciones_en_vista(geolocalizadas, estado["bounds"])
+            e.filas = len(pos)
+        with etapa("capa_marcadores", filas=len(pos)):
+            capa = capa_marcadores(data.take(pos)) if len(pos) else None
+        st.caption(
+            f"Mostrando {len(pos):,} de {total_vista:,} propiedades en la vista actual"
+            + (" (las más cercanas al centro)." if total_vista > len(pos) else ".")
+        )
+    else:
+        st.caption("Acerque el mapa para ver las propiedades individuales.")
+
+    with etapa("st_folium", filas=0 if capa is None else len(pos)):
+        st_folium_copia(
+            base, key=key_mapa, height=550, use_container_width=True,
+            feature_group_to_add=capa, returned_objects=["zoom", "bounds"],
+        )
+
+def display_cercanos(operation: str, inmueble: str, distrito: str, centro: tuple):
+    """Búsqueda de propiedades de (operation, inmueble) a menos de un radio de un punto, con el índice espacial."""
+    price_col = columna_precio(operation)
+    with st.expander("📍 Buscar propiedades cerca de un punto"):
+        c1, c2, c3 = st.columns(3, gap="small")
+        with c1:
+            lat = st.number_input("Latitud", value=float(centro[0]), format="%.5f", key=f"cerca_lat_{operation}_{distrito}")
+        with c2:
+            lon = st.number_input("Longitud", value=float(centro[1]), format="%.5f", key=f"cerca_lon_{operation}_{distrito}")
+        with c3:
+            radio_km = st.slider("Radio (km)", 0.25, 5.0, 1.0, 0.25, key=f"cerca_radio_{operation}")
+
+        with etapa("cercanos") as e:
+            pos, dist = cercanos(indice_espacial, lat, lon, radio_km * 1000)
+            # Se filtra por operación e inmueble antes de materializar las filas; las categóricas se leen solo en
+            # `pos` (`to_numpy()` de toda la columna armaría un array de objetos del largo de la data).
+            mascara = ((data["operacion"].iloc[pos] == operation) & (data["inmueble"].iloc[pos] == inmueble)).to_numpy()
+            pos, dist = pos[mascara][:MAX_FILAS_CERCANOS], dist[mascara][:MAX_FILAS_CERCANOS]
+            e.filas = len(pos)
+
+        st.caption(f"{mascara.sum():,} {inmueble} en {operation} a menos de {radio_km:g} km (se listan hasta {MAX_FILAS_CERCANOS}, de la más cercana a la más lejana).")
+        columnas = ["enlace", "distrito_oficial", "direccion", price_col, "area", "dormitorio"]
+        st.dataframe(
+            data.take(pos)[columnas].assign(distancia_m=np.round(dist)),
+            hide_index=True, use_container_width=True,
+            column_config={
+                "enlace": st.column_config.LinkColumn("Anuncio", display_text="🔗 Abrir"),
+                "distancia_m": st.column_config.NumberColumn("Distancia", format="%d m"),
+            },
+        )
+
+def panel_rendimiento():
+    """Panel de depuración en la barra lateral con las etapas de las últimas ejecuciones medidas de la sesión."""
+    registros = st.session_state.get("registros_perf", [])
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=True):
+        if not registros:
+            st.caption("Todavía no hay ejecuciones medidas.")
+            return
+        st.caption("Se actualiza en cada ejecución completa del script.")
+        filas = pd.DataFrame([fila for registro in registros[-8:] for fila in registro.como_filas()])
+        st.dataframe(
+            filas[["nombre", "etapa", "segundos", "filas", "bytes_asignados", "pico_bytes"]],
+            hide_index=True, use_container_width=True,
+        )
 
 ## ==================##
 ##      Pestañas     ##
@@ -286,13 +578,19 @@ def create_map(df: pd.DataFrame):
 
 tab1, tab2, tab3 = st.tabs(["🔎 Análisis Distrito", "📦 Alquiler", "📊 Venta"])
 
+# Cada pestaña es un fragmento (@st.fragment): al cambiar uno de sus widgets solo se
+# vuelve a ejecutar esa pestaña (filtros -> KPIs -> tabla -> mapa) y no todo el script.
+
 
 ## ===========================##
 ##      Analisis Distrito     ##
 ## ===========================##
 
 
-with tab1:
+@st.fragment
+@instrumentado("analisis_distrito", al_finalizar=guardar_registro_perf)
+def analisis_distrito():
+    """Pestaña de análisis por zona: resumen por distrito y gráficos."""
 
     c1, c2, c3 = st.columns(3, gap="small")
     with c1:
@@ -310,9 +608,9 @@ with tab1:
         )
         
     with c3:
-        st.markdown("**Zona de Lima**")
-        # Usamos la nueva columna 'distrito_categoria' para el filtro
-        zonas = ['Todos','Lima Top', 'Lima Moderna', 'Lima Centro',  'Lima Este', 'Lima Norte',  'Lima Sur']
+        st.markdown("**Zona**")
+        # Usamos la nueva columna 'distrito_categoria' para el filtro (zonas del conjunto de datos)
+        zonas = ['Todos'] + zonas_conjunto
         input_zona = st.selectbox(
             "Zona"
             , zonas
@@ -321,53 +619,49 @@ with tab1:
             , index=0
         )
 
-    col_precio = "precio_usd" if input_operacion == "venta" else "precio_pen"
+    col_precio = columna_precio(input_operacion)
     simbolo   = "US$" if input_operacion == "venta" else "S/"
     
     
     ## Filtrado de Alquiler
-    if input_zona == "Todos":
-        df_filtrado = data[
-            (data["inmueble"] == input_inmueble) &
-            (data["operacion"] == input_operacion) 
-        ].copy()
-        
-    else:
-        df_filtrado = data[
-            (data["inmueble"] == input_inmueble) &
-            (data["operacion"] == input_operacion) &
-            (data["distrito_categoria"] == input_zona) # Filtro por la nueva zona
-        ].copy()
-
-    data_agrupada = df_filtrado.groupby("distrito_oficial")
-    data_agrupada_df = data_agrupada[col_precio].agg(
-        n="count",
-        min="min", max="max",
-        p05=lambda s: s.quantile(0.05),
-        q1=lambda s: s.quantile(0.25),
-        median="median",
-        q3=lambda s: s.quantile(0.75).round(2),
-        p95=lambda s: s.quantile(0.95).round(2)
-    )
+    # El índice devuelve las posiciones de fila; `take` ya entrega un DataFrame nuevo.
+    with etapa("filtrado") as e:
+        df_filtrado = subconjunto(
+            data_pestanas, indice_filtros, input_inmueble, input_operacion,
+            zona=None if input_zona == "Todos" else input_zona # Filtro por la nueva zona
+        )
+        e.filas = len(df_filtrado)
+
+    # Resumen por distrito leído del cubo de estadísticas precalculado.
+    with etapa("resumen_distritos"):
+        data_agrupada_df = resumen_distritos(
+            cubo_precios, input_inmueble, input_operacion,
+            zona=None if input_zona == "Todos" else input_zona
+        )
 
-    cols_precios = [c for c in data_agrupada_df.columns if c != "n"]
-    data_agrupada_df_fmt = data_agrupada_df.copy()
-    data_agrupada_df_fmt[cols_precios] = data_agrupada_df_fmt[cols_precios]\
-        .applymap(lambda x: f"{simbolo} {x:,.0f}")
+    cols_precios = ["min", "max", "p05", "q1", "median", "q3", "p95"]
+    data_agrupada_df_fmt = data_agrupada_df[["n"] + cols_precios]
+    for col in cols_precios:
+        data_agrupada_df_fmt[col] = data_agrupada_df_fmt[col].map(lambda x: f"{simbolo} {x:,.0f}")
     
     st.subheader(f"Resumen de {input_inmueble} en {input_operacion} para **{input_zona}**")
     
-    st.data_editor(
-        data_agrupada_df_fmt.sort_values("n", ascending=False),
-        use_container_width=True,
-        column_config={
-            "distrito_oficial": st.column_config.TextColumn("Distrito", disabled=True)
-        },
-        disabled=True,
-        key="data_agrupada_fmt"
-    )
+    with etapa("tabla_resumen", filas=len(data_agrupada_df_fmt)):
+        st.data_editor(
+            data_agrupada_df_fmt.sort_values("n", ascending=False),
+            use_container_width=True,
+            column_config={
+                "distrito_oficial": st.column_config.TextColumn("Distrito", disabled=True)
+            },
+            disabled=True,
+            key="data_agrupada_fmt"
+        )
     
     
+    # Coropletas por distrito; las propiedades individuales solo aparecen al acercar el mapa.
+    st.subheader("Mapa de precios por distrito", divider="blue")
+    create_map_distritos(df_filtrado, data_agrupada_df, (input_inmueble, input_operacion, input_zona), simbolo)
+
     st.subheader("Análisis Gráfico Interactivo", divider="blue")
 
     if df_filtrado.empty:
@@ -375,15 +669,44 @@ with tab1:
     else:
         # Gráfico 1: Distribución de Precios por Distrito (Box Plot)
         # Este gráfico es ideal para comparar la dispersión de precios entre distritos.
+        with etapa("importar_graficos"):
+            from graficos import MAX_ATIPICOS_BOX, MUESTRA_HOVER, figura_box, figura_scatter, modo_scatter
+
         st.markdown(f"##### Distribución de Precios de {input_inmueble} en {input_operacion}")
-        fig1 = px.box(df_filtrado, 
-                    x="distrito_oficial", 
-                    y=col_precio,
-                    color="distrito_oficial",
-                    points="all",
-                    labels={"distrito_oficial": "Distrito", col_precio: f"Precio ({simbolo})"})
-        fig1.update_layout(showlegend=False)
-        st.plotly_chart(fig1, use_container_width=True)
+        # Por defecto las cajas salen del cubo precalculado y solo se envía una muestra acotada
+        # de atípicos; "todos los puntos" envía cada propiedad y solo se ofrece con pocas filas.
+        todos_los_puntos = st.toggle(
+            "Mostrar todos los puntos", key="box_todos",
+            disabled=len(df_filtrado) > MAX_PUNTOS_BOX,
+            help=f"Disponible con hasta {MAX_PUNTOS_BOX:,} propiedades.",
+        ) and len(df_filtrado) <= MAX_PUNTOS_BOX
+
+        def crear_box():
+            if not todos_los_puntos:
+                atipicos = atipicos_box(df_filtrado, max_puntos=MAX_ATIPICOS_BOX)
+                return figura_box(data_agrupada_df, atipicos, col_precio, simbolo)
+            import plotly.express as px
+            fig = px.box(df_filtrado, 
+                        x="distrito_oficial", 
+                        y=col_precio,
+                        color="distrito_oficial",
+                        points="all",
+                        labels={"distrito_oficial": "Distrito", col_precio: f"Precio ({simbolo})"})
+            fig.update_layout(showlegend=False)
+            return fig
+
+        # La figura se reutiliza de la caché mientras no cambien sus filtros.
+        with etapa("figura_box", filas=len(df_filtrado)):
+            fig1 = cache_artefactos.obtener(
+                clave_artefacto("box", version_data, input_inmueble, input_operacion, input_zona, todos_los_puntos),
+                crear_box,
+                peso=(
+                    peso_estimado(df_filtrado, ["distrito_oficial", col_precio]) if todos_los_puntos
+                    else peso_estimado(data_agrupada_df, COLUMNAS_CUBO) + MAX_ATIPICOS_BOX * 16
+                ),
+            )
+        with etapa("plotly_chart_box", filas=len(df_filtrado)):
+            st.plotly_chart(fig1, use_container_width=True)
 
         # --- Columnas para los siguientes gráficos ---
         g1, g2 = st.columns(2)
@@ -391,44 +714,56 @@ with tab1:
         with g1:
             # Gráfico 2: Número de Propiedades por Distrito (Bar Chart)
             st.markdown("##### Cantidad de Propiedades por Distrito")
-            prop_por_distrito = df_filtrado['distrito_oficial'].value_counts().sort_values(ascending=True) 
+            prop_por_distrito = df_filtrado['distrito_oficial'].value_counts().loc[lambda s: s > 0].sort_values(ascending=True)
             prop_por_distrito_df = pd.DataFrame(prop_por_distrito)
-            st.bar_chart(prop_por_distrito_df, horizontal=True)
+            with etapa("grafico_cantidad"):
+                st.bar_chart(prop_por_distrito_df, horizontal=True)
 
         with g2:
             # Gráfico 3: Precio Promedio por m² por Distrito (Bar Chart)
             st.markdown(f"##### Precio Promedio por m² ({simbolo})")
-            df_plot = df_filtrado[(df_filtrado['area'] > 0) & (df_filtrado[col_precio] > 0)].copy()
-            if not df_plot.empty:
-                df_plot['precio_m2'] = round(df_plot[col_precio] / df_plot['area'],2)
-                precio_m2_distrito = df_plot.groupby('distrito_oficial')['precio_m2'].mean().round(2).sort_values(ascending=False)
-                st.bar_chart(precio_m2_distrito, horizontal=True)
+            precio_m2_distrito = data_agrupada_df['precio_m2'].dropna().sort_values(ascending=False)
+            if not precio_m2_distrito.empty:
+                with etapa("grafico_precio_m2"):
+                    st.bar_chart(precio_m2_distrito, horizontal=True)
             else:
                 st.info("No hay datos de área o precio para calcular el precio por m².")
 
         # Gráfico 4: Relación Área vs. Precio (Scatter Plot)
         st.markdown(f"##### Relación Área vs. Precio para {input_inmueble}")
-        # Filtrar outliers para una mejor visualización, mostrando el 95% de los datos
-        area_limite = df_filtrado['area'].quantile(0.95)
-        precio_limite = df_filtrado[col_precio].quantile(0.95)
-        
-        df_scatter = df_filtrado[
-            (df_filtrado['area'] > 0) & (df_filtrado[col_precio] > 0) &
-            (df_filtrado['area'] <= area_limite) & 
-            (df_filtrado[col_precio] <= precio_limite)
-        ].copy()
+        # Sin los precios atípicos de cada distrito (marca precalculada en la carga) para una mejor visualización
+        with etapa("datos_scatter") as e:
+            df_scatter = datos_scatter(df_filtrado)
+            e.filas = len(df_scatter)
 
         if not df_scatter.empty:
-            fig4 = px.scatter(df_scatter, x="area", y=col_precio, color="distrito_oficial",
-                            hover_data=['direccion'], title=f"Precio vs. Área (mostrando el 95% de los datos)",
-                            labels={"area": "Área (m²)", col_precio: f"Precio ({simbolo})"})
-            st.plotly_chart(fig4, use_container_width=True)
+            # Con muchos puntos se pasa a WebGL y, con más aún, a una grilla de densidad con una muestra
+            # para el hover (ver `graficos.modo_scatter`).
+            modo_fig4 = modo_scatter(len(df_scatter))
+            with etapa("figura_scatter", filas=len(df_scatter)):
+                fig4 = cache_artefactos.obtener(
+                    clave_artefacto("scatter", version_data, input_inmueble, input_operacion, input_zona),
+                    lambda: figura_scatter(df_scatter, col_precio, simbolo, "Precio vs. Área (sin precios atípicos por distrito)",
+                                           modo=modo_fig4),
+                    peso=peso_estimado(
+                        df_scatter.head(MUESTRA_HOVER) if modo_fig4 == "densidad" else df_scatter,
+                        ["area", col_precio, "distrito_oficial", "direccion"],
+                    ),
+                )
+            with etapa("plotly_chart_scatter", filas=len(df_scatter)):
+                st.plotly_chart(fig4, use_container_width=True)
+    
+with tab1:
+    analisis_distrito()
     
 ## =================================##
 ## PESTAÑA de ALquiler por Distrito ##
 ## =================================##
 
-with tab2:
+@st.fragment
+@instrumentado("alquiler_por_distrito", al_finalizar=guardar_registro_perf)
+def alquiler_por_distrito():
+    """Pestaña de alquiler: KPIs, tabla de detalle y mapa de un distrito."""
     
     st.subheader("Propiedades en Alquiler", divider="blue")
     st.write("Seleccione el Distrito de interes y el tipo de inmueble que desea ver")
@@ -448,18 +783,23 @@ with tab2:
         )
     
     ## Filtrado de Alquiler
-    df_filtrado_aquiler = data[
-        (data["inmueble"] == input_inmueble) &
-        (data["distrito_oficial"] == input_distrito) &
-        (data["operacion"] == "alquiler")
-    ].copy()
+    with etapa("filtrado") as e:
+        df_filtrado_aquiler = subconjunto(data_pestanas, indice_filtros, input_inmueble, "alquiler", distrito=input_distrito)
+        e.filas = len(df_filtrado_aquiler)
+
+    # La marca de atípico se precalcula en la carga (precio fuera de los bigotes de su distrito).
+    sin_atipicos_alquiler = st.toggle(
+        "Excluir precios atípicos", key="alquiler_sin_atipicos",
+        help="Quita de los KPIs y de la tabla los precios fuera de 1.5 rangos intercuartílicos de su distrito.",
+    )
     
     
     ## =============================##
     ## KPI de ALquiler por Distrito ##
     ## =============================##
     
-    display_kpis(df_filtrado_aquiler, "alquiler", input_distrito, input_inmueble)
+    with etapa("kpis", filas=len(df_filtrado_aquiler)):
+        display_kpis(excluir_atipicos(df_filtrado_aquiler) if sin_atipicos_alquiler else df_filtrado_aquiler, "alquiler", input_distrito, input_inmueble)
     
     ## =======================================##
     ## TABLA Detalle de ALquiler por Distrito ##
@@ -511,27 +851,31 @@ with tab2:
             
         )
         
-    # Se crea una copia del DataFrame filtrado por distrito para aplicar los filtros de rango.
-    df_tabla_alquiler = df_filtrado_aquiler.copy()
-
-    # Se aplica el filtro de rango de precio si no es "Todos".
-    if input_rango_precio_aquiler != "Todos":
-        df_tabla_alquiler = df_tabla_alquiler[df_tabla_alquiler["precio_alquiler_agp"] == input_rango_precio_aquiler]
-
-    # Se aplica el filtro de rango de área si no es "Todos".
-    if input_rango_area_alquiler != "Todos":
-        df_tabla_alquiler = df_tabla_alquiler[df_tabla_alquiler["area_agp"] == input_rango_area_alquiler]
+    # Búsqueda por palabras: las posiciones del índice invertido se intersectan con las del distrito.
+    consulta_alquiler = st.text_input(
+        "Buscar en dirección y características", placeholder="p. ej. piscina terraza", key="busqueda_alquiler",
+    )
+    df_busqueda_alquiler = df_filtrado_aquiler
+    if consulta_alquiler.strip():
+        with etapa("busqueda") as e:
+            df_busqueda_alquiler = data_pestanas.take(buscar(indice_busqueda, consulta_alquiler, dentro=df_filtrado_aquiler.index.to_numpy()))
+            e.filas = len(df_busqueda_alquiler)
+
+    # Se aplican los filtros de rango (los que estén en "Todos" no se aplican).
+    df_tabla_alquiler = filtrar_tabla(
+        df_busqueda_alquiler, "alquiler",
+        rango_precio=input_rango_precio_aquiler,
+        rango_area=input_rango_area_alquiler,
+        dormitorio=input_dormitorio_alquiler,
+        estacionamiento=input_estacionamiento_alquiler,
+        sin_atipicos=sin_atipicos_alquiler,
+    )
     
-    # Se aplica el filtro de numero de habitaciones si no es "Todos".
-    if input_dormitorio_alquiler != "Todos":
-        df_tabla_alquiler = df_tabla_alquiler[df_tabla_alquiler["dormitorio"] == input_dormitorio_alquiler]
-        
-    # Se aplica el filtro de estacionamientos si no es "Todos".
-    if input_estacionamiento_alquiler != "Todos":
-        df_tabla_alquiler = df_tabla_alquiler[df_tabla_alquiler["estacionamiento_gp"] == input_estacionamiento_alquiler]
-
     # Usamos la función refactorizada para mostrar la tabla
-    display_details_table(df_tabla_alquiler, "alquiler")
+    with etapa("tabla_detalle", filas=len(df_tabla_alquiler)):
+        pagina_alquiler = display_details_table(df_tabla_alquiler, "alquiler")
+    # Fuera de "tabla_detalle": las etapas no se anidan (ver `instrumentacion.etapa`).
+    display_comparables(pagina_alquiler, "alquiler")
     
     ## ==============================##
     ## Mapa de ALquiler por Distrito ##
@@ -542,14 +886,25 @@ with tab2:
     st.write(f"Cantidad de {input_inmueble} en Alquiler en {input_distrito} en Mapa Disponibles:", df_tabla_alquiler[df_tabla_alquiler["status"]=="geo"].shape[0])
     
     # Usamos la función refactorizada para crear el mapa
-    create_map(df_filtrado_aquiler)
+    create_map(df_filtrado_aquiler, clave=("alquiler", input_distrito, input_inmueble))
+    
+    geo_alquiler = df_filtrado_aquiler["geo_valido"].to_numpy(dtype=bool)
+    if geo_alquiler.any():
+        centro = (df_filtrado_aquiler["lat"].to_numpy()[geo_alquiler].mean(), df_filtrado_aquiler["lon"].to_numpy()[geo_alquiler].mean())
+        display_cercanos("alquiler", input_inmueble, input_distrito, centro)
     
     
+with tab2:
+    alquiler_por_distrito()
+    
 ## ===============================##
 ## PESTAÑA de Ventas por Distrito ##
 ## ===============================##
 
-with tab3:
+@st.fragment
+@instrumentado("venta_por_distrito", al_finalizar=guardar_registro_perf)
+def venta_por_distrito():
+    """Pestaña de venta: KPIs, tabla de detalle y mapa de un distrito."""
     
     st.subheader("Propiedades en Venta", divider="blue")
     
@@ -569,17 +924,22 @@ with tab3:
 
     
     ## Filtrado de Alquiler
-    df_filtrado_venta = data[
-        (data["inmueble"] == input_inmueble) &
-        (data["distrito_oficial"] == input_distrito) &
-        (data["operacion"] == "venta")
-    ].copy()
+    with etapa("filtrado") as e:
+        df_filtrado_venta = subconjunto(data_pestanas, indice_filtros, input_inmueble, "venta", distrito=input_distrito)
+        e.filas = len(df_filtrado_venta)
+
+    # La marca de atípico se precalcula en la carga (precio fuera de los bigotes de su distrito).
+    sin_atipicos_venta = st.toggle(
+        "Excluir precios atípicos", key="venta_sin_atipicos",
+        help="Quita de los KPIs y de la tabla los precios fuera de 1.5 rangos intercuartílicos de su distrito.",
+    )
     
     ## ==========================##
     ## KPI de Venta por Distrito ##
     ## ==========================##
     
-    display_kpis(df_filtrado_venta, "venta", input_distrito, input_inmueble)
+    with etapa("kpis", filas=len(df_filtrado_venta)):
+        display_kpis(excluir_atipicos(df_filtrado_venta) if sin_atipicos_venta else df_filtrado_venta, "venta", input_distrito, input_inmueble)
 
     ## ====================================##
     ## TABLA Detalle de Venta por Distrito ##
@@ -630,27 +990,31 @@ with tab3:
             
         )    
         
-    # Se crea una copia del DataFrame filtrado por distrito para aplicar los filtros de rango.
-    df_tabla_venta = df_filtrado_venta.copy()
-
-    # Se aplica el filtro de rango de precio si no es "Todos".
-    if input_rango_precio_venta != "Todos":
-        df_tabla_venta = df_tabla_venta[df_tabla_venta["precio_venta_agp"] == input_rango_precio_venta]
-
-    # Se aplica el filtro de rango de área si no es "Todos".
-    if input_rango_area_venta != "Todos":
-        df_tabla_venta = df_tabla_venta[df_tabla_venta["area_agp"] == input_rango_area_venta]
-        
-    # Se aplica el filtro de numero de habitaciones si no es "Todos".
-    if input_dormitorio_venta != "Todos":
-        df_tabla_venta = df_tabla_venta[df_tabla_venta["dormitorio"] == input_dormitorio_venta]
-        
-    # Se aplica el filtro de estacionamientos si no es "Todos".
-    if input_estacionamiento_venta != "Todos":
-        df_tabla_venta = df_tabla_venta[df_tabla_venta["estacionamiento_gp"] == input_estacionamiento_venta]
+    # Búsqueda por palabras: las posiciones del índice invertido se intersectan con las del distrito.
+    consulta_venta = st.text_input(
+        "Buscar en dirección y características", placeholder="p. ej. piscina terraza", key="busqueda_venta",
+    )
+    df_busqueda_venta = df_filtrado_venta
+    if consulta_venta.strip():
+        with etapa("busqueda") as e:
+            df_busqueda_venta = data_pestanas.take(buscar(indice_busqueda, consulta_venta, dentro=df_filtrado_venta.index.to_numpy()))
+            e.filas = len(df_busqueda_venta)
+
+    # Se aplican los filtros de rango (los que estén en "Todos" no se aplican).
+    df_tabla_venta = filtrar_tabla(
+        df_busqueda_venta, "venta",
+        rango_precio=input_rango_precio_venta,
+        rango_area=input_rango_area_venta,
+        dormitorio=input_dormitorio_venta,
+        estacionamiento=input_estacionamiento_venta,
+        sin_atipicos=sin_atipicos_venta,
+    )
     
     # Usamos la función refactorizada para mostrar la tabla
-    display_details_table(df_tabla_venta, "venta")
+    with etapa("tabla_detalle", filas=len(df_tabla_venta)):
+        pagina_venta = display_details_table(df_tabla_venta, "venta")
+    # Fuera de "tabla_detalle": las etapas no se anidan (ver `instrumentacion.etapa`).
+    display_comparables(pagina_venta, "venta")
     
     ## ===========================##
     ## Mapa de Venta por Distrito ##
@@ -661,4 +1025,16 @@ with tab3:
     st.write(f"Cantidad de {input_inmueble} en Venta en {input_distrito} en Mapa Disponibles:", df_tabla_venta[df_tabla_venta["status"]=="geo"].shape[0])
     
     # Usamos la función refactorizada para crear el mapa
-    create_map(df_filtrado_venta)
+    create_map(df_filtrado_venta, clave=("venta", input_distrito, input_inmueble))
+    
+    geo_venta = df_filtrado_venta["geo_valido"].to_numpy(dtype=bool)
+    if geo_venta.any():
+        centro = (df_filtrado_venta["lat"].to_numpy()[geo_venta].mean(), df_filtrado_venta["lon"].to_numpy()[geo_venta].mean())
+        display_cercanos("venta", input_inmueble, input_distrito, centro)
+
+with tab3:
+    venta_por_distrito()
+
+## Panel de depuración: solo si la instrumentación está activa (ADONDE_VIVIR_PERF=1)
+if instrumentacion_activa():
+    panel_rendimiento()
@@ -0,0 +1,2 @@
+## Benchmarks del proyecto a Donde Vivir.
+## Se ejecutan desde la raíz del repositorio, p. ej.: python -m benchmarks.bench_mapas
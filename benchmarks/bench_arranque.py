@@ -0,0 +1,99 @@
+## Benchmark de arranque en frío de la app
+## =======================================
+##
+## Cada medición corre en un intérprete nuevo, como una réplica recién creada:
+##
+## - importacion: tiempo de importar cada módulo pesado por separado (`python -X importtime`).
+## - primer_pintado: con la app corriendo en `streamlit.testing` sobre data sintética, el tiempo
+##   desde que arranca la ejecución del script hasta que se envía el primer elemento (el título),
+##   y hasta que termina la primera ejecución completa; y si en el momento del primer pintado
+##   ya se habían importado las librerías de visualización.
+##
+## Uso:
+##     python -m benchmarks.bench_arranque --filas 100000 --repeticiones 3
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from sintetico import generar_anuncios
+
+RAIZ = Path(__file__).resolve().parent.parent
+APP = RAIZ / "adonde_vivir_oficial.py"
+
+# Módulos que la app importaba al inicio del script antes de cargar las visualizaciones en diferido.
+MODULOS = ["streamlit", "pandas", "folium", "folium.plugins", "streamlit_folium", "plotly.express", "mapas", "graficos"]
+
+# Se ejecuta en un intérprete nuevo: mide la primera ejecución de la app con AppTest.
+_SCRIPT_PRIMER_PINTADO = """
+import json, sys, time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+marcas = {}
+titulo = st.title
+def title(*args, **kwargs):
+    if "primer_pintado_s" not in marcas:
+        marcas["primer_pintado_s"] = time.perf_counter() - inicio
+        marcas["visualizacion_importada"] = any(m in sys.modules for m in ("folium", "streamlit_folium", "plotly.express"))
+    return titulo(*args, **kwargs)
+st.title = title
+
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+inicio = time.perf_counter()
+at.run()
+marcas["primera_ejecucion_s"] = time.perf_counter() - inicio
+marcas["excepciones"] = len(at.exception)
+print(json.dumps(marcas))
+"""
+
+
+def tiempo_importacion(modulo: str) -> float:
+    """Segundos acumulados de importar `modulo` en un intérprete nuevo, según `-X importtime`."""
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=RAIZ, check=True,
+    ).stderr
+    # Cada línea: "import time: self [us] | cumulative | imported package"; la del módulo pedido es la última que lo nombra.
+    for linea in reversed(salida.splitlines()):
+        partes = [p.strip() for p in linea.split("|")]
+        if len(partes) == 3 and partes[2] == modulo:
+            return int(partes[1]) / 1e6
+    return float("nan")
+
+
+def primer_pintado(carpeta, app=APP) -> dict:
+    """Corre la primera ejecución de `app` en un intérprete nuevo, con `carpeta` como directorio de trabajo."""
+    app = Path(app).resolve()
+    entorno = {**os.environ, "PYTHONPATH": os.pathsep.join([str(app.parent), os.environ.get("PYTHONPATH", "")])}
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_PRIMER_PINTADO, str(app)],
+        capture_output=True, text=True, cwd=carpeta, env=entorno, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo de importación y de primer pintado de la app en frío.")
+    parser.add_argument("--filas", type=int, default=100_000, help="Anuncios sintéticos de la data de prueba")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--app", default=str(APP), help="Script de la app (p. ej. el de otra versión, para comparar)")
+    args = parser.parse_args()
+
+    importacion = pd.DataFrame(
+        [{"modulo": m, "segundos": round(min(tiempo_importacion(m) for _ in range(args.repeticiones)), 3)} for m in MODULOS]
+    )
+    print(importacion.to_string(index=False))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "data").mkdir()
+        generar_anuncios(args.filas).to_csv(Path(tmp) / "data" / "data_alquiler_venta.csv", sep="|", index=False, encoding="utf-8")
+        corridas = pd.DataFrame([primer_pintado(tmp, args.app) for _ in range(args.repeticiones)])
+    print()
+    print(corridas.to_string(index=False))
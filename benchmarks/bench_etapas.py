@@ -0,0 +1,144 @@
+## Benchmark por etapas de la capa de datos
+## ========================================
+##
+## Genera anuncios sintéticos (`sintetico.generar_anuncios`) y mide, para cada
+## etapa del procesamiento que hace la app, el tiempo y el pico de memoria
+## (tracemalloc). Cada etapa se ejecuta una vez para medir el tiempo y otra con
+## tracemalloc activo para medir la memoria, así el rastreo no distorsiona el tiempo.
+##
+## Uso:
+##     python -m benchmarks.bench_etapas --filas 10000 100000 1000000 --salida resultados.jsonl
+##     python -m benchmarks.bench_etapas --filas 100000 --base resultados.jsonl
+
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from busqueda import buscar, construir_indice_busqueda
+from comparables import comparables, construir_indice_comparables
+from datos import construir_snapshot, leer_csv, leer_snapshot, preparar_datos
+from estadisticas import agregar_columnas_precio, construir_cubo_precios, resumen_distritos
+from geometria import construir_geometria_distritos
+from filtros import columna_precio, datos_scatter, filtrar_tabla
+from indices import construir_indice_filtros, construir_rangos, pagina, subconjunto
+from mapas import construir_mapa, construir_mapa_distritos, datos_marcadores
+from sintetico import generar_anuncios
+
+
+def _distrito_mayor(ctx):
+    """(inmueble, operacion, distrito) con más anuncios: el peor caso de las pestañas por distrito."""
+    df = ctx["data"]
+    conteo = df.groupby(["inmueble", "operacion", "distrito_oficial"], observed=True).size()
+    return conteo.idxmax()
+
+
+def _filtrar_indice(ctx):
+    inm, ope, dist = ctx["llave"]
+    return subconjunto(ctx["data"], ctx["indice"], inm, ope, distrito=dist)
+
+
+def _mapa_html(ctx):
+    gdf = ctx["subconjunto"].loc[ctx["subconjunto"]["geo_valido"]]
+    return construir_mapa(gdf).get_root().render()
+
+
+def _mapa_distritos_html(ctx):
+    resumen = resumen_distritos(ctx["cubo"], *ctx["llave"][:2])
+    return construir_mapa_distritos(ctx["geometria"], resumen["median"], resumen["n"], "Precio mediano", "S/").get_root().render()
+
+
+# Etapas en orden: nombre -> (función(ctx), llave del ctx donde guardar el resultado o None).
+ETAPAS = {
+    "leer_csv": (lambda ctx: leer_csv(ctx["csv"]), "crudo"),
+    "preparar_datos": (lambda ctx: preparar_datos(ctx["crudo"]), None),
+    "construir_snapshot": (lambda ctx: construir_snapshot(ctx["csv"], ctx["snapshot"]), None),
+    "leer_snapshot": (lambda ctx: leer_snapshot(ctx["snapshot"]), "data"),
+    "columnas_precio": (lambda ctx: agregar_columnas_precio(ctx["data"]), None),
+    "indice_filtros": (lambda ctx: construir_indice_filtros(ctx["data"]), "indice"),
+    "filtrar_indice": (_filtrar_indice, "subconjunto"),
+    "filtrar_tabla": (lambda ctx: filtrar_tabla(ctx["subconjunto"], ctx["llave"][1], rango_area="De 50m2 a 100m2", dormitorio=2), None),
+    "rangos_orden": (lambda ctx: construir_rangos(ctx["data"]), "rangos"),
+    "pagina_tabla": (lambda ctx: pagina(ctx["data"], ctx["subconjunto"].index.to_numpy(), ctx["rangos"], columna_precio(ctx["llave"][1]), 2, 50), None),
+    "cubo_precios": (lambda ctx: construir_cubo_precios(ctx["data"]), "cubo"),
+    "indice_comparables": (lambda ctx: construir_indice_comparables(ctx["data"]), "comparables"),
+    "comparables": (lambda ctx: comparables(ctx["comparables"], int(ctx["subconjunto"].index[0]), k=10)[0], None),
+    "indice_busqueda": (lambda ctx: construir_indice_busqueda(ctx["data"]), "busqueda"),
+    "busqueda": (lambda ctx: buscar(ctx["busqueda"], "piscina terraza", dentro=ctx["subconjunto"].index.to_numpy()), None),
+    "datos_scatter": (lambda ctx: datos_scatter(subconjunto(ctx["data"], ctx["indice"], *ctx["llave"][:2])), None),
+    "datos_marcadores": (lambda ctx: datos_marcadores(ctx["subconjunto"].loc[ctx["subconjunto"]["geo_valido"]]), None),
+    "mapa_html": (_mapa_html, None),
+    "geometria_distritos": (lambda ctx: construir_geometria_distritos(ctx["data"], ruta=None), "geometria"),
+    "mapa_distritos_html": (_mapa_distritos_html, None),
+}
+
+
+def medir_etapas(filas: int, seed: int = 0) -> list:
+    """Ejecuta todas las etapas sobre `filas` anuncios sintéticos y devuelve una medición por etapa."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = {"csv": Path(tmp) / "data.csv", "snapshot": Path(tmp) / "data.feather"}
+        generar_anuncios(filas, seed=seed).to_csv(ctx["csv"], sep="|", index=False, encoding="utf-8")
+
+        for etapa, (funcion, destino) in ETAPAS.items():
+            t0 = time.perf_counter()
+            resultado = funcion(ctx)
+            segundos = time.perf_counter() - t0
+
+            tracemalloc.start()
+            funcion(ctx)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if destino is not None:
+                ctx[destino] = resultado
+            if etapa == "indice_filtros":
+                ctx["llave"] = _distrito_mayor(ctx)
+
+            resultados.append({
+                "filas": filas,
+                "etapa": etapa,
+                "segundos": round(segundos, 4),
+                "pico_mb": round(pico / 1e6, 2),
+                "filas_resultado": len(resultado) if hasattr(resultado, "__len__") and not isinstance(resultado, (str, dict)) else None,
+            })
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo y pico de memoria por etapa de la capa de datos.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", help="Archivo JSONL donde agregar los resultados")
+    parser.add_argument("--base", help="JSONL de una corrida anterior para comparar (muestra el cociente actual / base)")
+    args = parser.parse_args()
+
+    resultados = [r for filas in args.filas for r in medir_etapas(filas, seed=args.seed)]
+    tabla = pd.DataFrame(resultados).astype({"filas_resultado": "Int64"})
+
+    if args.base:
+        base = pd.read_json(args.base, lines=True).groupby(["filas", "etapa"])[["segundos", "pico_mb"]].last()
+        tabla = tabla.join(base, on=["filas", "etapa"], rsuffix="_base")
+        tabla["x_tiempo"] = (tabla["segundos"] / tabla["segundos_base"]).round(2)
+        tabla["x_memoria"] = (tabla["pico_mb"] / tabla["pico_mb_base"]).round(2)
+
+    print(tabla.to_string(index=False))
+
+    if args.salida:
+        meta = {"fecha": datetime.now().isoformat(timespec="seconds"), "commit": _commit_actual()}
+        with open(args.salida, "a", encoding="utf-8") as f:
+            for r in resultados:
+                f.write(json.dumps({**meta, **r}, ensure_ascii=False) + "\n")
@@ -0,0 +1,59 @@
+## Benchmark de `mapas.construir_mapa`: modo "lote" vs. "marcadores"
+## ==================================================================
+##
+## Mide el tiempo de construir y renderizar el HTML del mapa (lo mismo que hace
+## `st_folium` al serializarlo) y el tamaño del HTML resultante.
+##
+## Uso:
+##     python -m benchmarks.bench_mapas --tamanos 1000 10000 100000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from mapas import MODOS_MAPA, construir_mapa
+
+
+def propiedades_geolocalizadas(n: int, seed: int = 0) -> pd.DataFrame:
+    """Propiedades ficticias alrededor de Miraflores con las columnas que usa el mapa."""
+    rng = np.random.default_rng(seed)
+    operacion = rng.choice(["alquiler", "venta"], n)
+    return pd.DataFrame({
+        "lat": -12.12 + rng.normal(0, 0.01, n),
+        "lon": -77.03 + rng.normal(0, 0.01, n),
+        "operacion": operacion,
+        "direccion": [f"Av. Larco {i}" for i in range(n)],
+        "caracteristica": rng.choice(["piscina, terraza", "amoblado", "vista al mar", None], n),
+        "precio_pen": np.where(operacion == "alquiler", rng.integers(1000, 10000, n), np.nan),
+        "precio_usd": np.where(operacion == "venta", rng.integers(80000, 900000, n), np.nan),
+        "enlace": [f"https://urbania.pe/inmueble/{i}" for i in range(n)],
+        "fuente": rng.choice(["urbania", "adondevivir"], n),
+    })
+
+
+def medir(gdf: pd.DataFrame, modo: str) -> dict:
+    """Tiempo de construcción, tiempo de render y tamaño del HTML de un mapa."""
+    t0 = time.perf_counter()
+    m = construir_mapa(gdf, modo=modo)
+    t1 = time.perf_counter()
+    html = m.get_root().render()
+    t2 = time.perf_counter()
+    return {
+        "modo": modo,
+        "puntos": len(gdf),
+        "construccion_s": round(t1 - t0, 3),
+        "render_s": round(t2 - t1, 3),
+        "html_mb": round(len(html.encode("utf-8")) / 1e6, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara los modos de construcción del mapa.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--modos", nargs="+", default=list(MODOS_MAPA), choices=MODOS_MAPA)
+    args = parser.parse_args()
+
+    resultados = [medir(propiedades_geolocalizadas(n), modo) for n in args.tamanos for modo in args.modos]
+    print(pd.DataFrame(resultados).to_string(index=False))
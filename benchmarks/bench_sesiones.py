@@ -0,0 +1,194 @@
+## Prueba de carga con sesiones concurrentes de la app
+## ===================================================
+##
+## Simula N usuarios a la vez: cada sesión es un `AppTest` (`streamlit.testing`) que hace la
+## primera carga de la página y luego una secuencia de interacciones al azar (cambiar distrito,
+## inmueble, filtros, búsqueda, página...), cada una con su re-ejecución completa del script.
+## `AppTest` no se puede usar desde varios hilos a la vez (cada ejecución crea y desmonta el
+## runtime global de Streamlit), así que cada sesión corre en su propio proceso: compiten por
+## la CPU como las sesiones de una réplica, pero no comparten `st.cache_resource` (sí las
+## páginas de la caché en disco, que se mapean en memoria).
+##
+## Cada proceso calienta sus cachés con una sesión previa que no se mide y espera a los demás
+## para empezar todos juntos. Por nivel de concurrencia se reporta:
+## - latencia de las re-ejecuciones por interacción (p50, p90, p99, máximo) y de la primera carga;
+## - rendimiento: re-ejecuciones por segundo entre todas las sesiones;
+## - memoria: RSS medio de los procesos y lo que crece cada uno durante su sesión medida.
+##
+## Uso:
+##     python -m benchmarks.bench_sesiones --filas 100000 --concurrencia 1 2 4 8 --interacciones 10
+##     python -m benchmarks.bench_sesiones --carpeta /srv/adonde_vivir --salida carga.csv
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sintetico import generar_anuncios
+
+RAIZ = Path(__file__).resolve().parent.parent
+APP = RAIZ / "adonde_vivir_oficial.py"
+
+# Interacciones posibles: clave del widget y valores que puede tomar (None: las opciones del selectbox).
+# Los distritos aparecen dos veces porque es lo que más cambia un usuario.
+ACCIONES = [
+    ("alquiler_distrito", None), ("alquiler_distrito", None),
+    ("venta_distrito", None), ("venta_distrito", None),
+    ("alquiler_inmueble", None), ("venta_inmueble", None),
+    ("f_inm", None), ("f_ope", None), ("f_zona", None),
+    ("alquiler_sin_atipicos", [True, False]), ("venta_sin_atipicos", [True, False]),
+    ("rango_precio_alquiler", None), ("rango_area_venta", None),
+    ("dormitorio_alquiler", ["Todos", 1, 2, 3]), ("estacionamiento_venta", ["Todos", "Si", "No"]),
+    ("busqueda_alquiler", ["piscina", "terraza", "vista mar", ""]), ("busqueda_venta", ["jardin", "ascensor", ""]),
+    ("sentido_alquiler", ["Ascendente", "Descendente"]), ("pagina_venta", [1, 2, 3]),
+]
+
+
+def rss_mb() -> float:
+    """Memoria residente actual del proceso en MB (en Linux; en otros sistemas, el máximo alcanzado)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 1e6 if sys.platform == "darwin" else maximo / 1e3
+
+
+def _valores(at, clave, valores):
+    """Valores posibles de la acción; las opciones del selectbox si no vienen dados."""
+    if valores is not None:
+        return valores
+    return at.selectbox(key=clave).options
+
+
+def correr_sesion(app, interacciones: int, seed: int):
+    """
+    Una sesión simulada: primera carga y `interacciones` cambios de widget al azar.
+    Devuelve la latencia de la primera carga, las de las interacciones y la cantidad de excepciones.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(str(app), default_timeout=600)
+
+    t0 = time.perf_counter()
+    at.run()
+    primera = time.perf_counter() - t0
+    excepciones = len(at.exception)
+
+    latencias = []
+    for _ in range(interacciones):
+        clave, valores = ACCIONES[rng.integers(len(ACCIONES))]
+        try:
+            opciones = _valores(at, clave, valores)
+        except KeyError:
+            # El widget no se dibujó en esta ejecución (p. ej. otro conjunto de datos).
+            continue
+        at.session_state[clave] = opciones[rng.integers(len(opciones))]
+        t0 = time.perf_counter()
+        at.run()
+        latencias.append(time.perf_counter() - t0)
+        excepciones += len(at.exception)
+
+    return primera, latencias, excepciones
+
+
+# Estado de cada proceso de sesión, fijado por `_iniciar_proceso`.
+_app = None
+_inicio = None
+
+
+def _iniciar_proceso(carpeta, app, inicio, seed: int):
+    """Prepara un proceso de sesión: directorio de trabajo, rutas y cachés calientes (sesión no medida)."""
+    global _app, _inicio
+    os.chdir(carpeta)
+    if str(RAIZ) not in sys.path:
+        sys.path.insert(0, str(RAIZ))
+    _app, _inicio = app, inicio
+    correr_sesion(app, interacciones=2, seed=seed)
+
+
+def _sesion_medida(interacciones: int, seed: int) -> dict:
+    # La barrera deja a cada proceso con una sola sesión y hace que todas empiecen juntas.
+    _inicio.wait()
+    base_mb = rss_mb()
+    desde = time.time()
+    primera, latencias, excepciones = correr_sesion(_app, interacciones, seed)
+    return {
+        "desde": desde, "hasta": time.time(), "primera_s": primera, "latencias": latencias,
+        "excepciones": excepciones, "rss_mb": rss_mb(), "crecimiento_mb": rss_mb() - base_mb,
+    }
+
+
+def medir_nivel(carpeta, concurrencia: int, interacciones: int, app=APP, seed: int = 0) -> dict:
+    """Corre `concurrencia` sesiones simultáneas, cada una en un proceso nuevo con `carpeta` como directorio de trabajo."""
+    # Las funciones se pasan por su módulo y no por `__main__`, que `AppTest` reemplaza en los procesos de sesión.
+    from benchmarks import bench_sesiones
+
+    contexto = multiprocessing.get_context("spawn")
+    inicio = contexto.Barrier(concurrencia)
+    with ProcessPoolExecutor(
+        max_workers=concurrencia, mp_context=contexto,
+        initializer=bench_sesiones._iniciar_proceso, initargs=(str(carpeta), str(Path(app).resolve()), inicio, seed),
+    ) as pool:
+        sesiones = list(pool.map(bench_sesiones._sesion_medida, [interacciones] * concurrencia, range(seed + 1, seed + 1 + concurrencia)))
+
+    total_s = max(s["hasta"] for s in sesiones) - min(s["desde"] for s in sesiones)
+    latencias = np.concatenate([s["latencias"] for s in sesiones])
+    ejecuciones = sum(len(s["latencias"]) + 1 for s in sesiones)
+    p50, p90, p99 = np.percentile(latencias, [50, 90, 99]) if len(latencias) else (np.nan,) * 3
+    return {
+        "sesiones": concurrencia,
+        "ejecuciones": ejecuciones,
+        "primera_p50_s": round(float(np.median([s["primera_s"] for s in sesiones])), 3),
+        "p50_s": round(float(p50), 3),
+        "p90_s": round(float(p90), 3),
+        "p99_s": round(float(p99), 3),
+        "max_s": round(float(latencias.max()), 3) if len(latencias) else np.nan,
+        "ejecuciones_por_s": round(ejecuciones / total_s, 2),
+        "rss_mb": round(float(np.mean([s["rss_mb"] for s in sesiones])), 1),
+        "crecimiento_mb": round(float(np.mean([s["crecimiento_mb"] for s in sesiones])), 2),
+        "excepciones": sum(s["excepciones"] for s in sesiones),
+    }
+
+
+def medir(carpeta, niveles, interacciones: int, app=APP, seed: int = 0) -> pd.DataFrame:
+    """Mide cada nivel de concurrencia con procesos nuevos (memoria y cachés de proceso limpias)."""
+    resultados = []
+    for n in niveles:
+        resultados.append(medir_nivel(carpeta, n, interacciones, app, seed))
+        print(resultados[-1], flush=True)
+    return pd.DataFrame(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia, rendimiento y memoria de la app con sesiones concurrentes.")
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 2, 4, 8], help="Sesiones simultáneas de cada nivel")
+    parser.add_argument("--interacciones", type=int, default=10, help="Interacciones por sesión después de la primera carga")
+    parser.add_argument("--filas", type=int, default=100_000, help="Anuncios sintéticos de la data de prueba")
+    parser.add_argument("--carpeta", help="Directorio de trabajo con data/ (p. ej. la data real); si no, data sintética")
+    parser.add_argument("--app", default=str(APP), help="Script de la app (p. ej. el de otra versión, para comparar)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", help="CSV donde guardar los resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = args.carpeta
+        if carpeta is None:
+            carpeta = tmp
+            (Path(tmp) / "data").mkdir()
+            generar_anuncios(args.filas).to_csv(Path(tmp) / "data" / "data_alquiler_venta.csv", sep="|", index=False, encoding="utf-8")
+        tabla = medir(carpeta, args.concurrencia, args.interacciones, args.app, args.seed)
+
+    print()
+    print(tabla.to_string(index=False))
+    if args.salida:
+        tabla.to_csv(args.salida, index=False)
@@ -0,0 +1,170 @@
+## Proyecto a Donde Vivir - Búsqueda por palabras
+## ==============================================
+##
+## Índice invertido sobre `caracteristica` y `direccion`, construido una sola vez por
+## carga de data: para cada término (en minúsculas, sin tildes ni signos y con las
+## abreviaturas de calle unificadas, ver `deduplicacion.ABREVIATURAS`) las posiciones
+## de fila donde aparece, ordenadas. Una búsqueda de varios términos es la intersección
+## de esas listas, que se combina con los filtros de las pestañas intersectando también
+## sus posiciones.
+
+import numpy as np
+import pandas as pd
+
+from deduplicacion import ABREVIATURAS
+
+
+# Columnas de texto indexadas.
+COLUMNAS_BUSQUEDA = ["caracteristica", "direccion"]
+
+# Los términos más largos (p. ej. enlaces pegados en la descripción) no se indexan.
+MAX_LARGO_TERMINO = 30
+
+_ABREVIATURA_DE = {variante: corta for corta, variantes in ABREVIATURAS.items() for variante in variantes}
+
+
+def _palabras(textos: pd.Series) -> pd.Series:
+    """Palabras de cada texto en minúsculas, sin tildes ni signos, una por fila (índice = el de `textos`)."""
+    return (
+        textos.fillna("").astype(str)
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.split()
+        .explode()
+        .dropna()
+    )
+
+
+def _terminos(textos: pd.Series) -> pd.Series:
+    """Términos normalizados de cada texto, uno por fila (índice = el de `textos`, en el mismo orden)."""
+    terminos = _palabras(textos)
+    # Las abreviaturas y el largo se resuelven por término distinto, no por aparición.
+    codigos, unicos = pd.factorize(terminos)
+    unicos = pd.Series(unicos, dtype=object).map(lambda t: _ABREVIATURA_DE.get(t, t))
+    valido = ((unicos.str.len() > 0) & (unicos.str.len() <= MAX_LARGO_TERMINO)).to_numpy()[codigos]
+    return pd.Series(unicos.to_numpy()[codigos[valido]], index=terminos.index[valido], dtype=object)
+
+
+def _unicos_ordenados(x: np.ndarray) -> np.ndarray:
+    """Como `np.unique(x)` para enteros, pero con un `sort` (más rápido que el camino por hash de NumPy)."""
+    x = np.sort(x)
+    return x[np.r_[True, x[1:] != x[:-1]]] if len(x) else x
+
+
+def terminos_consulta(consulta: str) -> list:
+    """
+    Términos de una consulta, normalizados como los del índice. Cada término es una lista de alternativas
+    (texto, como_prefijo); una fila cumple el término si cumple alguna.
+
+    Las palabras completas (todas menos la última) llevan las abreviaturas unificadas, como en el índice,
+    y se omiten las que el índice no guarda ("nro", "no"...). La última puede estar a medio escribir: se
+    busca tal cual como prefijo ("ca" sigue encontrando "casa", no solo "calle") y, si es una variante de
+    abreviatura ("avenida"), también su forma unificada como palabra completa. La última nunca se omite.
+    """
+    palabras = list(dict.fromkeys(_palabras(pd.Series([consulta]))))
+    terminos = []
+    for palabra in palabras[:-1]:
+        termino = _ABREVIATURA_DE.get(palabra, palabra)
+        if termino and [(termino, True)] not in terminos:
+            terminos.append([(termino, True)])
+    if palabras:
+        ultima = palabras[-1]
+        alternativas = [(ultima, True)]
+        if _ABREVIATURA_DE.get(ultima, ultima) not in ("", ultima):
+            alternativas.append((_ABREVIATURA_DE[ultima], False))
+        terminos.append(alternativas)
+    return terminos
+
+
+def construir_indice_busqueda(df: pd.DataFrame, columnas=COLUMNAS_BUSQUEDA) -> dict:
+    """
+    Construye el índice invertido sobre las `columnas` de texto de `df`.
+    Devuelve un dict de arrays de solo lectura: `vocabulario` (términos ordenados), `pos` (posiciones de
+    fila de cada término, concatenadas en el orden del vocabulario y ordenadas dentro de cada término) y
+    `limites` (inicio del tramo de cada término en `pos`, más el final del último).
+    """
+    n = max(len(df), 1)
+    partes_fila, partes_termino, vocabularios = [], [], []
+    for col in columnas:
+        if col not in df.columns:
+            continue
+        # Cada texto distinto se procesa una sola vez (las características se repiten mucho).
+        codigos, unicos = pd.factorize(df[col].astype(object))
+        terminos = _terminos(pd.Series(unicos, dtype=object))
+        id_termino, vocabulario = pd.factorize(terminos)
+        texto = terminos.index.to_numpy(dtype=np.int64)
+        # Para cada fila, los términos de su texto: se expanden los tramos de `terminos` (ordenados por texto).
+        inicio = np.searchsorted(texto, np.arange(len(unicos)), side="left")
+        cantidad = np.bincount(texto, minlength=len(unicos))
+        con_texto = np.flatnonzero(codigos >= 0)
+        por_fila = cantidad[codigos[con_texto]]
+        desfase = np.arange(por_fila.sum()) - np.repeat(np.cumsum(por_fila) - por_fila, por_fila)
+        partes_fila.append(np.repeat(con_texto, por_fila))
+        partes_termino.append(id_termino[np.repeat(inicio[codigos[con_texto]], por_fila) + desfase])
+        vocabularios.append(np.asarray(vocabulario, dtype=str))
+
+    vocabulario = np.sort(pd.unique(np.concatenate(vocabularios))) if vocabularios else np.empty(0, dtype="U1")
+    if len(vocabulario):
+        # Ids de cada columna -> ids del vocabulario común.
+        id_termino = np.concatenate([
+            np.searchsorted(vocabulario, voc)[ids] for voc, ids in zip(vocabularios, partes_termino)
+        ]).astype(np.int64)
+        # Un par (término, fila) por llave: ordenadas quedan agrupadas por término.
+        llave = _unicos_ordenados(id_termino * n + np.concatenate(partes_fila))
+        pos, id_termino = (llave % n).astype(np.int32), llave // n
+    else:
+        pos, id_termino = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+
+    indice = {
+        "vocabulario": vocabulario,
+        "pos": pos,
+        "limites": np.searchsorted(id_termino, np.arange(len(vocabulario) + 1)).astype(np.int64),
+    }
+    for arr in indice.values():
+        arr.setflags(write=False)
+    return indice
+
+
+def _posiciones_termino(indice: dict, termino: str, como_prefijo: bool = True) -> np.ndarray:
+    """
+    Posiciones de las filas con algún término que empieza con `termino` (así se puede buscar mientras se
+    escribe), o solo con `termino` si `como_prefijo` es False.
+    """
+    # Los términos son ASCII: "\x7f" es mayor que cualquier carácter que pueda seguir al prefijo.
+    vocabulario = indice["vocabulario"]
+    if como_prefijo:
+        desde, hasta = np.searchsorted(vocabulario, [termino, termino + "\x7f"])
+    else:
+        desde, hasta = np.searchsorted(vocabulario, termino, side="left"), np.searchsorted(vocabulario, termino, side="right")
+    limites = indice["limites"]
+    if hasta - desde == 1:
+        return indice["pos"][limites[desde]:limites[desde + 1]]
+    return _unicos_ordenados(indice["pos"][limites[desde]:limites[hasta]])
+
+
+def buscar(indice: dict, consulta: str, dentro: np.ndarray = None) -> np.ndarray:
+    """
+    Posiciones de fila (ordenadas) que contienen todos los términos de `consulta`, cada uno como palabra
+    completa o como comienzo de una palabra. Con `dentro` (posiciones de un filtro, p. ej. las de
+    `indices.posiciones`) se devuelven solo las que además están ahí. Una consulta sin palabras (vacía
+    o solo signos) no filtra: devuelve `dentro` (o nada, si no se pasó).
+    """
+    terminos = terminos_consulta(consulta)
+    if not terminos:
+        return np.asarray(dentro) if dentro is not None else np.empty(0, dtype=np.int32)
+
+    listas = []
+    for alternativas in terminos:
+        partes = [_posiciones_termino(indice, t, como_prefijo) for t, como_prefijo in alternativas]
+        listas.append(partes[0] if len(partes) == 1 else _unicos_ordenados(np.concatenate(partes)))
+    if dentro is not None:
+        listas.append(_unicos_ordenados(np.asarray(dentro)))
+    # Se intersecta de la lista más corta a la más larga.
+    listas.sort(key=len)
+    resultado = listas[0]
+    for lista in listas[1:]:
+        if not len(resultado):
+            break
+        resultado = np.intersect1d(resultado, lista, assume_unique=True)
+    return resultado
@@ -0,0 +1,95 @@
+## Proyecto a Donde Vivir - Caché de artefactos renderizados
+## =========================================================
+##
+## Caché LRU acotada por memoria para mapas de Folium y figuras de Plotly.
+## La llave es un hash del estado de los filtros más la versión de la data, así
+## que cambiar un widget que no afecta al artefacto no obliga a reconstruirlo.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def clave_artefacto(nombre: str, version: str, *filtros) -> str:
+    """Llave estable para un artefacto: hash de su nombre, la versión de la data y los filtros."""
+    return hashlib.sha1(repr((nombre, version) + tuple(filtros)).encode("utf-8")).hexdigest()
+
+
+def peso_estimado(df, columnas) -> int:
+    """Bytes que ocupan en memoria las `columnas` de `df` que terminan embebidas en el artefacto."""
+    columnas = [c for c in columnas if c in df.columns]
+    return int(df[columnas].memory_usage(deep=True, index=False).sum())
+
+
+class CacheArtefactos:
+    """
+    Caché LRU acotada por el total de bytes estimados de sus entradas y, opcionalmente, por su cantidad.
+    Es segura entre hilos: Streamlit atiende cada sesión en su propio hilo.
+    Los artefactos se comparten entre sesiones y no deben modificarse después de guardarse.
+    """
+
+    def __init__(self, max_bytes: int, max_bytes_entrada: int = None, max_entradas: int = None):
+        self.max_bytes = max_bytes
+        # Una entrada más pesada que esto no se guarda, para que no desaloje a todas las demás.
+        self.max_bytes_entrada = max_bytes if max_bytes_entrada is None else min(max_bytes_entrada, max_bytes)
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # llave -> (artefacto, peso)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obtener(self, clave: str, construir, peso):
+        """
+        Devuelve el artefacto de `clave`; si no está, lo construye con `construir()` y lo guarda.
+        `peso` es el tamaño estimado en bytes (entero, o función que recibe el artefacto).
+        Un artefacto más pesado que `max_bytes_entrada` se devuelve sin guardarse.
+        """
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return self._entradas[clave][0]
+            self.misses += 1
+
+        # Se construye fuera del lock para no bloquear a las demás sesiones.
+        artefacto = construir()
+        bytes_artefacto = int(peso(artefacto) if callable(peso) else peso)
+        if bytes_artefacto > self.max_bytes_entrada:
+            return artefacto
+
+        with self._lock:
+            if clave in self._entradas:
+                self._bytes -= self._entradas.pop(clave)[1]
+            self._entradas[clave] = (artefacto, bytes_artefacto)
+            self._bytes += bytes_artefacto
+            while self._bytes > self.max_bytes or (self.max_entradas is not None and len(self._entradas) > self.max_entradas):
+                _, (_, bytes_viejo) = self._entradas.popitem(last=False)
+                self._bytes -= bytes_viejo
+                self.evictions += 1
+        return artefacto
+
+    def __contains__(self, clave: str) -> bool:
+        with self._lock:
+            return clave in self._entradas
+
+    def limpiar(self):
+        """Elimina todas las entradas (los contadores se conservan)."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> dict:
+        """Contadores de la caché: hits, misses, evictions, entradas y bytes ocupados."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_bytes_entrada": self.max_bytes_entrada,
+                "max_entradas": self.max_entradas,
+            }
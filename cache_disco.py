@@ -0,0 +1,220 @@
+## Proyecto a Donde Vivir - Caché en disco de la data precalculada
+## ================================================================
+##
+## Guarda en disco lo que se calcula al cargar un conjunto (la data limpia, el índice de
+## filtros, el cubo de precios, los rangos de orden, los índices espacial, de
+## comparables y de búsqueda y la geometría de los distritos), en una carpeta por llave. La llave
+## es el hash del contenido del archivo fuente (y del GeoJSON de distritos, si hay), la versión del
+## código que lo procesa y el mapeo de zonas, así que un CSV nuevo (o un cambio en el código) la
+## invalida solo. La carpeta puede estar en un volumen compartido: la primera réplica
+## que carga un conjunto lo escribe y las demás (y los reinicios) mapean los archivos en
+## memoria en lugar de recalcular.
+##
+##     cache/<llave>/
+##         data.feather                     data limpia (Arrow IPC sin compresión)
+##         filtros-<nivel>.npy / .json      posiciones concatenadas + llave y tramo de cada grupo
+##         cubo-<nivel>.feather             cubo de precios
+##         rango-<columna>.npy              rangos de orden
+##         espacial-<array>.npy / .json     grilla espacial
+##         comparables-<array>.npy / .json  índice de comparables
+##         busqueda-<array>.npy / .json     índice invertido de búsqueda por palabras
+##         distritos-<array>.npy / .json    contornos simplificados de los distritos
+##
+## La carpeta se escribe en un temporal y se renombra al final, así que un lector nunca
+## ve una entrada a medias.
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from datos import leer_snapshot
+from estadisticas import NIVELES_CUBO
+from geometria import ARCHIVO_GEOMETRIA
+
+
+# Carpeta de la caché; en producción, un volumen compartido por las réplicas.
+DIRECTORIO_CACHE = os.environ.get("ADONDE_VIVIR_CACHE_DIR", "./data/cache")
+
+# Módulos cuyo código define el resultado: si cambia alguno, cambia la llave.
+MODULOS_CODIGO = [
+    "datos.py", "deduplicacion.py", "ingesta.py", "indices.py", "estadisticas.py", "espacial.py",
+    "comparables.py", "busqueda.py", "geometria.py", "conjuntos.py", "cache_disco.py",
+]
+
+_RAIZ = Path(__file__).resolve().parent
+_BLOQUE = 1 << 20
+
+
+@functools.lru_cache(maxsize=None)
+def version_codigo() -> str:
+    """Hash del código de `MODULOS_CODIGO`."""
+    h = hashlib.sha256()
+    for modulo in MODULOS_CODIGO:
+        h.update((_RAIZ / modulo).read_bytes())
+    return h.hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=64)
+def _hash_archivo(ruta: str, tamano: int, mtime_ns: int) -> str:
+    # El tamaño y la fecha son parte de la llave de lru_cache: el archivo se vuelve a leer solo si cambian.
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(_BLOQUE), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hash_contenido(ruta) -> str:
+    """
+    Hash del contenido del archivo fuente (CSV o snapshot). Para el almacén incremental se usa su
+    índice, que cambia con cada ingesta que modifica la data vigente.
+    """
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        from ingesta import ARCHIVO_INDICE
+        ruta = ruta / ARCHIVO_INDICE
+    estado = ruta.stat()
+    return _hash_archivo(str(ruta.resolve()), estado.st_size, estado.st_mtime_ns)
+
+
+def clave_cache(ruta, zonas: dict) -> str:
+    """Llave de la entrada: contenido del archivo fuente y del GeoJSON de distritos, versión del código y mapeo de zonas."""
+    partes = [hash_contenido(ruta), version_codigo(), json.dumps(zonas, sort_keys=True, ensure_ascii=False)]
+    if Path(ARCHIVO_GEOMETRIA).exists():
+        partes.append(hash_contenido(ARCHIVO_GEOMETRIA))
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()[:24]
+
+
+def _guardar_npy(carpeta: Path, nombre: str, arr: np.ndarray):
+    np.save(carpeta / f"{nombre}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+
+
+def _leer_npy(carpeta: Path, nombre: str) -> np.ndarray:
+    """Array mapeado en memoria, de solo lectura."""
+    return np.load(carpeta / f"{nombre}.npy", mmap_mode="r", allow_pickle=False)
+
+
+def _guardar_json(carpeta: Path, nombre: str, contenido):
+    with open(carpeta / f"{nombre}.json", "w", encoding="utf-8") as f:
+        json.dump(contenido, f, ensure_ascii=False)
+
+
+def _leer_json(carpeta: Path, nombre: str):
+    with open(carpeta / f"{nombre}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_indice(carpeta: Path, nombre: str, indice: dict):
+    """Guarda un índice hecho de arrays (un .npy cada uno) y valores simples (en un .json)."""
+    arrays = [k for k, v in indice.items() if isinstance(v, np.ndarray)]
+    for clave in arrays:
+        _guardar_npy(carpeta, f"{nombre}-{clave}", indice[clave])
+    _guardar_json(carpeta, nombre, {
+        "arrays": arrays,
+        "valores": {k: (list(v) if isinstance(v, tuple) else v) for k, v in indice.items() if k not in arrays},
+    })
+
+
+def _leer_indice(carpeta: Path, nombre: str) -> dict:
+    """Lee un índice escrito con `_guardar_indice`; las tuplas vuelven como listas."""
+    contenido = _leer_json(carpeta, nombre)
+    indice = {clave: _leer_npy(carpeta, f"{nombre}-{clave}") for clave in contenido["arrays"]}
+    indice.update(contenido["valores"])
+    return indice
+
+
+def guardar(carpeta, cargado: dict):
+    """
+    Escribe un conjunto precalculado (`data`, `indice_filtros`, `cubo_precios`, `rangos_orden`,
+    `indice_espacial`, `indice_comparables`, `indice_busqueda`, `geometria_distritos`, ver
+    `conjuntos.cargar_conjunto`) en `carpeta`, de forma atómica.
+    Si otra réplica ya escribió la misma entrada, se deja la suya.
+    """
+    carpeta = Path(carpeta)
+    temporal = carpeta.with_name(f"{carpeta.name}.tmp-{os.getpid()}")
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+
+    cargado["data"].to_feather(temporal / "data.feather", compression="uncompressed")
+
+    for nivel, grupos in cargado["indice_filtros"].items():
+        llaves = list(grupos)
+        tamanos = np.array([len(grupos[k]) for k in llaves], dtype=np.int64)
+        fines = np.cumsum(tamanos)
+        posiciones = np.concatenate([grupos[k] for k in llaves]) if llaves else np.empty(0, dtype=np.intp)
+        _guardar_npy(temporal, f"filtros-{nivel}", posiciones)
+        _guardar_json(temporal, f"filtros-{nivel}", [[list(k), int(f - t), int(f)] for k, t, f in zip(llaves, tamanos, fines)])
+
+    for nivel, tabla in cargado["cubo_precios"].items():
+        tabla.reset_index().to_feather(temporal / f"cubo-{nivel}.feather", compression="uncompressed")
+
+    for col, rango in cargado["rangos_orden"].items():
+        _guardar_npy(temporal, f"rango-{col}", rango)
+    _guardar_json(temporal, "rangos", list(cargado["rangos_orden"]))
+
+    _guardar_indice(temporal, "espacial", cargado["indice_espacial"])
+    _guardar_indice(temporal, "comparables", cargado["indice_comparables"])
+    _guardar_indice(temporal, "busqueda", cargado["indice_busqueda"])
+    _guardar_indice(temporal, "distritos", cargado["geometria_distritos"])
+
+    try:
+        os.rename(temporal, carpeta)
+    except OSError:
+        # Otra réplica la escribió primero (os.rename no reemplaza una carpeta con contenido).
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def leer(carpeta) -> dict:
+    """Lee una entrada escrita con `guardar`, mapeando en memoria la data y los arrays."""
+    carpeta = Path(carpeta)
+    data = leer_snapshot(carpeta / "data.feather", columnas=None)
+
+    indice_filtros = {}
+    for archivo in sorted(carpeta.glob("filtros-*.json")):
+        nivel = archivo.stem.removeprefix("filtros-")
+        posiciones = _leer_npy(carpeta, f"filtros-{nivel}")
+        indice_filtros[nivel] = {
+            tuple(llave): posiciones[inicio:fin] for llave, inicio, fin in _leer_json(carpeta, f"filtros-{nivel}")
+        }
+
+    cubo_precios = {
+        nivel: pd.read_feather(carpeta / f"cubo-{nivel}.feather").set_index(columnas)
+        for nivel, columnas in NIVELES_CUBO.items()
+    }
+
+    rangos_orden = {col: _leer_npy(carpeta, f"rango-{col}") for col in _leer_json(carpeta, "rangos")}
+
+    indice_espacial = _leer_indice(carpeta, "espacial")
+    indice_espacial["origen"] = tuple(indice_espacial["origen"])
+
+    return {
+        "data": data,
+        "indice_filtros": indice_filtros,
+        "cubo_precios": cubo_precios,
+        "rangos_orden": rangos_orden,
+        "indice_espacial": indice_espacial,
+        "indice_comparables": _leer_indice(carpeta, "comparables"),
+        "indice_busqueda": _leer_indice(carpeta, "busqueda"),
+        "geometria_distritos": _leer_indice(carpeta, "distritos"),
+    }
+
+
+def cargar_o_construir(ruta, zonas: dict, construir, directorio=DIRECTORIO_CACHE) -> dict:
+    """
+    Devuelve la entrada de (`ruta`, `zonas`) desde la caché en disco; si no existe, la calcula con
+    `construir()` y la guarda. Las entradas de versiones anteriores quedan en disco y se pueden borrar
+    sin riesgo.
+    """
+    carpeta = Path(directorio) / clave_cache(ruta, zonas)
+    if carpeta.exists():
+        return leer(carpeta)
+    cargado = construir()
+    Path(directorio).mkdir(parents=True, exist_ok=True)
+    guardar(carpeta, cargado)
+    return cargado
@@ -0,0 +1,127 @@
+## Proyecto a Donde Vivir - Propiedades comparables
+## ================================================
+##
+## Índice de características para buscar, dada una propiedad, las más parecidas de su
+## misma (inmueble, operacion): cercanas en área, dormitorios, baños, estacionamientos y
+## ubicación. Se construye una sola vez por carga de data como una matriz normalizada
+## (float32) con las filas de cada (inmueble, operacion) contiguas; una consulta es un
+## producto matriz-vector sobre el tramo de su grupo y un `argpartition`, sin tocar el
+## DataFrame.
+
+import numpy as np
+import pandas as pd
+
+from espacial import METROS_POR_GRADO
+
+
+# Columnas numéricas que se comparan (además de la ubicación).
+COLUMNAS_COMPARABLES = ["area", "dormitorio", "baños", "estacionamientos"]
+
+# Peso de cada dimensión en la distancia, ya normalizadas: el área y la ubicación pesan más.
+PESOS = {"area": 2.0, "dormitorio": 1.0, "baños": 1.0, "estacionamientos": 0.5, "ubicacion": 2.0}
+
+# Kilómetros que equivalen a una desviación estándar de las demás dimensiones.
+ESCALA_UBICACION_KM = 2.0
+
+_VACIO = np.empty(0, dtype=np.intp)
+
+
+def _normalizar(x: np.ndarray) -> np.ndarray:
+    """Centra en la mediana y divide por la desviación estándar; los nulos quedan en 0 (la mediana del grupo)."""
+    conocido = ~np.isnan(x)
+    if not conocido.any():
+        return np.zeros_like(x)
+    escala = x[conocido].std()
+    z = (x - np.median(x[conocido])) / (escala if escala > 0 else 1.0)
+    return np.where(conocido, z, 0.0)
+
+
+def _matriz(df: pd.DataFrame, pos: np.ndarray) -> np.ndarray:
+    """Matriz de características (una fila por posición de `pos`) de un grupo, normalizada y ponderada."""
+    columnas = []
+    for col in COLUMNAS_COMPARABLES:
+        x = df[col].to_numpy(dtype="float64", na_value=np.nan)[pos]
+        # El área se compara en escala logarítmica: 50 m² más pesan distinto en un mini departamento que en una casa.
+        if col == "area":
+            x = np.log(np.where(x > 0, x, np.nan))
+        columnas.append(_normalizar(x) * np.sqrt(PESOS[col]))
+
+    # Ubicación en km desde el centro del grupo; las propiedades sin geolocalización quedan en el centro.
+    geo = df["geo_valido"].to_numpy(dtype=bool)[pos]
+    lat = df["lat"].to_numpy(dtype="float64")[pos]
+    lon = df["lon"].to_numpy(dtype="float64")[pos]
+    lat0, lon0 = (np.median(lat[geo]), np.median(lon[geo])) if geo.any() else (0.0, 0.0)
+    km_norte = (lat - lat0) * METROS_POR_GRADO / 1000
+    km_este = (lon - lon0) * METROS_POR_GRADO * np.cos(np.radians(lat0)) / 1000
+    for km in (km_norte, km_este):
+        columnas.append(np.where(geo, km / ESCALA_UBICACION_KM, 0.0) * np.sqrt(PESOS["ubicacion"]))
+
+    return np.column_stack(columnas).astype(np.float32)
+
+
+def construir_indice_comparables(df: pd.DataFrame) -> dict:
+    """
+    Construye el índice de comparables sobre las propiedades con área y precio positivos
+    (`precio_m2` no nulo, ver `estadisticas.agregar_columnas_precio`).
+    Devuelve un dict de arrays de solo lectura:
+    - `pos`, `matriz`, `normas`: posición de fila, características y su norma al cuadrado, con las
+      filas de cada (inmueble, operacion) contiguas;
+    - `limites`: inicio de cada grupo en esos arrays (más el final del último);
+    - `fila`: para cada posición de `df`, su fila en el índice (-1 si no está indexada).
+    """
+    valido = df["precio_m2"].notna().to_numpy()
+    grupos = df.groupby(["inmueble", "operacion"], observed=True, sort=False).indices
+
+    partes_pos, partes_matriz, limites = [], [], [0]
+    for pos in grupos.values():
+        pos = pos[valido[pos]]
+        if len(pos):
+            partes_pos.append(pos)
+            partes_matriz.append(_matriz(df, pos))
+            limites.append(limites[-1] + len(pos))
+
+    pos = np.concatenate(partes_pos) if partes_pos else _VACIO
+    matriz = np.concatenate(partes_matriz) if partes_matriz else np.empty((0, len(COLUMNAS_COMPARABLES) + 2), dtype=np.float32)
+    fila = np.full(len(df), -1, dtype=np.int32)
+    fila[pos] = np.arange(len(pos), dtype=np.int32)
+
+    indice = {
+        "pos": pos,
+        "matriz": matriz,
+        "normas": np.einsum("ij,ij->i", matriz, matriz),
+        "limites": np.asarray(limites, dtype=np.int64),
+        "fila": fila,
+    }
+    for arr in indice.values():
+        arr.setflags(write=False)
+    return indice
+
+
+def comparables(indice: dict, posicion: int, k: int = 10):
+    """
+    Las `k` propiedades más parecidas a la de la fila `posicion` (misma inmueble y operación), de la más
+    a la menos parecida. Devuelve (posiciones de fila, distancias en unidades normalizadas); vacío si la
+    propiedad no está indexada (sin área o precio).
+    """
+    i = int(indice["fila"][posicion])
+    if i < 0:
+        return _VACIO, np.empty(0)
+    grupo = np.searchsorted(indice["limites"], i, side="right") - 1
+    inicio, fin = int(indice["limites"][grupo]), int(indice["limites"][grupo + 1])
+    k = min(k, fin - inicio - 1)
+    if k <= 0:
+        return _VACIO, np.empty(0)
+
+    # |a - b|² = |a|² - 2·a·b + |b|²: un producto matriz-vector sobre el tramo del grupo.
+    d2 = indice["normas"][inicio:fin] - 2 * (indice["matriz"][inicio:fin] @ indice["matriz"][i]) + indice["normas"][i]
+    d2[i - inicio] = np.inf
+    cand = np.argpartition(d2, k - 1)[:k]
+    cand = cand[np.argsort(d2[cand], kind="stable")]
+    return indice["pos"][inicio + cand], np.sqrt(np.maximum(d2[cand], 0))
+
+
+def precio_vs_comparables(precios: np.ndarray, posicion: int, pos: np.ndarray):
+    """(precio de la propiedad, mediana del precio de sus comparables `pos`, diferencia relativa entre ambos)."""
+    precio = float(precios[posicion])
+    referencia = float(np.nanmedian(precios[pos])) if len(pos) else np.nan
+    return precio, referencia, precio / referencia - 1 if referencia > 0 else np.nan
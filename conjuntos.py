@@ -0,0 +1,105 @@
+## Proyecto a Donde Vivir - Conjuntos de datos
+## ===========================================
+##
+## Registro de los conjuntos de datos que sirve la app (ciudades, snapshots históricos),
+## cada uno con su archivo y su propio mapeo de distritos a zonas, y carga de un
+## conjunto junto con todas sus estructuras derivadas (índices, cubo de precios...).
+##
+## Además del conjunto por defecto (Lima), se pueden registrar otros en
+## `data/conjuntos.json`:
+##
+##     {
+##         "lima-2025-07": {"nombre": "Lima - julio 2025", "ruta": "./data/historico/2025-07.csv"},
+##         "arequipa": {"nombre": "Arequipa", "ruta": "./data/arequipa.csv",
+##                      "zonas": {"Centro": ["Arequipa", "Yanahuara"], "Sur": ["Socabaya"]}}
+##     }
+##
+## Si un conjunto no define `zonas`, usa las de Lima.
+##
+## Las estructuras derivadas se guardan en la caché en disco (ver `cache_disco`), así que
+## solo la primera réplica que carga una versión del archivo las calcula.
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cache_disco
+from busqueda import construir_indice_busqueda
+from comparables import construir_indice_comparables
+from datos import ZONAS_LIMA, cargar_datos, ruta_datos, version_datos
+from espacial import construir_indice_espacial
+from estadisticas import agregar_columnas_precio, construir_cubo_precios
+from geometria import construir_geometria_distritos
+from indices import construir_indice_filtros, construir_rangos
+
+
+CONJUNTO_POR_DEFECTO = "lima"
+
+CONJUNTOS = {
+    CONJUNTO_POR_DEFECTO: {"nombre": "Lima", "ruta": "./data/data_alquiler_venta.csv", "zonas": ZONAS_LIMA},
+}
+
+ARCHIVO_REGISTRO = "./data/conjuntos.json"
+
+
+def leer_registro(ruta=ARCHIVO_REGISTRO) -> dict:
+    """Conjuntos disponibles: los de `CONJUNTOS` más los de `ruta` (si existe). Cada uno con `nombre`, `ruta` y `zonas`."""
+    registro = {id_: dict(c) for id_, c in CONJUNTOS.items()}
+    if Path(ruta).exists():
+        with open(ruta, encoding="utf-8") as f:
+            for id_, conjunto in json.load(f).items():
+                if "ruta" not in conjunto:
+                    raise ValueError(f"El conjunto {id_!r} de {ruta} no tiene 'ruta'")
+                registro[id_] = {"nombre": id_, "zonas": ZONAS_LIMA, **conjunto}
+    return registro
+
+
+def version_conjunto(id_conjunto: str, conjunto: dict) -> str:
+    """Versión del conjunto: su id y la versión del archivo del que se lee (ver `datos.version_datos`)."""
+    return f"{id_conjunto}:{version_datos(ruta_datos(conjunto['ruta']))}"
+
+
+def cargar_conjunto(id_conjunto: str, conjunto: dict) -> dict:
+    """
+    Carga la data del conjunto y sus estructuras derivadas, desde la caché en disco si ya están
+    (ver `cache_disco.cargar_o_construir`). Devuelve un dict con `data`, `zonas`, `version`,
+    `indice_filtros`, `cubo_precios`, `rangos_orden`, `indice_espacial`, `indice_comparables`,
+    `indice_busqueda` y `geometria_distritos`.
+    Todo es de solo lectura: se comparte entre sesiones.
+    """
+    ruta = str(ruta_datos(conjunto["ruta"]))
+    cargado = cache_disco.cargar_o_construir(ruta, conjunto["zonas"], lambda: construir_conjunto(ruta, conjunto["zonas"]))
+    return {**cargado, "zonas": conjunto["zonas"], "version": version_conjunto(id_conjunto, conjunto)}
+
+
+def construir_conjunto(ruta: str, zonas: dict) -> dict:
+    """Lee la data de `ruta` y calcula sus estructuras derivadas, sin pasar por la caché en disco."""
+    data = agregar_columnas_precio(cargar_datos(ruta, zonas=zonas))
+    return {
+        "data": data,
+        "indice_filtros": construir_indice_filtros(data),
+        "cubo_precios": construir_cubo_precios(data),
+        "rangos_orden": construir_rangos(data),
+        "indice_espacial": construir_indice_espacial(data),
+        "indice_comparables": construir_indice_comparables(data),
+        "indice_busqueda": construir_indice_busqueda(data),
+        "geometria_distritos": construir_geometria_distritos(data),
+    }
+
+
+def _bytes(objeto) -> int:
+    """Bytes aproximados de un objeto de un conjunto cargado (DataFrames, arrays y dicts de ellos)."""
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(deep=True, index=True).sum())
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, dict):
+        return sum(_bytes(v) for v in objeto.values())
+    return 0
+
+
+def peso_conjunto(cargado: dict) -> int:
+    """Bytes en memoria de un conjunto cargado con `cargar_conjunto`, para la caché acotada por memoria."""
+    return _bytes(cargado)
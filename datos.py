@@ -0,0 +1,239 @@
+## Proyecto a Donde Vivir - Capa de datos
+## ======================================
+##
+## Limpieza de la data scrapeada y construcción del snapshot columnar que lee la app.
+## El snapshot (Arrow/Feather) guarda la data ya deduplicada (un anuncio por inmueble), con tipos compactos,
+## categóricas y los rangos (`*_agp`) precalculados, de modo que cada réplica
+## solo tenga que mapear el archivo en memoria al arrancar.
+##
+## Uso:
+##     python datos.py ./data/data_alquiler_venta.csv ./data/data_alquiler_venta.feather
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from deduplicacion import asignar_clusters
+
+
+## ==================##
+##    Constantes     ##
+## ==================##
+
+# Segmentación de los distritos en zonas de Lima.
+ZONAS_LIMA = {
+    'Lima Top': ['Miraflores', 'San Isidro', 'La Molina', 'Santiago de Surco', 'San Borja', 'Barranco'],
+    'Lima Moderna': ['Jesús María', 'Lince', 'Magdalena', 'San Miguel', 'Pueblo Libre', 'Surquillo'],
+    'Lima Centro': ['Lima Cercado', 'Breña', 'La Victoria', 'Rímac', 'San Luis'],
+    'Lima Este': ['Ate Vitarte', 'Cieneguilla', 'Chaclacayo', 'Chosica Lurigancho', 'Santa Anita', 'El Agustino', 'San Juan de Lurigancho'],
+    'Lima Norte': ['Carabayllo', 'Comas', 'Independencia', 'Los Olivos', 'Puente Piedra', 'San Martín de Porres', 'Ancón', 'Santa Rosa'],
+    'Lima Sur': ['Chorrillos', 'Lurín', 'Pachacámac', 'San Juan de Miraflores', 'Villa El Salvador', 'Villa María del Triunfo', 'Pucusana', 'Punta Hermosa', 'Punta Negra', 'San Bartolo', 'Santa María del Mar']
+}
+
+# Bins y labels para precio de alquiler (Soles)
+BINS_ALQUILER = [-1, 1000, 2500, 5000, 10000, float('inf')]
+LABELS_ALQUILER = ["Hasta S/ 1000", "De S/ 1000 a S/ 2500", "De S/ 2500 a S/ 5000", "De S/ 5000 a S/ 10000", "De S/ 10000 a más"]
+
+# Bins y labels para precio de venta (Dólares)
+BINS_VENTA = [-1, 50000, 100000, 200000, 500000, float('inf')]
+LABELS_VENTA = ["Hasta $ 50k", "De $ 50k a $ 100k", "De $ 100k a $ 200k", "De $ 200k a $ 500k", "De $ 500k a más"]
+
+# Bins y labels para área (m²)
+BINS_AREA = [-1, 50, 100, 200, 300, float('inf')]
+LABELS_AREA = ["Hasta 50m2", "De 50m2 a 100m2", "De 100m2 a 200m2", "De 200m2 a 300m2", "De 300m2 a más"]
+
+# Estados de geocodificación que consideramos válidos para el mapa.
+STATUS_VALIDOS = {'geo', 'ok', 'geocoded', 'found'}
+
+# Conteos chicos (0 a unas decenas): se guardan con el entero más chico que alcance (ver `_entero_compacto`).
+COLUMNAS_CONTEO = ['dormitorio', 'baños', 'estacionamientos']
+
+# Columnas de texto con pocos valores distintos: se guardan como categóricas.
+COLUMNAS_CATEGORICAS = ['distrito_oficial', 'inmueble', 'operacion', 'fuente', 'status']
+
+# Columnas que usa la app. Al leer el snapshot solo se cargan estas (proyección de columnas).
+COLUMNAS_APP = [
+    'enlace', 'fuente', 'direccion', 'direccion_fix', 'distrito_oficial', 'distrito_categoria',
+    'inmueble', 'operacion', 'precio_pen', 'precio_usd', 'area', 'dormitorio', 'baños',
+    'estacionamientos', 'mantenimiento', 'caracteristica', 'status', 'lat', 'lon', 'geo_valido',
+    'precio_alquiler_agp', 'precio_venta_agp', 'area_agp', 'estacionamiento_gp',
+]
+
+
+## ==================##
+##    Funciones      ##
+## ==================##
+
+def leer_csv(path) -> pd.DataFrame:
+    """Lee el CSV scrapeado (separado por '|')."""
+    return pd.read_csv(path, sep="|", encoding="utf-8")
+
+
+def deduplicar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja un anuncio por inmueble. El mismo inmueble aparece en múltiples fuentes (ej. Urbania y Adondevivir)
+    con la dirección escrita de otra forma: se agrupan en clusters (ver `deduplicacion`) y se mantiene el
+    primer anuncio de cada uno, con la cantidad de publicaciones que representa.
+    """
+    df = df.reset_index(drop=True)
+    df['cluster_id'] = asignar_clusters(df)
+    df['n_publicaciones'] = df.groupby('cluster_id')['cluster_id'].transform('size').astype('int16')
+    return df.loc[df['cluster_id'].to_numpy() == np.arange(len(df))].reset_index(drop=True)
+
+
+def asignar_zonas(df: pd.DataFrame, zonas: dict = ZONAS_LIMA) -> pd.DataFrame:
+    """
+    Calcula `distrito_categoria` (la zona de cada distrito según `zonas`, {zona: [distritos]};
+    'Otra Zona' si el distrito no está). Agrega la columna sobre el mismo `df`.
+    """
+    # Se crea un mapeo inverso (distrito -> zona) para una asignación eficiente.
+    distrito_a_zona = {distrito: zona for zona, distritos_en_zona in zonas.items() for distrito in distritos_en_zona}
+    zona = df['distrito_oficial'].astype(object).map(distrito_a_zona).fillna('Otra Zona')
+    df['distrito_categoria'] = pd.Categorical(zona, categories=[*zonas, 'Otra Zona'])
+    return df
+
+
+def _entero_compacto(serie: pd.Series) -> pd.Series:
+    """
+    Convierte un conteo al entero más chico que alcance (int8 para dormitorios o baños); si tiene
+    nulos, a float32, que ocupa la mitad que el float64 de pandas y sigue aceptando NaN.
+    """
+    valores = pd.to_numeric(serie, errors='coerce')
+    if valores.isna().any():
+        return valores.astype('float32')
+    return pd.to_numeric(valores, downcast='integer')
+
+
+def preparar_filas(df: pd.DataFrame, zonas: dict = ZONAS_LIMA) -> pd.DataFrame:
+    """
+    Precalcula las columnas derivadas que dependen solo de cada fila: zona del distrito (según `zonas`),
+    rangos de precio/área, estacionamiento y validez de la geolocalización.
+    Al no mirar otras filas, se puede aplicar solo a los anuncios nuevos de una ingesta incremental.
+    Agrega las columnas sobre el mismo `df`.
+    """
+    # --- Categoría de Distrito ---
+    asignar_zonas(df, zonas)
+
+    # Columnas numéricas
+    df['precio_pen'] = pd.to_numeric(df['precio_pen'], errors='coerce')
+    df['precio_usd'] = pd.to_numeric(df['precio_usd'], errors='coerce')
+    df['area'] = pd.to_numeric(df['area'], errors='coerce').astype('float32')
+    for col in COLUMNAS_CONTEO:
+        if col in df.columns:
+            df[col] = _entero_compacto(df[col])
+
+    # Rangos de precio y área, que se usarán en los filtros de las pestañas.
+    df['precio_alquiler_agp'] = pd.cut(df['precio_pen'], bins=BINS_ALQUILER, labels=LABELS_ALQUILER, right=False)
+    df['precio_venta_agp'] = pd.cut(df['precio_usd'], bins=BINS_VENTA, labels=LABELS_VENTA, right=False)
+    df['area_agp'] = pd.cut(df['area'], bins=BINS_AREA, labels=LABELS_AREA, right=False)
+
+    ## Estacionamiento
+    df['estacionamiento_gp'] = pd.Categorical(
+        np.where(df['estacionamientos'] > 0, "Si", "No"), categories=["No", "Si"]
+    )
+
+    ## Geolocalización válida (status reconocido y coordenadas presentes)
+    df['geo_valido'] = (
+        df['status'].astype(str).str.lower().isin(STATUS_VALIDOS) &
+        df['lat'].notna() &
+        df['lon'].notna()
+    )
+
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def preparar_datos(df: pd.DataFrame, zonas: dict = ZONAS_LIMA) -> pd.DataFrame:
+    """
+    Limpia la data scrapeada y precalcula las columnas derivadas que usa la app:
+    deduplicación, zona del distrito, rangos de precio/área, estacionamiento y
+    validez de la geolocalización. Devuelve un DataFrame con tipos compactos.
+    """
+    return preparar_filas(deduplicar(df), zonas)
+
+
+def construir_snapshot(ruta_csv, ruta_snapshot, zonas: dict = ZONAS_LIMA) -> pd.DataFrame:
+    """Convierte el CSV scrapeado en un snapshot Feather (Arrow IPC) sin compresión, listo para mapear en memoria."""
+    df = preparar_datos(leer_csv(ruta_csv), zonas)
+    # Sin compresión para que la lectura pueda usar memory mapping sin descomprimir.
+    df.to_feather(ruta_snapshot, compression="uncompressed")
+    return df
+
+
+def leer_snapshot(ruta, columnas=COLUMNAS_APP) -> pd.DataFrame:
+    """
+    Lee el snapshot con proyección de columnas y memory mapping.
+    Solo se cargan las columnas de `columnas` que existan en el archivo.
+    """
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+
+    if columnas is not None:
+        with ipc.open_file(ruta) as reader:
+            disponibles = set(reader.schema.names)
+        columnas = [c for c in columnas if c in disponibles]
+
+    tabla = feather.read_table(ruta, columns=columnas, memory_map=True)
+    return tabla.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def ruta_datos(ruta_csv) -> Path:
+    """
+    Devuelve, en orden de preferencia: el almacén incremental junto al CSV (carpeta `almacen`, ver
+    `ingesta.py`) si ya tiene alguna ingesta; el snapshot asociado al CSV (misma ruta con extensión
+    .feather) si existe y no es más antiguo que el CSV; o el propio CSV.
+    """
+    from ingesta import ARCHIVO_INDICE
+
+    ruta_csv = Path(ruta_csv)
+    almacen = ruta_csv.parent / "almacen"
+    if (almacen / ARCHIVO_INDICE).exists():
+        return almacen
+    ruta_snapshot = ruta_csv.with_suffix(".feather")
+    if ruta_snapshot.exists() and (
+        not ruta_csv.exists() or ruta_snapshot.stat().st_mtime >= ruta_csv.stat().st_mtime
+    ):
+        return ruta_snapshot
+    return ruta_csv
+
+
+def version_datos(path) -> str:
+    """Versión del archivo de datos (tamaño y fecha de modificación), para invalidar cachés derivadas."""
+    if Path(path).is_dir():
+        from ingesta import version_almacen
+        return version_almacen(path)
+    estado = Path(path).stat()
+    return f"{Path(path).name}-{estado.st_size}-{estado.st_mtime_ns}"
+
+
+def cargar_datos(path, zonas: dict = None) -> pd.DataFrame:
+    """
+    Carga la data desde el almacén incremental (carpeta), un snapshot (.feather) o,
+    si se pasa un CSV, la procesa en el momento.
+    Si se pasa `zonas`, la zona de cada distrito se calcula con ese mapeo (la del snapshot o
+    del almacén se reemplaza); si no, se usa la ya guardada o, para un CSV, `ZONAS_LIMA`.
+    """
+    if Path(path).is_dir():
+        from ingesta import leer_almacen
+        df = leer_almacen(path)
+    elif Path(path).suffix == ".feather":
+        df = leer_snapshot(path)
+    else:
+        return preparar_datos(leer_csv(path), ZONAS_LIMA if zonas is None else zonas)
+    return df if zonas is None else asignar_zonas(df, zonas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye el snapshot columnar de la data de alquiler y venta.")
+    parser.add_argument("csv", nargs="?", default="./data/data_alquiler_venta.csv", help="CSV scrapeado (separado por '|')")
+    parser.add_argument("snapshot", nargs="?", default=None, help="Ruta del snapshot .feather (por defecto, junto al CSV)")
+    args = parser.parse_args()
+
+    destino = args.snapshot or Path(args.csv).with_suffix(".feather")
+    df = construir_snapshot(args.csv, destino)
+    print(f"Snapshot escrito en {destino}: {len(df):,} filas, {df.memory_usage(deep=True).sum() / 1e6:,.1f} MB en memoria")
@@ -0,0 +1,239 @@
+## Proyecto a Donde Vivir - Detección de anuncios casi duplicados
+## ===============================================================
+##
+## El mismo inmueble suele publicarse en Urbania y en Adondevivir con la dirección
+## escrita de otra forma ("Av. Larco 123" / "AVENIDA LARCO 123, Dpto 5"). Aquí:
+##
+## 1. Se normalizan las direcciones (minúsculas, sin tildes, abreviaturas unificadas) y se
+##    separan el número de la calle y el número de departamento/interior.
+## 2. Se generan pares candidatos solo dentro de bloques (distrito, operación, inmueble,
+##    dormitorios, área redondeada), nunca comparando todos contra todos.
+## 3. Se puntúa cada par de forma vectorizada (Jaccard de trigramas de la calle sobre una
+##    firma de bits, mismo número, mismo departamento, precio parecido).
+## 4. Los pares aceptados se unen en clusters: un `cluster_id` por anuncio. Un anuncio sin
+##    número o sin departamento se une solo a su mejor par, para no juntar por cadena dos
+##    edificios o dos unidades distintas ("Av. Larco 123" con "... Dpto 5" y con "... Dpto 7").
+
+import numpy as np
+import pandas as pd
+
+
+# Abreviaturas que se unifican al normalizar (texto ya sin tildes y en minúsculas).
+ABREVIATURAS = {
+    "av": ["avenida", "avda", "av"],
+    "jr": ["jiron", "jr"],
+    "calle": ["calle", "cl", "ca"],
+    "psje": ["pasaje", "psje", "pje"],
+    "urb": ["urbanizacion", "urb"],
+    "cdra": ["cuadra", "cdra"],
+    "mz": ["manzana", "mz"],
+    "lt": ["lote", "lt"],
+    "": ["nro", "numero", "no", "n"],
+}
+_ABREVIATURA_DE = {variante: corta for corta, variantes in ABREVIATURAS.items() for variante in variantes}
+_PATRON_ABREVIATURAS = r"\b(" + "|".join(sorted(_ABREVIATURA_DE, key=len, reverse=True)) + r")\b"
+
+# Número de departamento / interior / piso: distingue unidades de un mismo edificio.
+_PATRON_UNIDAD = r"\b(?:departamento|depa|dpto|dep|dto|interior|int|oficina|of|piso)\s*(\w+)"
+
+BITS_FIRMA = 128
+TOLERANCIA_AREA = 5        # ancho (m²) de los bloques de área
+UMBRAL_JACCARD = 0.6       # similitud mínima de la calle
+TOLERANCIA_PRECIO = 0.15   # diferencia relativa máxima de precio
+MAX_BLOQUE = 32            # bloques más grandes se subdividen por número de calle
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalizar_direcciones(direccion: pd.Series) -> pd.DataFrame:
+    """
+    Normaliza las direcciones de forma vectorizada (cada dirección distinta se procesa una sola vez).
+    Devuelve un DataFrame con `calle` (texto sin números ni unidad), `numero` y `unidad`
+    (texto, vacío si no hay).
+    """
+    codigos, unicas = pd.factorize(direccion.fillna("").astype(str))
+    texto = (
+        pd.Series(unicas, dtype=object)
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^\w\s]", " ", regex=True)
+    )
+    unidad = texto.str.extract(_PATRON_UNIDAD, expand=False).fillna("")
+    texto = texto.str.replace(_PATRON_UNIDAD, " ", regex=True)
+    texto = texto.str.replace(_PATRON_ABREVIATURAS, lambda m: _ABREVIATURA_DE[m.group(1)], regex=True)
+
+    numero = texto.str.extract(r"\b(\d+)\b", expand=False).fillna("")
+    calle = texto.str.replace(r"\d+", " ", regex=True).str.split().str.join(" ").fillna("")
+    unicas = pd.DataFrame({"calle": calle, "numero": numero, "unidad": unidad})
+    return unicas.take(codigos).set_axis(direccion.index)
+
+
+def firmas_trigramas(textos: pd.Series, bits: int = BITS_FIRMA) -> np.ndarray:
+    """
+    Firma de bits de los trigramas de cada texto (un bit por trigrama, por hash).
+    Devuelve una matriz (n, bits // 64) de uint64; el Jaccard de dos firmas aproxima el de sus trigramas.
+    """
+    palabras = bits // 64
+    firmas = np.zeros((len(textos), palabras), dtype=np.uint64)
+    trigramas = pd.Series(
+        [[t[i:i + 3] for i in range(len(t) - 2)] for t in (" " + textos + " ")],
+    ).explode().dropna()
+    if trigramas.empty:
+        return firmas
+
+    fila = trigramas.index.to_numpy()
+    bit = pd.util.hash_array(trigramas.to_numpy(dtype=object)) % np.uint64(bits)
+    np.bitwise_or.at(firmas, (fila, (bit // 64).astype(np.intp)), np.uint64(1) << (bit % np.uint64(64)))
+    return firmas
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    """Cantidad de bits en 1 por fila de una matriz de uint64."""
+    return _POPCOUNT8[x.view(np.uint8)].reshape(len(x), -1).sum(axis=1)
+
+
+def _pares_candidatos(claves: pd.DataFrame) -> np.ndarray:
+    """Pares (i, j), i < j, de posiciones que comparten todas las columnas de `claves`."""
+    grupo = claves.groupby(list(claves.columns), sort=False, dropna=False).ngroup().to_numpy()
+    orden = np.argsort(grupo, kind="stable")
+    grupo_ord = grupo[orden]
+    inicios = np.flatnonzero(np.r_[True, grupo_ord[1:] != grupo_ord[:-1]])
+    tamanos = np.diff(np.r_[inicios, len(grupo_ord)])
+
+    pares = []
+    # Solo grupos de al menos 2; se agrupan por tamaño para armar los pares sin un bucle por bloque.
+    for k in np.unique(tamanos[tamanos > 1]):
+        bases = inicios[tamanos == k]
+        i, j = np.triu_indices(k, 1)
+        pares.append(np.stack([orden[(bases[:, None] + i).ravel()], orden[(bases[:, None] + j).ravel()]], axis=1))
+    if not pares:
+        return np.empty((0, 2), dtype=np.intp)
+    return np.concatenate(pares)
+
+
+def _componentes(n: int, pares: np.ndarray) -> np.ndarray:
+    """Componentes conexas de los pares: etiqueta de cada nodo = menor posición de su componente."""
+    etiqueta = np.arange(n)
+    if len(pares) == 0:
+        return etiqueta
+    a, b = pares[:, 0], pares[:, 1]
+    while True:
+        minimo = np.minimum(etiqueta[a], etiqueta[b])
+        nueva = etiqueta.copy()
+        np.minimum.at(nueva, a, minimo)
+        np.minimum.at(nueva, b, minimo)
+        nueva = nueva[nueva]  # salto de punteros
+        if np.array_equal(nueva, etiqueta):
+            return etiqueta
+        etiqueta = nueva
+
+
+def _unir_compatibles(etiqueta: np.ndarray, a: np.ndarray, b: np.ndarray, *campos) -> np.ndarray:
+    """
+    Une, en el orden dado, los componentes (`etiqueta` = menor posición de cada uno) de cada par (a, b),
+    salvo que tengan valores no vacíos distintos en alguno de los `campos` (un array por nodo, iguales
+    dentro de cada componente). El componente unido toma los valores no vacíos de ambos.
+    """
+    padre, valores = {}, {}
+
+    def raiz(x):
+        while padre.get(x, x) != x:
+            padre[x] = padre.get(padre[x], padre[x])
+            x = padre[x]
+        return x
+
+    for x, y in zip(a, b):
+        rx, ry = raiz(etiqueta[x]), raiz(etiqueta[y])
+        if rx == ry:
+            continue
+        vx = valores.get(rx, tuple(c[rx] for c in campos))
+        vy = valores.get(ry, tuple(c[ry] for c in campos))
+        if any(p and q and p != q for p, q in zip(vx, vy)):
+            continue
+        r, otra = min(rx, ry), max(rx, ry)
+        padre[otra] = r
+        valores[r] = tuple(p or q for p, q in zip(vx, vy))
+
+    if not padre:
+        return etiqueta
+    etiqueta = etiqueta.copy()
+    unidas = np.isin(etiqueta, np.fromiter(padre, dtype=etiqueta.dtype))
+    etiqueta[unidas] = [raiz(x) for x in etiqueta[unidas]]
+    return etiqueta
+
+
+def asignar_clusters(df: pd.DataFrame) -> pd.Series:
+    """
+    Agrupa los anuncios que son el mismo inmueble. Devuelve `cluster_id` (int64) por fila: la
+    posición del primer anuncio de su cluster, así que los anuncios únicos quedan en su propia posición.
+
+    Dos anuncios son el mismo inmueble si están en el mismo bloque (distrito, operación, inmueble,
+    dormitorios, área redondeada), sus calles son parecidas (Jaccard de trigramas), tienen el mismo
+    número de calle y de departamento (cuando ambos lo indican) y precios parecidos. Un cluster
+    nunca junta dos números ni dos departamentos distintos: el anuncio al que le falta uno va con
+    su mejor par.
+    """
+    n = len(df)
+    if n == 0:
+        return pd.Series(np.empty(0, dtype=np.int64), index=df.index, name="cluster_id")
+
+    dir_norm = normalizar_direcciones(df["direccion"]).reset_index(drop=True)
+    area = pd.to_numeric(df["area"], errors="coerce").to_numpy(dtype="float64")
+    bloque = pd.DataFrame({
+        "distrito": df["distrito_oficial"].astype(str).to_numpy(),
+        "operacion": df["operacion"].astype(str).to_numpy(),
+        "inmueble": df["inmueble"].astype(str).to_numpy(),
+        "dormitorio": pd.to_numeric(df["dormitorio"], errors="coerce").fillna(-1).to_numpy(),
+    })
+
+    # Dos grillas de área desplazadas media celda, para no separar 99 m² de 101 m².
+    candidatos = []
+    for desplazamiento in (0.0, TOLERANCIA_AREA / 2):
+        claves = bloque.assign(area=np.floor((area + desplazamiento) / TOLERANCIA_AREA))
+        tamano = claves.groupby(list(claves.columns), dropna=False)["area"].transform("size").to_numpy()
+        # Los bloques muy grandes se subdividen por número de calle.
+        claves["numero"] = np.where(tamano > MAX_BLOQUE, dir_norm["numero"].to_numpy(), "")
+        candidatos.append(_pares_candidatos(claves))
+    # Un par puede salir de ambas grillas: se quitan repetidos codificándolo como un solo entero.
+    codigo = np.unique(np.concatenate(candidatos) @ np.array([n, 1], dtype=np.int64))
+    if len(codigo) == 0:
+        return pd.Series(np.arange(n, dtype=np.int64), index=df.index, name="cluster_id")
+
+    i, j = np.divmod(codigo, n)
+    pares = np.stack([i, j], axis=1)
+
+    # Similitud de la calle (Jaccard sobre las firmas de trigramas, una firma por calle distinta).
+    cod_calle, calles = pd.factorize(dir_norm["calle"])
+    firmas = firmas_trigramas(pd.Series(calles, dtype=object))
+    fi, fj = firmas[cod_calle[i]], firmas[cod_calle[j]]
+    interseccion = _popcount(fi & fj)
+    union = _popcount(fi | fj)
+    jaccard = np.where(union > 0, interseccion / np.maximum(union, 1), 0.0)
+
+    # Número de calle y de departamento: si ambos lo indican, deben coincidir.
+    numero = dir_norm["numero"].to_numpy(dtype=object)
+    unidad = dir_norm["unidad"].to_numpy(dtype=object)
+    mismo_numero = (numero[i] == numero[j]) | (numero[i] == "") | (numero[j] == "")
+    misma_unidad = (unidad[i] == unidad[j]) | (unidad[i] == "") | (unidad[j] == "")
+
+    # Precio en la moneda de la operación.
+    precio = np.where(
+        bloque["operacion"].to_numpy() == "venta",
+        pd.to_numeric(df["precio_usd"], errors="coerce"), pd.to_numeric(df["precio_pen"], errors="coerce"),
+    )
+    dif_precio = np.abs(precio[i] - precio[j]) / np.fmax(precio[i], precio[j])
+    precio_parecido = np.isnan(dif_precio) | (dif_precio <= TOLERANCIA_PRECIO)
+
+    aceptado = (jaccard >= UMBRAL_JACCARD) & mismo_numero & misma_unidad & precio_parecido
+
+    # Primero los pares con el mismo número y departamento (vacíos incluidos): cada componente tiene
+    # un solo número y un solo departamento. Luego los pares en que a uno le falta alguno se unen de
+    # mejor a peor (mayor similitud de la calle, luego precio más parecido), solo si no juntan dos
+    # números o dos departamentos distintos.
+    igual = aceptado & (numero[i] == numero[j]) & (unidad[i] == unidad[j])
+    etiqueta = _componentes(n, pares[igual])
+    mixto = np.flatnonzero(aceptado & ~igual)
+    if len(mixto):
+        orden = mixto[np.lexsort((np.nan_to_num(dif_precio[mixto]), -jaccard[mixto]))]
+        etiqueta = _unir_compatibles(etiqueta, i[orden], j[orden], numero, unidad)
+    return pd.Series(etiqueta.astype(np.int64), index=df.index, name="cluster_id")
@@ -0,0 +1,91 @@
+## Proyecto a Donde Vivir - Índice espacial
+## ========================================
+##
+## Grilla regular sobre lat/lon de las propiedades geolocalizadas, construida una
+## sola vez por carga de data. Las posiciones de fila se guardan ordenadas por celda,
+## así que las consultas (propiedades dentro de un rectángulo o de un radio) solo
+## revisan las celdas que tocan y no toda la data.
+
+import numpy as np
+import pandas as pd
+
+
+# Lado de cada celda en grados (~550 m en Lima).
+TAMANO_CELDA = 0.005
+
+RADIO_TIERRA_M = 6_371_000
+METROS_POR_GRADO = 111_320
+
+
+def construir_indice_espacial(df: pd.DataFrame, celda: float = TAMANO_CELDA) -> dict:
+    """
+    Construye la grilla sobre las filas con `geo_valido`.
+    Devuelve un dict con las posiciones de fila (`pos`), sus coordenadas (`lat`, `lon`) y el código de
+    celda (`codigo`), todo ordenado por celda, más lo necesario para calcular celdas (`origen`,
+    `celda`, `columnas`). Los arrays son de solo lectura.
+    """
+    geo = df["geo_valido"].to_numpy(dtype=bool)
+    pos = np.flatnonzero(geo)
+    lat = df["lat"].to_numpy(dtype="float64")[pos]
+    lon = df["lon"].to_numpy(dtype="float64")[pos]
+
+    origen = (lat.min(), lon.min()) if len(pos) else (0.0, 0.0)
+    fila = np.floor((lat - origen[0]) / celda).astype(np.int64)
+    columna = np.floor((lon - origen[1]) / celda).astype(np.int64)
+    columnas = int(columna.max()) + 1 if len(pos) else 1
+    codigo = fila * columnas + columna
+
+    orden = np.argsort(codigo, kind="stable")
+    indice = {"pos": pos[orden], "lat": lat[orden], "lon": lon[orden], "codigo": codigo[orden]}
+    for arr in indice.values():
+        arr.setflags(write=False)
+    indice.update(origen=origen, celda=celda, columnas=columnas, filas=int(fila.max()) + 1 if len(pos) else 1)
+    return indice
+
+
+def _candidatos(indice: dict, sur, oeste, norte, este) -> np.ndarray:
+    """Índices (en el orden de la grilla) de los puntos de las celdas que tocan el rectángulo."""
+    lat0, lon0 = indice["origen"]
+    celda, columnas = indice["celda"], indice["columnas"]
+    f0 = max(int(np.floor((sur - lat0) / celda)), 0)
+    f1 = min(int(np.floor((norte - lat0) / celda)), indice["filas"] - 1)
+    c0 = max(int(np.floor((oeste - lon0) / celda)), 0)
+    c1 = min(int(np.floor((este - lon0) / celda)), columnas - 1)
+    if f0 > f1 or c0 > c1:
+        return np.empty(0, dtype=np.intp)
+
+    # En cada fila de la grilla, las celdas c0..c1 son un tramo contiguo de `codigo`.
+    filas = np.arange(f0, f1 + 1)
+    inicios = np.searchsorted(indice["codigo"], filas * columnas + c0, side="left")
+    fines = np.searchsorted(indice["codigo"], filas * columnas + c1, side="right")
+    return np.concatenate([np.arange(i, f) for i, f in zip(inicios, fines)])
+
+
+def en_rectangulo(indice: dict, sur, oeste, norte, este) -> np.ndarray:
+    """Posiciones de fila de las propiedades dentro del rectángulo (p. ej. la vista actual del mapa)."""
+    cand = _candidatos(indice, sur, oeste, norte, este)
+    lat, lon = indice["lat"][cand], indice["lon"][cand]
+    dentro = (lat >= sur) & (lat <= norte) & (lon >= oeste) & (lon <= este)
+    return indice["pos"][cand[dentro]]
+
+
+def distancia_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distancia en metros (haversine), vectorizada."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype="float64")) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(a))
+
+
+def cercanos(indice: dict, lat: float, lon: float, radio_m: float):
+    """
+    Propiedades a menos de `radio_m` metros de (lat, lon), de la más cercana a la más lejana.
+    Devuelve (posiciones de fila, distancias en metros).
+    """
+    dlat = radio_m / METROS_POR_GRADO
+    dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+    cand = _candidatos(indice, lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+    dist = distancia_m(lat, lon, indice["lat"][cand], indice["lon"][cand])
+    dentro = dist <= radio_m
+    cand, dist = cand[dentro], dist[dentro]
+    orden = np.argsort(dist, kind="stable")
+    return indice["pos"][cand[orden]], dist[orden]
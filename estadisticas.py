@@ -0,0 +1,139 @@
+## Proyecto a Donde Vivir - Cubo de estadísticas de precios
+## ========================================================
+##
+## Estadísticas de precio precalculadas una vez por carga de data, sobre
+## (inmueble, operacion, zona, distrito). Reemplaza los groupby con cuantiles en
+## lambdas que se recalculaban en cada interacción del usuario. También las columnas
+## por fila que dependen de esas estadísticas (precio por m², marca de atípico).
+
+import numpy as np
+import pandas as pd
+
+
+# Cuantiles del resumen por distrito: nombre de columna -> cuantil.
+CUANTILES = {"p05": 0.05, "q1": 0.25, "median": 0.5, "q3": 0.75, "p95": 0.95}
+
+COLUMNAS_CUBO = ["n", "min", "max", "p05", "q1", "median", "q3", "p95", "mean", "precio_m2", "bigote_inf", "bigote_sup"]
+
+# Largo de los bigotes del box plot, en rangos intercuartílicos (criterio de Tukey, el mismo de Plotly).
+FACTOR_BIGOTE = 1.5
+
+# Niveles del cubo: nombre -> columnas de agrupación.
+NIVELES_CUBO = {
+    "operacion": ["inmueble", "operacion"],
+    "distrito": ["inmueble", "operacion", "distrito_categoria", "distrito_oficial"],
+}
+
+# Grupos dentro de los cuales se marca un precio como atípico (ver `agregar_columnas_precio`).
+CLAVES_ATIPICO = ["inmueble", "operacion", "distrito_oficial"]
+
+
+def precio_operacion(df: pd.DataFrame) -> pd.Series:
+    """Precio en la moneda de cada operación: dólares (`precio_usd`) para venta, soles (`precio_pen`) para el resto."""
+    precio = np.where(df["operacion"] == "venta", df["precio_usd"], df["precio_pen"])
+    return pd.Series(precio, index=df.index, name="precio", dtype="float64")
+
+
+def _fuera_de_bigotes(precio: pd.Series, claves: list) -> pd.Series:
+    """
+    Marca los precios fuera de los bigotes de su grupo: [q1 - 1.5·IQR, q3 + 1.5·IQR].
+    Los precios nulos y las filas sin grupo (alguna clave nula) no se marcan.
+    """
+    agrupado = precio.groupby(claves, observed=True)
+    q1 = agrupado.transform("quantile", 0.25)
+    q3 = agrupado.transform("quantile", 0.75)
+    rango = FACTOR_BIGOTE * (q3 - q1)
+    return (precio < q1 - rango) | (precio > q3 + rango)
+
+
+def agregar_columnas_precio(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Precalcula `precio_m2` (precio de la operación por m²; nulo si el área o el precio no son
+    positivos) y `atipico` (precio fuera de los bigotes de su (inmueble, operacion, distrito_oficial),
+    los mismos límites del box plot). La marca depende de las demás filas del distrito, así que
+    se calcula sobre toda la data, una vez por carga. Agrega las columnas sobre el mismo `df`.
+    """
+    precio = precio_operacion(df)
+    area = df["area"].astype("float64")
+    df["precio_m2"] = (precio / area).round(2).where((area > 0) & (precio > 0))
+    df["atipico"] = _fuera_de_bigotes(precio, [df[c] for c in CLAVES_ATIPICO]).to_numpy()
+    return df
+
+
+def _estadisticas(precio: pd.Series, precio_m2: pd.Series, fuera: pd.Series, claves: list) -> pd.DataFrame:
+    """Agrega `precio` y `precio_m2` por `claves` con funciones vectorizadas (sin lambdas)."""
+    agrupado = precio.groupby(claves, observed=True)
+    base = agrupado.agg(["count", "min", "max", "mean"]).rename(columns={"count": "n"})
+
+    # Todos los cuantiles en una sola pasada.
+    cuantiles = agrupado.quantile(list(CUANTILES.values())).unstack()
+    cuantiles.columns = list(CUANTILES)
+
+    m2 = precio_m2.groupby(claves, observed=True).mean().round(2).rename("precio_m2")
+    return pd.concat([base, cuantiles, m2, _bigotes(precio, fuera, claves)], axis=1)[COLUMNAS_CUBO]
+
+
+def _bigotes(precio: pd.Series, fuera: pd.Series, claves: list) -> pd.DataFrame:
+    """
+    Bigotes del box plot por grupo: el menor y el mayor precio que no está `fuera`
+    de [q1 - 1.5·IQR, q3 + 1.5·IQR]. Lo que queda fuera son los valores atípicos.
+    """
+    bigotes = precio.where(~fuera).groupby(claves, observed=True).agg(["min", "max"])
+    return bigotes.set_axis(["bigote_inf", "bigote_sup"], axis=1)
+
+
+def construir_cubo_precios(df: pd.DataFrame) -> dict:
+    """
+    Construye el cubo de estadísticas de precio sobre `df` con las columnas de `agregar_columnas_precio`.
+    Devuelve un dict {nivel: DataFrame} con las columnas de `COLUMNAS_CUBO`, indexado por las
+    columnas de `NIVELES_CUBO[nivel]`. `precio_m2` es el promedio del precio por m² de las
+    propiedades con área y precio positivos.
+    """
+    precio = precio_operacion(df)
+    cubo = {}
+    for nivel, columnas in NIVELES_CUBO.items():
+        claves = [df[c] for c in columnas]
+        # Los grupos del nivel "distrito" son los de `atipico` (la zona depende del distrito).
+        fuera = df["atipico"] if nivel == "distrito" else _fuera_de_bigotes(precio, claves)
+        cubo[nivel] = _estadisticas(precio, df["precio_m2"], fuera, claves)
+    return cubo
+
+
+def resumen_distritos(cubo: dict, inmueble, operacion, zona=None) -> pd.DataFrame:
+    """Estadísticas por distrito para (inmueble, operacion), opcionalmente de una sola zona. Indexado por `distrito_oficial`."""
+    tabla = cubo["distrito"]
+    idx = tabla.index
+    mascara = (idx.get_level_values("inmueble") == inmueble) & (idx.get_level_values("operacion") == operacion)
+    if zona is not None:
+        mascara &= idx.get_level_values("distrito_categoria") == zona
+    return tabla[mascara].droplevel(["inmueble", "operacion", "distrito_categoria"])
+
+
+def estadistica_global(cubo: dict, inmueble, operacion) -> pd.Series:
+    """Estadísticas de todo (inmueble, operacion); todas NaN si no hay propiedades."""
+    tabla = cubo["operacion"]
+    if (inmueble, operacion) in tabla.index:
+        return tabla.loc[(inmueble, operacion)]
+    return pd.Series(np.nan, index=COLUMNAS_CUBO)
+
+
+def kpis_precios(precios: pd.Series, cubo: dict, inmueble, operacion) -> dict:
+    """
+    KPIs de precio de un grupo de propiedades de (inmueble, operacion): `n`, `min`, `max`, `mean` y
+    `median` de `precios` (sin nulos), y la diferencia del promedio y la mediana contra las de todo
+    (inmueble, operacion) del cubo (`delta_mean`, `delta_median`). Vacío si no hay precios.
+    """
+    precios = precios.dropna()
+    if precios.empty:
+        return {}
+    stats_global = estadistica_global(cubo, inmueble, operacion)
+    mean, median = float(precios.mean()), float(precios.median())
+    return {
+        "n": int(len(precios)),
+        "min": float(precios.min()),
+        "max": float(precios.max()),
+        "mean": mean,
+        "median": median,
+        "delta_mean": mean - float(stats_global["mean"]),
+        "delta_median": median - float(stats_global["median"]),
+    }
@@ -0,0 +1,93 @@
+## Proyecto a Donde Vivir - Filtros de las pestañas
+## ================================================
+##
+## Lógica de filtrado de las pestañas, separada del script de Streamlit para que
+## pueda usarse (y medirse) sin levantar la app.
+
+import numpy as np
+import pandas as pd
+
+
+# Valor de los selectbox que significa "no filtrar".
+TODOS = "Todos"
+
+# Columna de rango de precio según la operación.
+COLUMNA_RANGO_PRECIO = {"alquiler": "precio_alquiler_agp", "venta": "precio_venta_agp"}
+
+
+def columna_precio(operacion: str) -> str:
+    """Columna de precio de la operación: dólares para venta, soles para el resto."""
+    return "precio_usd" if operacion == "venta" else "precio_pen"
+
+
+def filtrar_tabla(df: pd.DataFrame, operacion: str, rango_precio=TODOS, rango_area=TODOS,
+                  dormitorio=TODOS, estacionamiento=TODOS, sin_atipicos=False) -> pd.DataFrame:
+    """
+    Aplica los filtros de la tabla de detalle (rango de precio, rango de área, dormitorios y
+    estacionamiento). Los filtros en "Todos" no se aplican. Con `sin_atipicos` se quitan las
+    propiedades marcadas como `atipico` (ver `estadisticas.agregar_columnas_precio`).
+    """
+    mascara = pd.Series(True, index=df.index)
+
+    # Se aplica el filtro de rango de precio si no es "Todos".
+    if rango_precio != TODOS:
+        mascara &= df[COLUMNA_RANGO_PRECIO[operacion]] == rango_precio
+
+    # Se aplica el filtro de rango de área si no es "Todos".
+    if rango_area != TODOS:
+        mascara &= df["area_agp"] == rango_area
+
+    # Se aplica el filtro de numero de habitaciones si no es "Todos".
+    if dormitorio != TODOS:
+        mascara &= df["dormitorio"] == dormitorio
+
+    # Se aplica el filtro de estacionamientos si no es "Todos".
+    if estacionamiento != TODOS:
+        mascara &= df["estacionamiento_gp"] == estacionamiento
+
+    # Se quitan los precios atípicos de su distrito si se pidió.
+    if sin_atipicos:
+        mascara &= ~df["atipico"]
+
+    return df if mascara.all() else df[mascara]
+
+
+def datos_scatter(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Propiedades para el gráfico Área vs. Precio: área y precio positivos (`precio_m2` no nulo) y,
+    para una mejor visualización, sin los precios atípicos de su distrito (columna `atipico`).
+    """
+    return df[df["precio_m2"].notna().to_numpy() & ~df["atipico"].to_numpy()]
+
+
+def excluir_atipicos(df: pd.DataFrame) -> pd.DataFrame:
+    """Las propiedades de `df` no marcadas como `atipico`."""
+    atipico = df["atipico"].to_numpy()
+    return df[~atipico] if atipico.any() else df
+
+
+def atipicos_box(df: pd.DataFrame, max_puntos: int = 2000, seed: int = 0) -> pd.DataFrame:
+    """
+    Valores atípicos del box plot: las propiedades marcadas como `atipico`, cuyo precio queda fuera
+    de los bigotes de su distrito (los mismos `bigote_inf`/`bigote_sup` del cubo de precios).
+    Devuelve a lo sumo `max_puntos` filas, muestreadas por distrito (estratificado) con una semilla
+    fija, para que la figura cacheada no cambie entre reconstrucciones.
+    """
+    atipicos = df[df["atipico"].to_numpy()]
+    if len(atipicos) <= max_puntos:
+        return atipicos
+
+    # Cuota pareja por distrito: los distritos con pocos atípicos entran completos y lo que
+    # no usan se reparte entre los demás.
+    codigos, _ = pd.factorize(atipicos["distrito_oficial"])
+    conteo = np.sort(np.bincount(codigos))
+    restantes = len(conteo) - np.arange(len(conteo))
+    disponible = max_puntos - np.r_[0, np.cumsum(conteo)[:-1]]
+    j = np.flatnonzero(conteo * restantes > disponible)[0]
+    cuota = disponible[j] // restantes[j]
+
+    # Orden aleatorio dentro de cada distrito: se quedan las primeras `cuota` filas de cada uno.
+    azar = np.random.default_rng(seed).permutation(len(atipicos))
+    rango = np.empty(len(atipicos), dtype=np.int64)
+    rango[azar] = pd.Series(codigos[azar]).groupby(codigos[azar]).cumcount().to_numpy()
+    return atipicos[rango < cuota]
@@ -0,0 +1,253 @@
+## Proyecto a Donde Vivir - Geocodificación por lotes
+## ==================================================
+##
+## Completa `status`/`lat`/`lon` del CSV scrapeado. Cada dirección se normaliza junto con
+## su distrito (ver `deduplicacion.normalizar_direcciones`) y se busca primero en una caché
+## persistente en disco; solo las direcciones que no están se envían al geocodificador,
+## en paralelo y respetando un límite de consultas por segundo. Los resultados (también
+## los "no encontrado") se guardan en la caché, así que volver a scrapear los mismos
+## edificios no cuesta ninguna consulta.
+##
+## El geocodificador es cualquier función `(direccion, distrito) -> (lat, lon) | None`:
+## - `GeocodificadorNominatim`: el servicio público de OpenStreetMap (1 consulta/s).
+## - `GeocodificadorNomenclator`: una tabla local de direcciones conocidas (para pruebas).
+##
+## Uso:
+##     python geocodificacion.py ./data/data_alquiler_venta.csv --cache ./data/geocache.feather
+## escribe ./data/data_alquiler_venta.geo.csv (o el archivo de `--salida`); el CSV de entrada no se toca.
+
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from datos import STATUS_VALIDOS, leer_csv
+from deduplicacion import normalizar_direcciones
+
+
+# Status que escribe esta etapa. Los errores (red, límite del servicio) no se guardan en la
+# caché, para reintentarlos en la próxima corrida.
+STATUS_ENCONTRADO = "geo"
+STATUS_NO_ENCONTRADO = "not_found"
+STATUS_ERROR = "error"
+
+
+def claves_direccion(df: pd.DataFrame) -> pd.Series:
+    """Clave de caché de cada fila: calle, número y unidad normalizados más el distrito normalizado."""
+    norm = normalizar_direcciones(df["direccion"])
+    # El distrito pasa por la misma normalización (minúsculas, sin tildes ni signos).
+    distrito = normalizar_direcciones(df["distrito_oficial"].astype(object))["calle"]
+    return (norm["calle"] + " " + norm["numero"] + " " + norm["unidad"]).str.strip() + "|" + distrito
+
+
+def leer_cache(ruta) -> pd.DataFrame:
+    """Caché de geocodificación indexada por `clave` (vacía si todavía no existe)."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return pd.DataFrame(
+            {"lat": pd.Series(dtype="float64"), "lon": pd.Series(dtype="float64"), "status": pd.Series(dtype=str)},
+            index=pd.Index([], dtype=str, name="clave"),
+        )
+    return pd.read_feather(ruta).set_index("clave")
+
+
+def guardar_cache(cache: pd.DataFrame, ruta):
+    """Escribe la caché en un temporal y la reemplaza de una vez (un lector nunca ve un archivo a medias)."""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+    cache.reset_index().to_feather(temporal, compression="uncompressed")
+    os.replace(temporal, ruta)
+
+
+class LimitadorTasa:
+    """Deja pasar a lo sumo `por_segundo` llamadas por segundo entre todos los hilos (espaciado fijo)."""
+
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._siguiente = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(self._siguiente, ahora)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class GeocodificadorNominatim:
+    """Geocodificador sobre la API de Nominatim (OpenStreetMap). Su política de uso pide un User-Agent propio."""
+
+    URL = "https://nominatim.openstreetmap.org/search"
+
+    def __init__(self, user_agent: str = "adonde-vivir-geocodificacion", timeout: float = 10.0):
+        self.user_agent = user_agent
+        self.timeout = timeout
+
+    def __call__(self, direccion: str, distrito: str):
+        consulta = urllib.parse.urlencode({
+            "q": f"{direccion}, {distrito}, Lima, Perú", "format": "json", "limit": 1, "countrycodes": "pe",
+        })
+        pedido = urllib.request.Request(f"{self.URL}?{consulta}", headers={"User-Agent": self.user_agent})
+        with urllib.request.urlopen(pedido, timeout=self.timeout) as respuesta:
+            resultados = json.load(respuesta)
+        if not resultados:
+            return None
+        return float(resultados[0]["lat"]), float(resultados[0]["lon"])
+
+
+class GeocodificadorNomenclator:
+    """
+    Geocodificador local: una tabla de direcciones conocidas (`direccion`, `distrito_oficial`, `lat`, `lon`)
+    que se consulta con la misma normalización que la caché. Sirve para pruebas y benchmarks sin red.
+    """
+
+    def __init__(self, tabla: pd.DataFrame):
+        tabla = tabla.dropna(subset=["lat", "lon"])
+        coordenadas = list(zip(tabla["lat"].astype(float), tabla["lon"].astype(float)))
+        self._exactas = dict(zip(zip(tabla["direccion"].astype(str), tabla["distrito_oficial"].astype(str)), coordenadas))
+        self._normalizadas = dict(zip(claves_direccion(tabla), coordenadas))
+
+    def __call__(self, direccion: str, distrito: str):
+        if (direccion, distrito) in self._exactas:
+            return self._exactas[(direccion, distrito)]
+        clave = claves_direccion(pd.DataFrame({"direccion": [direccion], "distrito_oficial": [distrito]})).iloc[0]
+        return self._normalizadas.get(clave)
+
+
+def ruta_salida(ruta_csv) -> Path:
+    """CSV geocodificado por defecto: junto al de entrada, con `.geo` antes de la extensión."""
+    ruta_csv = Path(ruta_csv)
+    return ruta_csv.with_name(f"{ruta_csv.stem}.geo{ruta_csv.suffix or '.csv'}")
+
+
+def _consultar(geocodificador, limitador: LimitadorTasa, direccion: str, distrito: str):
+    """Una consulta al geocodificador: (lat, lon, status)."""
+    limitador.esperar()
+    try:
+        resultado = geocodificador(direccion, distrito)
+    except Exception:
+        return np.nan, np.nan, STATUS_ERROR
+    if resultado is None:
+        return np.nan, np.nan, STATUS_NO_ENCONTRADO
+    return resultado[0], resultado[1], STATUS_ENCONTRADO
+
+
+def geocodificar(df: pd.DataFrame, geocodificador, ruta_cache, hilos: int = 4, por_segundo: float = 1.0,
+                 solo_faltantes: bool = True):
+    """
+    Completa `status`, `lat` y `lon` de `df` (devuelve una copia) y actualiza la caché de `ruta_cache`.
+
+    - Las filas que ya tienen una geolocalización válida alimentan la caché.
+    - Con `solo_faltantes=True` solo se geocodifican las filas sin geolocalización válida.
+    - Cada clave distinta que no está en la caché se consulta una sola vez, con `hilos` consultas
+      en paralelo y a lo sumo `por_segundo` por segundo.
+    - Con `solo_faltantes=False` se vuelven a consultar todas las claves: no se usan la caché ni las
+      coordenadas que ya tienen las filas, y los resultados reemplazan a los de la caché. Una fila
+      con geolocalización válida cuya consulta falla conserva la que tenía.
+
+    Devuelve (DataFrame, resumen) con la cantidad de filas, claves consultadas y resultados.
+    """
+    df = df.copy()
+    claves = claves_direccion(df)
+    valido = (
+        df["status"].astype(str).str.lower().isin(STATUS_VALIDOS) & df["lat"].notna() & df["lon"].notna()
+        if "status" in df.columns else pd.Series(False, index=df.index)
+    )
+
+    cache = leer_cache(ruta_cache)
+    conocidas = df.loc[valido, ["lat", "lon"]].assign(clave=claves[valido], status=STATUS_ENCONTRADO)
+    conocidas = conocidas.drop_duplicates("clave").set_index("clave")
+    if solo_faltantes:
+        nuevas_conocidas = conocidas.loc[~conocidas.index.isin(cache.index)]
+        pendientes = ~valido
+        resueltas = claves.isin(cache.index) | claves.isin(nuevas_conocidas.index)
+    else:
+        nuevas_conocidas = conocidas.iloc[:0]
+        pendientes = pd.Series(True, index=df.index)
+        resueltas = pd.Series(False, index=df.index)
+    # Las filas sin dirección (clave vacía antes del distrito) no se consultan.
+    sin_direccion = pendientes & claves.str.startswith("|")
+    faltan = claves[pendientes & ~sin_direccion & ~resueltas]
+    # Una consulta por clave, con la dirección original de su primera aparición.
+    consultas = df.loc[faltan.drop_duplicates().index, ["direccion", "distrito_oficial"]]
+
+    limitador = LimitadorTasa(por_segundo)
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(
+            lambda fila: _consultar(geocodificador, limitador, str(fila[0]), str(fila[1])),
+            consultas.itertuples(index=False, name=None),
+        ))
+    consultadas = pd.DataFrame(
+        resultados, columns=["lat", "lon", "status"], index=pd.Index(claves[consultas.index].to_numpy(), name="clave"),
+    ).astype({"lat": "float64", "lon": "float64", "status": object})
+
+    # Los resultados nuevos reemplazan a los de la caché (solo hay claves repetidas con `solo_faltantes=False`).
+    errores = consultadas.loc[consultadas["status"] == STATUS_ERROR]
+    encontradas = consultadas.loc[consultadas["status"] != STATUS_ERROR]
+    cache = pd.concat([cache.loc[~cache.index.isin(encontradas.index)], nuevas_conocidas, encontradas])
+    if len(nuevas_conocidas) or len(consultadas):
+        guardar_cache(cache, ruta_cache)
+
+    # Se escriben las filas pendientes con lo que dice la caché (o el error de esta corrida); las que
+    # ya tenían geolocalización y fallaron al volver a consultarse se quedan como estaban.
+    resultado = pd.concat([cache, errores.loc[~errores.index.isin(cache.index)]])
+    escribir = pendientes & ~(valido & claves.isin(errores.index))
+    pos = resultado.index.get_indexer(claves[escribir])
+    filas = np.flatnonzero(escribir.to_numpy())[pos >= 0]
+    pos = pos[pos >= 0]
+    df["lat"] = df["lat"].astype("float64") if "lat" in df.columns else np.nan
+    df["lon"] = df["lon"].astype("float64") if "lon" in df.columns else np.nan
+    df["status"] = df["status"].astype(object) if "status" in df.columns else None
+    for col in ["lat", "lon", "status"]:
+        df.iloc[filas, df.columns.get_loc(col)] = resultado[col].to_numpy(dtype=df[col].dtype)[pos]
+
+    resumen = {
+        "filas": len(df),
+        "pendientes": int(pendientes.sum()),
+        "resueltas_cache": int((pendientes & ~sin_direccion & resueltas).sum()),
+        "sin_direccion": int(sin_direccion.sum()),
+        "consultadas": len(consultadas),
+        "encontradas": int((consultadas["status"] == STATUS_ENCONTRADO).sum()),
+        "no_encontradas": int((consultadas["status"] == STATUS_NO_ENCONTRADO).sum()),
+        "errores": int((consultadas["status"] == STATUS_ERROR).sum()),
+    }
+    return df, resumen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geocodifica el CSV scrapeado usando una caché persistente de direcciones.")
+    parser.add_argument("csv", help="CSV scrapeado (separado por '|')")
+    parser.add_argument("--salida", default=None, help="CSV de salida (por defecto, <csv>.geo.csv junto al de entrada)")
+    parser.add_argument("--cache", default="./data/geocache.feather", help="Archivo de la caché de direcciones")
+    parser.add_argument("--hilos", type=int, default=4, help="Consultas en paralelo")
+    parser.add_argument("--por-segundo", type=float, default=1.0, help="Máximo de consultas por segundo")
+    parser.add_argument("--todas", action="store_true", help="Geocodificar también las filas que ya tienen coordenadas")
+    parser.add_argument("--user-agent", default="adonde-vivir-geocodificacion", help="User-Agent para Nominatim")
+    args = parser.parse_args()
+    # Se escribe aparte: una corrida interrumpida o con errores no puede dañar la data scrapeada.
+    salida = Path(args.salida) if args.salida else ruta_salida(args.csv)
+    if salida.resolve() == Path(args.csv).resolve():
+        parser.error("--salida no puede ser el CSV de entrada")
+
+    df, resumen = geocodificar(
+        leer_csv(args.csv), GeocodificadorNominatim(user_agent=args.user_agent), args.cache,
+        hilos=args.hilos, por_segundo=args.por_segundo, solo_faltantes=not args.todas,
+    )
+    df.to_csv(salida, sep="|", index=False, encoding="utf-8")
+    print(
+        f"{resumen['pendientes']:,} filas por geocodificar: {resumen['resueltas_cache']:,} resueltas con la caché, "
+        f"{resumen['sin_direccion']:,} sin dirección, "
+        f"{resumen['consultadas']:,} direcciones consultadas ({resumen['encontradas']:,} encontradas, "
+        f"{resumen['no_encontradas']:,} no encontradas, {resumen['errores']:,} errores). Escrito en {salida}"
+    )
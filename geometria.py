@@ -0,0 +1,173 @@
+## Proyecto a Donde Vivir - Geometría de los distritos
+## ===================================================
+##
+## Polígonos simplificados de cada `distrito_oficial` para el mapa de precios por distrito
+## (coropletas). Si existe el GeoJSON de límites distritales (`ARCHIVO_GEOMETRIA`), se usa
+## su contorno exterior; los distritos que no están en el archivo (o todos, si no hay archivo)
+## se aproximan con el casco convexo de sus propiedades geolocalizadas, sin los extremos.
+## Los contornos se simplifican (Douglas-Peucker) para que el mapa pese poco, y se guardan
+## como arrays (`nombres`, `vertices`, `limites`, como el índice de búsqueda) para que la
+## caché en disco los escriba una vez por conjunto.
+
+import json
+import os
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from espacial import METROS_POR_GRADO
+
+
+# GeoJSON con los límites distritales (opcional); su contenido es parte de la llave de la caché en disco.
+ARCHIVO_GEOMETRIA = os.environ.get("ADONDE_VIVIR_DISTRITOS", "./data/distritos.geojson")
+
+# Propiedades del GeoJSON donde puede venir el nombre del distrito, en orden de preferencia.
+CAMPOS_NOMBRE = ["distrito_oficial", "distrito", "NOMBDIST", "nombre", "name"]
+
+# Tolerancia de la simplificación: ningún vértice quitado se aleja más que esto del contorno.
+TOLERANCIA_M = 75
+
+# Para el casco convexo se descarta este cuantil de cada extremo de latitud y longitud (geolocalizaciones erradas).
+CUANTIL_CASCO = 0.02
+
+
+def _normalizar_nombre(nombre) -> str:
+    """Nombre sin tildes, en minúsculas y sin espacios de más, para cruzar el GeoJSON con la data."""
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(texto.lower().split())
+
+
+def _casco_convexo(xy: np.ndarray) -> np.ndarray:
+    """Casco convexo (cadena monótona de Andrew) de puntos (lon, lat), en sentido antihorario, sin cerrar."""
+    if len(xy) > 64:
+        # Los puntos dentro del polígono de los extremos (en x, y, x+y y x-y) no pueden ser vértices del casco.
+        x, y = xy[:, 0], xy[:, 1]
+        extremos = _casco_convexo(xy[np.unique([f(v) for v in (x, y, x + y, x - y) for f in (np.argmin, np.argmax)])])
+        if len(extremos) >= 3:
+            siguiente = np.roll(extremos, -1, axis=0)
+            cruz = ((siguiente[:, 0] - extremos[:, 0])[:, None] * (y - extremos[:, 1:2])
+                    - (siguiente[:, 1] - extremos[:, 1])[:, None] * (x - extremos[:, 0:1]))
+            xy = xy[~(cruz > 0).all(axis=0)]
+    xy = np.unique(xy, axis=0)
+    if len(xy) < 3:
+        return xy
+
+    def cadena(puntos):
+        resultado = []
+        for p in puntos:
+            while len(resultado) >= 2:
+                (ax, ay), (bx, by) = resultado[-2], resultado[-1]
+                if (bx - ax) * (p[1] - ay) - (by - ay) * (p[0] - ax) > 0:
+                    break
+                resultado.pop()
+            resultado.append(p)
+        return resultado[:-1]
+
+    return np.array(cadena(xy) + cadena(xy[::-1]))
+
+
+def _simplificar(anillo: np.ndarray, tolerancia_m: float = TOLERANCIA_M) -> np.ndarray:
+    """Douglas-Peucker sobre un anillo (lon, lat) sin cerrar; las distancias se miden en metros."""
+    if len(anillo) <= 4:
+        return anillo
+    escala = np.array([np.cos(np.radians(anillo[:, 1].mean())), 1.0]) * METROS_POR_GRADO
+    # Se cierra el anillo para que el primer y el último tramo también se simplifiquen.
+    puntos = np.vstack([anillo, anillo[:1]]) * escala
+    conservar = np.zeros(len(puntos), dtype=bool)
+    conservar[[0, len(puntos) // 2, -1]] = True
+    pendientes = [(0, len(puntos) // 2), (len(puntos) // 2, len(puntos) - 1)]
+    while pendientes:
+        i, j = pendientes.pop()
+        if j - i < 2:
+            continue
+        a, b = puntos[i], puntos[j]
+        ab = b - a
+        largo = np.hypot(*ab)
+        tramo = puntos[i + 1:j] - a
+        distancia = np.abs(ab[0] * tramo[:, 1] - ab[1] * tramo[:, 0]) / largo if largo > 0 else np.hypot(tramo[:, 0], tramo[:, 1])
+        k = int(np.argmax(distancia))
+        if distancia[k] > tolerancia_m:
+            conservar[i + 1 + k] = True
+            pendientes += [(i, i + 1 + k), (i + 1 + k, j)]
+    return anillo[conservar[:-1]]
+
+
+def _anillos_geojson(ruta) -> dict:
+    """{nombre normalizado: contorno exterior (lon, lat)} de cada distrito del GeoJSON; el polígono más grande si hay varios."""
+    with open(ruta, encoding="utf-8") as f:
+        contenido = json.load(f)
+    anillos = {}
+    for feature in contenido.get("features", []):
+        propiedades, geometria = feature.get("properties") or {}, feature.get("geometry") or {}
+        nombre = next((propiedades[c] for c in CAMPOS_NOMBRE if propiedades.get(c)), None)
+        if nombre is None or geometria.get("type") not in ("Polygon", "MultiPolygon"):
+            continue
+        poligonos = [geometria["coordinates"]] if geometria["type"] == "Polygon" else geometria["coordinates"]
+        exteriores = [np.asarray(p[0], dtype="float64")[:, :2] for p in poligonos if p]
+        anillo = max(exteriores, key=len)
+        # GeoJSON repite el primer vértice al final.
+        anillos[_normalizar_nombre(nombre)] = anillo[:-1] if len(anillo) > 1 and (anillo[0] == anillo[-1]).all() else anillo
+    return anillos
+
+
+def construir_geometria_distritos(df: pd.DataFrame, ruta=ARCHIVO_GEOMETRIA) -> dict:
+    """
+    Contorno simplificado de cada `distrito_oficial` de `df` (ver el encabezado del módulo).
+    Devuelve un dict de arrays de solo lectura: `nombres` (distritos), `vertices` (lon, lat de todos los
+    contornos, concatenados en el orden de `nombres`) y `limites` (inicio del contorno de cada distrito en
+    `vertices`, más el final del último). Los distritos con menos de 3 puntos distintos no tienen contorno.
+    """
+    oficiales = _anillos_geojson(ruta) if ruta is not None and Path(ruta).exists() else {}
+    geo = df[df["geo_valido"].to_numpy(dtype=bool)]
+    grupos = geo.groupby("distrito_oficial", observed=True, sort=True).indices
+    lon, lat = geo["lon"].to_numpy(dtype="float64"), geo["lat"].to_numpy(dtype="float64")
+
+    nombres, anillos = [], []
+    for distrito in sorted(set(df["distrito_oficial"].dropna().unique())):
+        anillo = oficiales.get(_normalizar_nombre(distrito))
+        if anillo is None and distrito in grupos:
+            pos = grupos[distrito]
+            x, y = lon[pos], lat[pos]
+            # Se descartan los extremos (propiedades mal geolocalizadas fuera del distrito).
+            if len(pos) >= 50:
+                dentro = (
+                    (x >= np.quantile(x, CUANTIL_CASCO)) & (x <= np.quantile(x, 1 - CUANTIL_CASCO))
+                    & (y >= np.quantile(y, CUANTIL_CASCO)) & (y <= np.quantile(y, 1 - CUANTIL_CASCO))
+                )
+                x, y = x[dentro], y[dentro]
+            anillo = _casco_convexo(np.column_stack([x, y]))
+        if anillo is None or len(anillo) < 3:
+            continue
+        nombres.append(distrito)
+        anillos.append(_simplificar(anillo))
+
+    geometria = {
+        "nombres": np.asarray(nombres, dtype=str) if nombres else np.empty(0, dtype="U1"),
+        "vertices": np.concatenate(anillos) if anillos else np.empty((0, 2)),
+        "limites": np.cumsum([0] + [len(a) for a in anillos]).astype(np.int64),
+    }
+    for arr in geometria.values():
+        arr.setflags(write=False)
+    return geometria
+
+
+def geojson_distritos(geometria: dict, propiedades: dict) -> dict:
+    """
+    FeatureCollection con el contorno de cada distrito que está en `propiedades` ({distrito: dict de
+    propiedades del feature}). Los demás se omiten.
+    """
+    features = []
+    limites = geometria["limites"]
+    for i, distrito in enumerate(geometria["nombres"]):
+        if distrito not in propiedades:
+            continue
+        anillo = np.round(geometria["vertices"][limites[i]:limites[i + 1]], 5).tolist()
+        features.append({
+            "type": "Feature",
+            "properties": {"distrito": str(distrito), **propiedades[distrito]},
+            "geometry": {"type": "Polygon", "coordinates": [anillo + anillo[:1]]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
@@ -0,0 +1,117 @@
+## Proyecto a Donde Vivir - Gráficos
+## =================================
+##
+## Figuras de Plotly de la pestaña de análisis por distrito, armadas a partir de
+## estadísticas ya calculadas en el servidor, de modo que el tamaño de lo que se
+## envía al navegador no dependa de cuántas propiedades cumplen el filtro.
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+
+# Cantidad máxima de valores atípicos que se dibujan en el box plot agregado.
+MAX_ATIPICOS_BOX = 2000
+
+
+def figura_box(resumen: pd.DataFrame, atipicos: pd.DataFrame, col_precio: str, simbolo: str) -> go.Figure:
+    """
+    Box plot por distrito con las cajas precalculadas (`q1`, `median`, `q3`, `bigote_inf`, `bigote_sup`
+    de `resumen`, indexado por `distrito_oficial`) más los puntos de `atipicos` (ver `filtros.atipicos_box`).
+    Cada distrito es una traza con su propio color, como en `px.box(color="distrito_oficial")`.
+    """
+    fig = go.Figure()
+    colores = qualitative.Plotly
+    resumen = resumen[resumen["n"] > 0]
+    for i, (distrito, fila) in enumerate(resumen.iterrows()):
+        color = colores[i % len(colores)]
+        fig.add_trace(go.Box(
+            name=str(distrito), x=[str(distrito)], legendgroup=str(distrito), marker_color=color,
+            q1=[fila["q1"]], median=[fila["median"]], q3=[fila["q3"]],
+            lowerfence=[fila["bigote_inf"]], upperfence=[fila["bigote_sup"]],
+            boxpoints=False, hoverinfo="y",
+        ))
+        puntos = atipicos.loc[atipicos["distrito_oficial"] == distrito, col_precio]
+        if len(puntos):
+            fig.add_trace(go.Scatter(
+                x=[str(distrito)] * len(puntos), y=puntos.to_numpy(), mode="markers",
+                name=str(distrito), legendgroup=str(distrito), showlegend=False,
+                marker=dict(color=color, size=4, opacity=0.6),
+            ))
+    fig.update_layout(
+        showlegend=False,
+        xaxis_title="Distrito",
+        yaxis_title=f"Precio ({simbolo})",
+    )
+    return fig
+
+
+# Modos del gráfico Área vs. Precio según la cantidad de puntos (ver `modo_scatter`).
+MODOS_SCATTER = ("svg", "webgl", "densidad")
+UMBRAL_WEBGL = 5_000        # desde aquí los puntos se dibujan con WebGL
+UMBRAL_DENSIDAD = 50_000    # desde aquí se envía una grilla de densidad en lugar de los puntos
+CELDAS_DENSIDAD = 80        # celdas por eje de la grilla de densidad
+MUESTRA_HOVER = 2_000       # puntos con `direccion` en el hover que acompañan a la grilla
+
+
+def modo_scatter(n: int) -> str:
+    """Modo del scatter para `n` puntos: "svg", "webgl" o "densidad"."""
+    if n >= UMBRAL_DENSIDAD:
+        return "densidad"
+    if n >= UMBRAL_WEBGL:
+        return "webgl"
+    return "svg"
+
+
+def densidad_2d(x, y, celdas: int = CELDAS_DENSIDAD):
+    """
+    Cuenta los puntos en una grilla de `celdas` x `celdas` que cubre su rango (np.histogram2d).
+    Devuelve (centros_x, centros_y, conteo) con `conteo[fila_y, columna_x]` y NaN en las celdas vacías,
+    listo para un `go.Heatmap`.
+    """
+    conteo, bordes_x, bordes_y = np.histogram2d(np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64"), bins=celdas)
+    centros_x = (bordes_x[:-1] + bordes_x[1:]) / 2
+    centros_y = (bordes_y[:-1] + bordes_y[1:]) / 2
+    return centros_x, centros_y, np.where(conteo > 0, conteo, np.nan).T
+
+
+def figura_scatter(df: pd.DataFrame, col_precio: str, simbolo: str, titulo: str, modo: str = None,
+                   seed: int = 0) -> go.Figure:
+    """
+    Gráfico Área vs. Precio. `modo` (por defecto, según `modo_scatter(len(df))`):
+    - "svg" / "webgl": un punto por propiedad, coloreado por distrito, con `direccion` en el hover.
+    - "densidad": grilla de densidad armada en el servidor más una muestra de `MUESTRA_HOVER`
+      puntos (semilla fija) que conserva el hover con la dirección.
+    """
+    modo = modo or modo_scatter(len(df))
+    if modo not in MODOS_SCATTER:
+        raise ValueError(f"modo debe ser uno de {MODOS_SCATTER}, no {modo!r}")
+    etiquetas = {"area": "Área (m²)", col_precio: f"Precio ({simbolo})"}
+
+    if modo != "densidad":
+        return px.scatter(df, x="area", y=col_precio, color="distrito_oficial", hover_data=["direccion"],
+                          title=titulo, labels=etiquetas, render_mode=modo)
+
+    centros_x, centros_y, conteo = densidad_2d(df["area"], df[col_precio])
+    muestra = df.sample(n=min(MUESTRA_HOVER, len(df)), random_state=seed)
+    fig = go.Figure(go.Heatmap(
+        x=centros_x, y=centros_y, z=conteo, colorscale="Blues", colorbar=dict(title="Propiedades"),
+        hovertemplate="Área: %{x:,.0f} m²<br>Precio: %{y:,.0f}<br>Propiedades: %{z:,.0f}<extra></extra>",
+    ))
+    fig.add_trace(go.Scattergl(
+        x=muestra["area"], y=muestra[col_precio], mode="markers",
+        marker=dict(size=3, color="rgba(0, 0, 0, 0.35)"),
+        customdata=np.stack([
+            muestra["direccion"].astype(object).where(muestra["direccion"].notna(), "").astype(str),
+            muestra["distrito_oficial"].astype(str),
+        ], axis=1),
+        hovertemplate="%{customdata[0]}<br>%{customdata[1]}<br>Área: %{x:,.0f} m²<br>Precio: %{y:,.0f}<extra></extra>",
+        name="Muestra",
+    ))
+    fig.update_layout(
+        title=f"{titulo} — densidad de {len(df):,} propiedades, muestra de {len(muestra):,}",
+        xaxis_title=etiquetas["area"], yaxis_title=etiquetas[col_precio], showlegend=False,
+    )
+    return fig
@@ -0,0 +1,127 @@
+## Proyecto a Donde Vivir - Índice de filtros
+## ==========================================
+##
+## Índice precalculado (inmueble, operacion, distrito/zona) -> posiciones de fila.
+## Se construye una sola vez junto al DataFrame cacheado; las pestañas obtienen su
+## subconjunto con `take`, de modo que el costo de filtrar depende del tamaño del
+## resultado y no del tamaño de toda la data.
+
+import numpy as np
+import pandas as pd
+
+
+# Niveles del índice: nombre -> columnas que forman la llave.
+NIVELES_INDICE = {
+    "operacion": ["inmueble", "operacion"],
+    "zona": ["inmueble", "operacion", "distrito_categoria"],
+    "distrito": ["inmueble", "operacion", "distrito_oficial"],
+}
+
+_VACIO = np.empty(0, dtype=np.intp)
+_VACIO.setflags(write=False)
+
+
+def construir_indice_filtros(df: pd.DataFrame) -> dict:
+    """
+    Construye el índice de filtros sobre `df`.
+    Devuelve un dict {nivel: {llave: posiciones}}; las posiciones son arrays de solo lectura.
+    Las filas con algún valor nulo en la llave no se indexan (igual que una comparación `==`).
+    """
+    indice = {}
+    for nivel, columnas in NIVELES_INDICE.items():
+        grupos = df.groupby(columnas, observed=True, sort=False).indices
+        for pos in grupos.values():
+            pos.setflags(write=False)
+        indice[nivel] = grupos
+    return indice
+
+
+def posiciones(indice: dict, inmueble, operacion, distrito=None, zona=None) -> np.ndarray:
+    """
+    Devuelve las posiciones de fila que cumplen el filtro.
+    Si se pasa `distrito` se usa ese nivel; si no, `zona`; si no, solo (inmueble, operacion).
+    """
+    if distrito is not None:
+        return indice["distrito"].get((inmueble, operacion, distrito), _VACIO)
+    if zona is not None:
+        return indice["zona"].get((inmueble, operacion, zona), _VACIO)
+    return indice["operacion"].get((inmueble, operacion), _VACIO)
+
+
+def subconjunto(df: pd.DataFrame, indice: dict, inmueble, operacion, distrito=None, zona=None, columnas=None) -> pd.DataFrame:
+    """
+    Devuelve las filas de `df` que cumplen el filtro, obtenidas con `take` (ya es un DataFrame nuevo).
+    Con `columnas` solo se copian esas columnas (la selección previa no copia: en pandas >= 3 siempre hay copy-on-write).
+    """
+    if columnas is not None:
+        df = df[columnas]
+    return df.take(posiciones(indice, inmueble, operacion, distrito=distrito, zona=zona))
+
+
+## Orden precalculado de las tablas de detalle
+## -------------------------------------------
+## Para cada columna ordenable se guarda el rango (posición del valor en el orden ascendente) de cada fila.
+## Ordenar un subconjunto es entonces ordenar enteros de sus posiciones, sin tocar el DataFrame,
+## y solo se materializan las filas de la página visible.
+
+# Columnas por las que se pueden ordenar las tablas de detalle.
+COLUMNAS_ORDEN = ["precio_pen", "precio_usd", "area", "dormitorio", "baños", "estacionamientos", "mantenimiento"]
+
+# Desplazamiento del rango de los valores nulos: siempre quedan al final, en ambos sentidos.
+_NULOS = 2**30
+
+
+def construir_rangos(df: pd.DataFrame, columnas=COLUMNAS_ORDEN) -> dict:
+    """
+    Rango de cada fila de `df` en el orden ascendente de cada columna de `columnas` que exista.
+    Devuelve {columna: array int32 de solo lectura}; valores iguales tienen el mismo rango.
+    """
+    rangos = {}
+    for col in columnas:
+        if col not in df.columns:
+            continue
+        # Las columnas ya vienen numéricas de `datos.preparar_filas`; el resto se convierte.
+        serie = df[col] if pd.api.types.is_numeric_dtype(df[col]) else pd.to_numeric(df[col], errors="coerce")
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        _, rango = np.unique(valores, return_inverse=True)
+        rango = rango.astype(np.int32)
+        rango[np.isnan(valores)] += _NULOS
+        rango.setflags(write=False)
+        rangos[col] = rango
+    return rangos
+
+
+def _llave_orden(pos: np.ndarray, rangos: dict, columna: str, ascendente: bool) -> np.ndarray:
+    """
+    Llave entera (única) de orden de las posiciones `pos`: el rango de `columna` y, en los empates,
+    el orden en `pos` (como un ordenamiento estable). En orden descendente los nulos siguen al final.
+    """
+    llave = rangos[columna][pos].astype(np.int64)
+    if not ascendente:
+        llave = np.where(llave >= _NULOS, llave, -llave)
+    return llave * len(pos) + np.arange(len(pos))
+
+
+def ordenar_posiciones(pos: np.ndarray, rangos: dict, columna: str, ascendente: bool = True) -> np.ndarray:
+    """Devuelve las posiciones `pos` ordenadas por `columna` (los nulos al final)."""
+    return pos[np.argsort(_llave_orden(pos, rangos, columna, ascendente))]
+
+
+def pagina(df: pd.DataFrame, pos: np.ndarray, rangos: dict, columna: str, numero: int, tamano: int,
+           ascendente: bool = True) -> pd.DataFrame:
+    """
+    Filas de la página `numero` (desde 1) de `tamano` filas de `df.take(pos)` ordenado por `columna`.
+    `pos` son posiciones de fila de `df` (p. ej. el índice de un subconjunto obtenido con `subconjunto`,
+    que conserva las etiquetas de `df`, cuando `df` tiene un RangeIndex). Solo se toman de `df` las filas de esa página.
+    """
+    pos = np.asarray(pos)
+    inicio = (numero - 1) * tamano
+    fin = min(inicio + tamano, len(pos))
+    llave = _llave_orden(pos, rangos, columna, ascendente)
+    if fin < len(pos):
+        # Solo hace falta ordenar las primeras `fin` filas: se separan con argpartition (lineal).
+        seleccion = np.argpartition(llave, fin - 1)[:fin]
+    else:
+        seleccion = np.arange(len(pos))
+    seleccion = seleccion[np.argsort(llave[seleccion])]
+    return df.take(pos[seleccion[inicio:fin]])
@@ -0,0 +1,182 @@
+## Proyecto a Donde Vivir - Ingesta incremental de scrapes
+## =======================================================
+##
+## En lugar de reprocesar todo el CSV en cada actualización, cada scrape nuevo se compara
+## contra un índice persistente (clave del anuncio -> hash de su contenido) y solo los
+## anuncios nuevos o modificados se preparan y se guardan, en una partición por fecha:
+##
+##     almacen/
+##         indice.feather                          clave, hash, particion, activo
+##         fecha=2025-08-19/anuncios.feather       anuncios nuevos o cambiados ese día
+##         fecha=2025-08-20/anuncios.feather
+##
+## El índice dice en qué partición está la versión vigente de cada anuncio, así que el estado
+## actual se arma leyendo solo esas filas de cada partición (y deduplicando al final).
+##
+## Uso:
+##     python ingesta.py ./data/scrape_2025-08-20.csv --almacen ./data/almacen --fecha 2025-08-20
+
+import argparse
+import os
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from datos import COLUMNAS_APP, COLUMNAS_CATEGORICAS, deduplicar, leer_csv, leer_snapshot, preparar_filas
+
+ARCHIVO_INDICE = "indice.feather"
+
+# Columnas que identifican un anuncio sin enlace (no debería pasar, pero el scrape no lo garantiza).
+COLUMNAS_CLAVE_ALTERNA = ['fuente', 'distrito_oficial', 'direccion', 'inmueble', 'operacion']
+
+# Columnas que hay que volver a convertir en categóricas tras unir particiones
+# (cada partición trae sus propias categorías).
+COLUMNAS_RECATEGORIZAR = COLUMNAS_CATEGORICAS + ['distrito_categoria']
+
+
+def clave_anuncio(df: pd.DataFrame) -> pd.Series:
+    """Clave persistente de cada anuncio: su enlace o, si no tiene, un hash de las columnas que lo identifican."""
+    enlace = df['enlace'].astype("string")
+    if enlace.notna().all():
+        return enlace.astype(str)
+    alterna = pd.util.hash_pandas_object(df[COLUMNAS_CLAVE_ALTERNA].astype(str), index=False)
+    return enlace.fillna("sin-enlace:" + alterna.astype(str)).astype(str)
+
+
+def hash_contenido(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash (uint64) del contenido de cada fila. Las columnas numéricas se pasan a float64 antes,
+    para que un entero que en otro scrape llega como decimal (por un NaN en la columna) no cuente como cambio.
+    """
+    columnas = sorted(df.columns)
+    normalizada = df[columnas].apply(lambda s: s.astype("float64") if pd.api.types.is_numeric_dtype(s) else s.astype(str))
+    return pd.util.hash_pandas_object(normalizada, index=False).to_numpy()
+
+
+def leer_indice(almacen) -> pd.DataFrame:
+    """Índice del almacén (vacío si todavía no hay ingestas)."""
+    ruta = Path(almacen) / ARCHIVO_INDICE
+    if not ruta.exists():
+        return pd.DataFrame({
+            'clave': pd.Series(dtype=str), 'hash': pd.Series(dtype="uint64"),
+            'particion': pd.Series(dtype=str), 'activo': pd.Series(dtype=bool),
+        })
+    return pd.read_feather(ruta)
+
+
+def _escribir_atomico(df: pd.DataFrame, ruta: Path):
+    """Escribe el Feather en un temporal y lo reemplaza de una vez, para que un lector nunca vea un archivo a medias."""
+    temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+    df.to_feather(temporal, compression="uncompressed")
+    os.replace(temporal, ruta)
+
+
+def _ruta_particion(almacen: Path, fecha: str) -> Path:
+    """Archivo nuevo para la partición de `fecha` (si ya hubo una ingesta ese día, se agrega otro)."""
+    carpeta = almacen / f"fecha={fecha}"
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ruta = carpeta / "anuncios.feather"
+    n = 1
+    while ruta.exists():
+        ruta = carpeta / f"anuncios-{n}.feather"
+        n += 1
+    return ruta
+
+
+def ingerir(ruta_csv, almacen, fecha: str = None, completo: bool = True) -> dict:
+    """
+    Incorpora un scrape al almacén guardando solo los anuncios nuevos o modificados.
+    Con `completo=True` el scrape se toma como el listado completo del día: los anuncios activos que
+    no aparecen se dan de baja. Devuelve el resumen de la ingesta.
+    """
+    almacen = Path(almacen)
+    almacen.mkdir(parents=True, exist_ok=True)
+    fecha = fecha or date.today().isoformat()
+
+    nuevo = leer_csv(ruta_csv)
+    nuevo['clave'] = clave_anuncio(nuevo)
+    nuevo = nuevo.drop_duplicates('clave', keep='last').reset_index(drop=True)
+    nuevo_hash = hash_contenido(nuevo.drop(columns='clave'))
+
+    indice = leer_indice(almacen).set_index('clave')
+    # Posición de cada anuncio en el índice (-1 si es la primera vez que aparece).
+    pos = indice.index.get_indexer(nuevo['clave'])
+    visto = pos >= 0
+    activo_previo = np.zeros(len(nuevo), dtype=bool)
+    activo_previo[visto] = indice['activo'].to_numpy(dtype=bool)[pos[visto]]
+    cambiado = activo_previo.copy()
+    cambiado[visto] &= indice['hash'].to_numpy(dtype="uint64")[pos[visto]] != nuevo_hash[visto]
+    es_nuevo = ~activo_previo
+    a_guardar = es_nuevo | cambiado
+
+    resumen = {
+        'fecha': fecha, 'filas': len(nuevo), 'nuevos': int(es_nuevo.sum()),
+        'cambiados': int(cambiado.sum()), 'sin_cambios': int((~a_guardar).sum()), 'bajas': 0,
+    }
+
+    if a_guardar.any():
+        ruta = _ruta_particion(almacen, fecha)
+        delta = preparar_filas(nuevo.loc[a_guardar].reset_index(drop=True))
+        _escribir_atomico(delta, ruta)
+        particion = ruta.relative_to(almacen).as_posix()
+        actualizados = pd.DataFrame(
+            {'hash': nuevo_hash[a_guardar], 'particion': particion, 'activo': True},
+            index=pd.Index(nuevo['clave'].to_numpy()[a_guardar], name='clave'),
+        )
+        indice = pd.concat([indice.drop(actualizados.index, errors='ignore'), actualizados])
+
+    if completo:
+        bajas = indice['activo'].to_numpy(dtype=bool) & ~indice.index.isin(nuevo['clave'])
+        resumen['bajas'] = int(bajas.sum())
+        indice.loc[bajas, 'activo'] = False
+
+    if a_guardar.any() or resumen['bajas']:
+        _escribir_atomico(indice.reset_index(), almacen / ARCHIVO_INDICE)
+    return resumen
+
+
+def leer_almacen(almacen, columnas=COLUMNAS_APP) -> pd.DataFrame:
+    """
+    Estado actual del almacén: de cada partición se leen (con memory mapping y proyección de columnas)
+    solo las filas cuya versión vigente está en ella, se unen y se deduplican entre fuentes.
+    """
+    almacen = Path(almacen)
+    indice = leer_indice(almacen)
+    vigentes = indice.loc[indice['activo']]
+    lectura = None if columnas is None else [*columnas, 'clave']
+
+    partes = []
+    for particion, claves in vigentes.groupby('particion', sort=True)['clave']:
+        parte = leer_snapshot(almacen / particion, columnas=lectura)
+        partes.append(parte.loc[parte['clave'].isin(claves)].drop(columns='clave'))
+    if not partes:
+        raise FileNotFoundError(f"El almacén {almacen} no tiene anuncios vigentes")
+
+    df = pd.concat(partes, ignore_index=True)
+    for col in COLUMNAS_RECATEGORIZAR:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return deduplicar(df)
+
+
+def version_almacen(almacen) -> str:
+    """Versión del almacén: cambia con cada ingesta que modifica el índice."""
+    estado = (Path(almacen) / ARCHIVO_INDICE).stat()
+    return f"{Path(almacen).name}-{estado.st_size}-{estado.st_mtime_ns}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrega un scrape al almacén incremental guardando solo lo que cambió.")
+    parser.add_argument("csv", help="CSV scrapeado (separado por '|')")
+    parser.add_argument("--almacen", default="./data/almacen", help="Carpeta del almacén particionado por fecha")
+    parser.add_argument("--fecha", default=None, help="Fecha del scrape (AAAA-MM-DD); por defecto, hoy")
+    parser.add_argument("--parcial", action="store_true", help="El scrape no es el listado completo: no dar de baja lo que falte")
+    args = parser.parse_args()
+
+    resumen = ingerir(args.csv, args.almacen, fecha=args.fecha, completo=not args.parcial)
+    print(
+        f"{resumen['fecha']}: {resumen['filas']:,} anuncios leídos, {resumen['nuevos']:,} nuevos, "
+        f"{resumen['cambiados']:,} cambiados, {resumen['sin_cambios']:,} sin cambios, {resumen['bajas']:,} bajas"
+    )
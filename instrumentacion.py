@@ -0,0 +1,229 @@
+## Proyecto a Donde Vivir - Instrumentación por ejecución
+## ======================================================
+##
+## Mide cada etapa con nombre de una ejecución del script (carga, filtrado,
+## agregaciones, figuras, mapa...): tiempo, filas y bytes asignados. Cada etapa se
+## emite como una línea JSON para poder agregarla después, y la última ejecución
+## queda disponible para el panel de depuración de la app.
+##
+## Está apagada por defecto. Se activa con variables de entorno:
+##     ADONDE_VIVIR_PERF=1                 activa la medición
+##     ADONDE_VIVIR_PERF_LOG=perf.jsonl    archivo donde agregar las líneas JSON
+##                                         (si no se define, van al logger "adonde_vivir.perf")
+##
+## Apagada, `etapa()` solo consulta una ContextVar y devuelve un contexto vacío.
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger("adonde_vivir.perf")
+
+_ACTIVA = os.environ.get("ADONDE_VIVIR_PERF", "") not in ("", "0")
+_RUTA_LOG = os.environ.get("ADONDE_VIVIR_PERF_LOG")
+_lock_log = threading.Lock()
+
+# Registro de la ejecución en curso (cada sesión de Streamlit corre en su propio hilo/contexto).
+_actual = contextvars.ContextVar("registro_perf", default=None)
+
+
+def activa() -> bool:
+    """Indica si la instrumentación está activa."""
+    return _ACTIVA
+
+
+def activar(ruta_log: str = None):
+    """Activa la instrumentación desde código (p. ej. en benchmarks); `ruta_log` reemplaza a ADONDE_VIVIR_PERF_LOG."""
+    global _ACTIVA, _RUTA_LOG
+    _ACTIVA = True
+    if ruta_log is not None:
+        _RUTA_LOG = ruta_log
+
+
+class Etapa:
+    """Medición de una etapa. `filas` se puede asignar dentro del bloque con la cantidad procesada."""
+
+    __slots__ = ("nombre", "segundos", "filas", "bytes_asignados", "pico_bytes")
+
+    def __init__(self, nombre, filas=None):
+        self.nombre = nombre
+        self.filas = filas
+        self.segundos = None
+        self.bytes_asignados = None
+        self.pico_bytes = None
+
+    def como_dict(self) -> dict:
+        return {
+            "etapa": self.nombre,
+            "segundos": round(self.segundos, 6),
+            "filas": self.filas,
+            "bytes_asignados": self.bytes_asignados,
+            "pico_bytes": self.pico_bytes,
+        }
+
+
+class Registro:
+    """Etapas medidas durante una ejecución (del script completo o de un fragmento)."""
+
+    def __init__(self, nombre: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.nombre = nombre
+        self.fecha = datetime.now().isoformat(timespec="milliseconds")
+        self.etapas = []
+        self.segundos = None
+        self.bytes_asignados = None
+        self.pico_bytes = None
+        self._inicio = time.perf_counter()
+        # Memoria de tracemalloc al empezar y pico absoluto visto hasta ahora (ver `_Medidor`).
+        self._mem0 = self._pico = None
+        if tracemalloc.is_tracing():
+            self._mem0 = self._pico = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def como_filas(self) -> list:
+        """
+        Una fila (dict) por etapa, más una fila 'total' con la duración de la ejecución, los bytes que
+        quedaron asignados al terminarla y su pico de memoria (incluye lo que pasa entre etapas).
+        """
+        base = {"fecha": self.fecha, "ejecucion": self.id, "nombre": self.nombre}
+        filas = [{**base, **e.como_dict()} for e in self.etapas]
+        filas.append({
+            **base, "etapa": "total", "segundos": round(self.segundos, 6),
+            "bytes_asignados": self.bytes_asignados, "pico_bytes": self.pico_bytes,
+        })
+        return filas
+
+
+class _Nula:
+    """Contexto vacío que se usa cuando no hay medición en curso."""
+
+    filas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+_NULA = _Nula()
+
+
+class _Medidor:
+    def __init__(self, registro: Registro, etapa: Etapa):
+        self._registro = registro
+        self._etapa = etapa
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            self._mem0, pico = tracemalloc.get_traced_memory()
+            # El pico desde la etapa anterior (código entre etapas) cuenta para el de la ejecución.
+            self._registro._pico = max(self._registro._pico or 0, pico)
+            tracemalloc.reset_peak()
+        self._t0 = time.perf_counter()
+        return self._etapa
+
+    def __exit__(self, *exc):
+        self._etapa.segundos = time.perf_counter() - self._t0
+        if tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            self._etapa.bytes_asignados = actual - self._mem0
+            self._etapa.pico_bytes = pico - self._mem0
+            self._registro._pico = max(self._registro._pico or 0, pico)
+        self._registro.etapas.append(self._etapa)
+        return False
+
+
+def etapa(nombre: str, filas: int = None):
+    """
+    Contexto que mide una etapa de la ejecución en curso:
+
+        with etapa("filtrado") as e:
+            df = ...
+            e.filas = len(df)
+
+    Si no hay una ejecución medida en curso (instrumentación apagada), no hace nada.
+    Las etapas no deben anidarse: el pico de memoria se reinicia al entrar a cada una.
+    """
+    registro = _actual.get()
+    if registro is None:
+        return _NULA
+    return _Medidor(registro, Etapa(nombre, filas))
+
+
+def iniciar(nombre: str):
+    """
+    Inicia la medición de una ejecución y la deja como la actual (las etapas se agregan a ella).
+    Devuelve None si la instrumentación está apagada o si ya hay una ejecución en curso en este contexto.
+    """
+    if not _ACTIVA or _actual.get() is not None:
+        return None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    registro = Registro(nombre)
+    _actual.set(registro)
+    return registro
+
+
+def finalizar(registro, al_finalizar=None):
+    """
+    Cierra la medición iniciada con `iniciar`, emite sus etapas como líneas JSON y, si se pasa,
+    llama a `al_finalizar(registro)` (p. ej. para guardarlo en la sesión y mostrarlo en la app).
+    """
+    if registro is None:
+        return None
+    registro.segundos = time.perf_counter() - registro._inicio
+    if tracemalloc.is_tracing() and registro._mem0 is not None:
+        actual, pico = tracemalloc.get_traced_memory()
+        registro.bytes_asignados = actual - registro._mem0
+        registro.pico_bytes = max(registro._pico, pico) - registro._mem0
+    _actual.set(None)
+    _emitir(registro)
+    if al_finalizar is not None:
+        al_finalizar(registro)
+    return registro
+
+
+@contextlib.contextmanager
+def ejecucion(nombre: str, al_finalizar=None):
+    """Contexto que mide su bloque como una ejecución; se cierra aunque el bloque lance una excepción."""
+    registro = iniciar(nombre)
+    try:
+        yield registro
+    finally:
+        finalizar(registro, al_finalizar)
+
+
+def instrumentado(nombre: str, al_finalizar=None):
+    """Decorador que mide cada llamada a la función como una ejecución (pensado para los fragmentos de la app)."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with ejecucion(nombre, al_finalizar):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _emitir(registro: Registro):
+    lineas = [json.dumps(f, ensure_ascii=False, default=str) for f in registro.como_filas()]
+    if _RUTA_LOG:
+        with _lock_log, open(_RUTA_LOG, "a", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+    else:
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+        for linea in lineas:
+            logger.info(linea)
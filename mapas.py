@@ -0,0 +1,210 @@
+## Proyecto a Donde Vivir - Mapas
+## ==============================
+##
+## Construcción del mapa de Folium con las propiedades geolocalizadas.
+##
+## Hay dos modos:
+## - "lote" (por defecto): las coordenadas y los datos del popup se arman de forma
+##   vectorizada y se envían como un único arreglo a un FastMarkerCluster; el popup
+##   se arma en el navegador con una plantilla JS recién cuando se hace click.
+## - "marcadores": el camino original, un CircleMarker con su propio Popup por fila.
+##
+## Para las vistas de varios distritos, `construir_mapa_distritos` arma un mapa de
+## coropletas (un polígono por distrito coloreado según su precio) que pesa lo mismo
+## tenga el distrito diez o diez mil propiedades.
+
+import copy
+from urllib.parse import quote
+
+import folium
+import numpy as np
+import pandas as pd
+from branca.colormap import LinearColormap
+from folium.plugins import FastMarkerCluster, Fullscreen, LocateControl, MarkerCluster, MiniMap
+
+from geometria import geojson_distritos
+
+
+MODOS_MAPA = ("lote", "marcadores")
+
+# Escala de colores de las coropletas, de menor a mayor precio.
+COLORES_COROPLETAS = ["#ffffb2", "#fecc5c", "#fd8d3c", "#f03b20", "#bd0026"]
+
+# Columnas de la data que lee el mapa (para construirlo a partir de una proyección de la data).
+COLUMNAS_MAPA = ["lat", "lon", "operacion", "direccion", "direccion_fix", "caracteristica", "precio_pen", "precio_usd", "enlace", "fuente"]
+
+# Columnas que se envían al navegador en el modo "lote", en este orden (ver `_CALLBACK_LOTE`).
+COLUMNAS_LOTE = ["lat", "lon", "color", "titulo", "caracteristica", "precio_pen", "precio_usd", "enlace", "fuente", "direccion"]
+
+# Plantilla del marcador y del popup, evaluada en el navegador para cada fila del arreglo.
+_CALLBACK_LOTE = """
+function (row) {
+    var esc = function (x) {
+        return String(x).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;");
+    };
+    var fmt = function (x) { return x.toLocaleString("en-US", {maximumFractionDigits: 0}); };
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {radius: 5, color: row[2], fill: true, fillOpacity: 0.8});
+    marker.bindTooltip(esc(row[3]));
+    marker.bindPopup(function () {
+        var gmaps = "https://www.google.com/maps/search/?api=1&query=" + encodeURIComponent(row[9] + ", Lima, Perú");
+        return "<b>Dirección:</b> " + esc(row[3]) + "<br>" +
+            "<b>Caracteristicas:</b> " + esc(row[4]) + "<br>" +
+            "<b>Precio PEN:</b> " + (row[5] === null ? "-" : "S/ " + fmt(row[5])) + "<br/>" +
+            "<b>Precio USD:</b> " + (row[6] === null ? "-" : "US$ " + fmt(row[6])) + "<br/>" +
+            "<b>Enlace:</b> <a href=\\"" + esc(row[7]) + "\\" target=\\"_blank\\">Abrir en " + esc(row[8]) + "</a><br>" +
+            "<a href=\\"" + gmaps + "\\" target=\\"_blank\\">Abrir en Google Maps</a>";
+    }, {maxWidth: 350});
+    return marker;
+}
+"""
+
+
+def _texto(serie: pd.Series, defecto: str) -> pd.Series:
+    """Convierte una columna a texto, reemplazando nulos por `defecto`."""
+    return serie.astype(object).where(serie.notna(), defecto).astype(str)
+
+
+def datos_marcadores(gdf: pd.DataFrame) -> list:
+    """
+    Arma, de forma vectorizada, una fila por propiedad con las columnas de `COLUMNAS_LOTE`.
+    Los precios nulos se envían como `None` para que la plantilla muestre '-'.
+    """
+    direccion = _texto(gdf["direccion"], "") if "direccion" in gdf else pd.Series("", index=gdf.index)
+    titulo = direccion
+    if "direccion_fix" in gdf:
+        titulo = _texto(gdf["direccion_fix"], "").where(gdf["direccion_fix"].notna(), direccion)
+
+    columnas = {
+        "lat": gdf["lat"].astype("float64"),
+        "lon": gdf["lon"].astype("float64"),
+        "color": pd.Series(np.where(gdf["operacion"] == "alquiler", "blue", "green"), index=gdf.index),
+        "titulo": titulo,
+        "caracteristica": _texto(gdf["caracteristica"], "-") if "caracteristica" in gdf else "-",
+        "precio_pen": gdf["precio_pen"].astype(object).where(gdf["precio_pen"].notna(), None),
+        "precio_usd": gdf["precio_usd"].astype(object).where(gdf["precio_usd"].notna(), None),
+        "enlace": _texto(gdf["enlace"], ""),
+        "fuente": _texto(gdf["fuente"], "-") if "fuente" in gdf else "-",
+        "direccion": direccion,
+    }
+    return pd.DataFrame(columnas, index=gdf.index)[COLUMNAS_LOTE].to_numpy(dtype=object).tolist()
+
+
+def _agregar_marcadores(gdf: pd.DataFrame, m: folium.Map):
+    """Camino original: un CircleMarker con Popup armado en Python por cada fila."""
+    cluster = MarkerCluster(name="Propiedades").add_to(m)
+
+    # Construye popup/tooltip seguros
+    def safe(x):
+        return "" if pd.isna(x) else str(x)
+
+    for _, r in gdf.iterrows():
+        gmaps_q = quote(f"{r.get('direccion', '')}, Lima, Perú")
+        popup_html = f"""
+        <b>Dirección:</b> {safe(r.get('direccion_fix') or r.get('direccion'))}<br>
+        <b>Caracteristicas:</b> {r.get('caracteristica','-')}<br>
+        <b>Precio PEN:</b> {f"S/ {r.get('precio_pen'):,.0f}" if pd.notna(r.get('precio_pen')) else '-'}<br/>
+        <b>Precio USD:</b> {f"US$ {r.get('precio_usd'):,.0f}" if pd.notna(r.get('precio_usd')) else '-'}<br/>
+        <b>Enlace:</b> <a href="{r['enlace']}" target="_blank">Abrir en {r.get('fuente','-')}</a><br>
+        <a href="https://www.google.com/maps/search/?api=1&query={gmaps_q}" target="_blank">Abrir en Google Maps</a>
+        """
+
+        color = 'blue' if r.get('operacion') == 'alquiler' else 'green'
+
+        folium.CircleMarker(
+            location=[r['lat'], r['lon']],
+            radius=5,
+            color=color,
+            fill=True,
+            fill_opacity=0.8,
+            tooltip=safe(r.get('direccion_fix') or r.get('direccion')),
+            popup=folium.Popup(popup_html, max_width=350),
+        ).add_to(cluster)
+
+
+def capa_marcadores(gdf: pd.DataFrame, nombre: str = "Propiedades") -> folium.FeatureGroup:
+    """
+    Capa con los marcadores de `gdf` en modo "lote", separada del mapa para poder pasarla a
+    `st_folium(feature_group_to_add=...)` y cambiarla sin volver a montar el mapa.
+    """
+    capa = folium.FeatureGroup(name=nombre)
+    FastMarkerCluster(datos_marcadores(gdf), callback=_CALLBACK_LOTE).add_to(capa)
+    return capa
+
+
+def peso_mapa(m: folium.Map) -> int:
+    """
+    Bytes del HTML de `m`, para la caché de artefactos: el mapa pesa lo que envía al navegador.
+    Se renderiza una copia, porque en folium renderizar un mapa también lo modifica.
+    """
+    return len(copy.deepcopy(m).get_root().render().encode("utf-8"))
+
+
+def construir_mapa(gdf: pd.DataFrame, modo: str = "lote", marcadores: bool = True) -> folium.Map:
+    """
+    Construye el mapa de Folium para propiedades con geolocalización válida.
+    `modo` es "lote" (una sola capa con plantilla en el navegador) o "marcadores" (un marcador por fila).
+    Con `marcadores=False` solo se arma el mapa base centrado en `gdf` (los marcadores se agregan
+    después con `capa_marcadores`).
+    """
+    if modo not in MODOS_MAPA:
+        raise ValueError(f"modo debe ser uno de {MODOS_MAPA}, no {modo!r}")
+
+    # Centro del mapa
+    center_lat, center_lon = gdf['lat'].mean(), gdf['lon'].mean()
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=15, tiles='OpenStreetMap')
+
+    MiniMap(toggle_display=True).add_to(m)
+    Fullscreen(position='topright').add_to(m)
+
+    # Controles útiles
+    LocateControl().add_to(m)
+
+    if not marcadores:
+        return m
+    if modo == "lote":
+        FastMarkerCluster(datos_marcadores(gdf), callback=_CALLBACK_LOTE, name="Propiedades").add_to(m)
+    else:
+        _agregar_marcadores(gdf, m)
+
+    return m
+
+
+def construir_mapa_distritos(geometria: dict, valores: pd.Series, conteo: pd.Series, etiqueta: str, simbolo: str) -> folium.Map:
+    """
+    Mapa de coropletas: el contorno de cada distrito de `valores` (indexado por distrito, p. ej. la
+    mediana del cubo de precios) coloreado según su valor, con el valor y la cantidad de propiedades
+    (`conteo`) en el tooltip. Los distritos sin valor o sin contorno en `geometria` no se dibujan.
+    """
+    valores = valores.dropna()
+    propiedades = {
+        distrito: {"valor": f"{simbolo} {valor:,.0f}", "n": f"{int(conteo.get(distrito, 0)):,}", "_v": float(valor)}
+        for distrito, valor in valores.items()
+    }
+    datos = geojson_distritos(geometria, propiedades)
+
+    coordenadas = np.array([p for f in datos["features"] for p in f["geometry"]["coordinates"][0]]).reshape(-1, 2)
+    if len(coordenadas):
+        (lon0, lat0), (lon1, lat1) = coordenadas.min(axis=0), coordenadas.max(axis=0)
+        centro = [(lat0 + lat1) / 2, (lon0 + lon1) / 2]
+    else:
+        centro = [-12.0464, -77.0428]
+    m = folium.Map(location=centro, zoom_start=11, tiles="OpenStreetMap")
+    Fullscreen(position="topright").add_to(m)
+    if not datos["features"]:
+        return m
+
+    minimo, maximo = valores.min(), valores.max()
+    escala = LinearColormap(COLORES_COROPLETAS, vmin=minimo, vmax=maximo if maximo > minimo else minimo + 1,
+                            caption=f"{etiqueta} ({simbolo})")
+    folium.GeoJson(
+        datos,
+        name="Distritos",
+        style_function=lambda f: {
+            "fillColor": escala(f["properties"]["_v"]), "color": "#555555", "weight": 1, "fillOpacity": 0.6,
+        },
+        highlight_function=lambda f: {"weight": 3, "fillOpacity": 0.8},
+        tooltip=folium.GeoJsonTooltip(fields=["distrito", "valor", "n"], aliases=["Distrito", etiqueta, "Propiedades"]),
+    ).add_to(m)
+    escala.add_to(m)
+    m.fit_bounds([[lat0, lon0], [lat1, lon1]])
+    return m
@@ -0,0 +1,297 @@
+## Proyecto a Donde Vivir - Reportes por distrito precalculados
+## ============================================================
+##
+## Genera, fuera de la app, el reporte de cada (operacion, inmueble, distrito) del
+## conjunto: los KPIs de precio, la tabla de propiedades y el mapa (HTML de Folium), más
+## una página HTML por reporte y un índice, que juntos son un export estático que se
+## puede distribuir y abrir sin la app (los mapas siguen usando Leaflet y los tiles de
+## OpenStreetMap desde internet).
+##
+## El trabajo se reparte en un pool de procesos. Cada proceso abre el conjunto desde la
+## caché en disco (ver `cache_disco`), así que la data se mapea en memoria y no se copia
+## a cada proceso; los reportes más grandes se encolan primero.
+##
+## El `manifest.json` guarda la llave del conjunto en la caché en disco (contenido del
+## archivo, versión del código y zonas): la app sirve los mapas precalculados solo si
+## coincide con la de la data que tiene cargada (ver `mapa_precalculado`). Por lo mismo, si
+## los reportes ya se generaron con esa llave, una nueva corrida no vuelve a generarlos
+## (salvo con `--forzar`).
+##
+##     <salida>/<conjunto>/
+##         manifest.json
+##         index.html
+##         <operacion>/<inmueble>/<distrito>/{index.html, kpis.json, tabla.csv, mapa.html}
+##
+## Uso:
+##     python reportes.py --conjunto lima --procesos 8 --salida ./data/reportes --zip
+
+import argparse
+import html
+import json
+import os
+import shutil
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import cache_disco
+from conjuntos import CONJUNTO_POR_DEFECTO, cargar_conjunto, leer_registro
+from datos import ruta_datos
+from estadisticas import kpis_precios
+from filtros import columna_precio
+from indices import subconjunto
+
+
+# Carpeta de los reportes; la app la lee de la misma variable de entorno.
+DIRECTORIO_REPORTES = os.environ.get("ADONDE_VIVIR_REPORTES_DIR", "./data/reportes")
+
+ARCHIVO_MANIFIESTO = "manifest.json"
+
+# Operaciones con pestaña por distrito en la app.
+OPERACIONES = ["alquiler", "venta"]
+
+# Columnas de la tabla de cada reporte (las de la tabla de detalle de la app).
+COLUMNAS_TABLA = ["enlace", "fuente", "direccion", "precio_pen", "precio_usd", "area", "dormitorio", "baños",
+                  "estacionamientos", "mantenimiento", "caracteristica"]
+
+# Filas de la tabla que se incluyen en la página HTML (la tabla completa va en tabla.csv).
+MAX_FILAS_HTML = 500
+
+# Conjunto abierto en cada proceso del pool (ver `_iniciar_proceso`).
+_conjunto = None
+
+
+def slug(texto: str) -> str:
+    """Nombre de carpeta para `texto`: sin tildes, en minúsculas y con guiones."""
+    ascii_ = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").lower()
+    return "-".join("".join(c if c.isalnum() else " " for c in ascii_).split()) or "sin-nombre"
+
+
+def clave_reporte(operacion, inmueble, distrito) -> str:
+    """Llave de un reporte en el manifiesto."""
+    return f"{operacion}|{inmueble}|{distrito}"
+
+
+def version_reportes(conjunto: dict) -> str:
+    """Versión con la que se generan los reportes: la llave del conjunto en la caché en disco."""
+    return cache_disco.clave_cache(ruta_datos(conjunto["ruta"]), conjunto["zonas"])
+
+
+def _iniciar_proceso(id_conjunto: str, conjunto: dict):
+    global _conjunto
+    _conjunto = cargar_conjunto(id_conjunto, conjunto)
+
+
+def _tabla_html(tabla) -> str:
+    """
+    Tabla HTML de las propiedades, armada columna por columna (`DataFrame.to_html` formatea celda por
+    celda y era la mitad del tiempo de cada reporte). Los números van sin decimales y los nulos como '-'.
+    """
+    columnas = []
+    for col in tabla.columns:
+        x = tabla[col]
+        if col == "enlace":
+            texto = x.map(lambda v: "-" if pd.isna(v) else f"<a href='{html.escape(str(v))}' target='_blank'>Abrir</a>")
+        elif pd.api.types.is_numeric_dtype(x):
+            texto = x.map(lambda v: "-" if pd.isna(v) else f"{v:,.0f}")
+        else:
+            texto = x.map(lambda v: "-" if pd.isna(v) else html.escape(str(v)))
+        columnas.append(texto.tolist())
+    cabecera = "".join(f"<th>{html.escape(str(c))}</th>" for c in tabla.columns)
+    filas = "".join("<tr><td>" + "</td><td>".join(fila) + "</td></tr>" for fila in zip(*columnas))
+    return f"<table><thead><tr>{cabecera}</tr></thead><tbody>{filas}</tbody></table>"
+
+
+def _pagina(titulo: str, kpis: dict, simbolo: str, tabla, total: int, con_mapa: bool) -> str:
+    """Página HTML autocontenida de un reporte."""
+    fmt = lambda x: f"{simbolo} {x:,.0f}"
+    if kpis:
+        filas_kpi = [
+            ("Total", f"{kpis['n']:,}"), ("Mínimo", fmt(kpis["min"])), ("Máximo", fmt(kpis["max"])),
+            ("Promedio", f"{fmt(kpis['mean'])} ({kpis['delta_mean']:+,.0f} vs. promedio general)"),
+            ("Mediana", f"{fmt(kpis['median'])} ({kpis['delta_median']:+,.0f} vs. mediana general)"),
+        ]
+        bloque_kpis = "<table class='kpis'>" + "".join(
+            f"<tr><th>{html.escape(k)}</th><td>{html.escape(v)}</td></tr>" for k, v in filas_kpi
+        ) + "</table>"
+    else:
+        bloque_kpis = "<p>No hay datos de precios para mostrar KPIs.</p>"
+    mapa = "<iframe src='mapa.html' width='100%' height='600' style='border:0'></iframe>" if con_mapa else \
+        "<p>No hay propiedades con geolocalización válida para graficar.</p>"
+    nota = f"<p>Se muestran {len(tabla):,} de {total:,} propiedades (ordenadas por precio); todas en <a href='tabla.csv'>tabla.csv</a>.</p>"
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>{html.escape(titulo)}</title>
+<style>body{{font-family:sans-serif;margin:2em}} table{{border-collapse:collapse}} td,th{{border:1px solid #ddd;padding:4px 8px}}</style>
+</head><body>
+<p><a href="../../../index.html">← Todos los reportes</a></p>
+<h1>{html.escape(titulo)}</h1>
+<h2>KPIs de precios ({html.escape(simbolo)})</h2>
+{bloque_kpis}
+<h2>Mapa</h2>
+{mapa}
+<h2>Propiedades</h2>
+{nota}
+{_tabla_html(tabla)}
+</body></html>
+"""
+
+
+def renderizar_reporte(operacion, inmueble, distrito, carpeta) -> dict:
+    """
+    Escribe el reporte de (operacion, inmueble, distrito) en `carpeta` con el conjunto abierto en el proceso.
+    Devuelve su entrada del manifiesto (sin la ruta, que agrega `generar_reportes`).
+    """
+    from mapas import construir_mapa
+
+    inicio = time.perf_counter()
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    df = subconjunto(_conjunto["data"], _conjunto["indice_filtros"], inmueble, operacion, distrito=distrito)
+    col_precio = columna_precio(operacion)
+
+    kpis = kpis_precios(df[col_precio], _conjunto["cubo_precios"], inmueble, operacion)
+    with open(carpeta / "kpis.json", "w", encoding="utf-8") as f:
+        json.dump(kpis, f, ensure_ascii=False, indent=1)
+
+    tabla = df[[c for c in COLUMNAS_TABLA if c in df.columns]].sort_values(col_precio, kind="stable")
+    tabla.to_csv(carpeta / "tabla.csv", index=False, encoding="utf-8")
+
+    gdf = df.loc[df["geo_valido"]]
+    if not gdf.empty:
+        construir_mapa(gdf).save(str(carpeta / "mapa.html"))
+
+    titulo = f"{inmueble} en {operacion} en {distrito}".capitalize()
+    simbolo = "$" if operacion == "venta" else "S/"
+    with open(carpeta / "index.html", "w", encoding="utf-8") as f:
+        f.write(_pagina(titulo, kpis, simbolo, tabla.head(MAX_FILAS_HTML), len(tabla), con_mapa=not gdf.empty))
+
+    return {
+        "operacion": operacion, "inmueble": inmueble, "distrito": distrito,
+        "filas": len(df), "geolocalizadas": len(gdf), "mapa": not gdf.empty,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def _indice_html(nombre: str, entradas: list) -> str:
+    """Página de inicio del export: un enlace por reporte, agrupados por operación e inmueble."""
+    secciones = []
+    for operacion in OPERACIONES:
+        por_inmueble = {}
+        for e in entradas:
+            if e["operacion"] == operacion:
+                por_inmueble.setdefault(e["inmueble"], []).append(e)
+        for inmueble, grupo in sorted(por_inmueble.items()):
+            enlaces = "".join(
+                f"<li><a href='{html.escape(e['ruta'])}/index.html'>{html.escape(e['distrito'])}</a> ({e['filas']:,})</li>"
+                for e in sorted(grupo, key=lambda e: e["distrito"])
+            )
+            secciones.append(f"<h2>{html.escape(inmueble.capitalize())} en {operacion}</h2><ul>{enlaces}</ul>")
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>{html.escape(nombre)} - Reportes por distrito</title>
+<style>body{{font-family:sans-serif;margin:2em}} ul{{columns:3}}</style></head><body>
+<h1>{html.escape(nombre)} - Reportes por distrito</h1>
+{"".join(secciones)}
+</body></html>
+"""
+
+
+def generar_reportes(id_conjunto: str, conjunto: dict, salida=DIRECTORIO_REPORTES, procesos: int = None,
+                     forzar: bool = False) -> dict:
+    """
+    Genera los reportes de todas las combinaciones (operacion, inmueble, distrito) con propiedades de
+    `OPERACIONES`, repartidos en `procesos` procesos (por defecto, uno por CPU). Los escribe en una carpeta
+    temporal y la pone en `<salida>/<id_conjunto>` al terminar, reemplazando la anterior. Devuelve el manifiesto.
+    Si los reportes de `<salida>/<id_conjunto>` ya son de la versión actual, devuelve su manifiesto sin
+    generar nada, salvo con `forzar`.
+    """
+    inicio = time.perf_counter()
+    version = version_reportes(conjunto)
+    existente = leer_manifiesto(id_conjunto, salida)
+    if not forzar and existente.get("version") == version:
+        return existente
+
+    # Se abre una vez en el proceso principal: si la caché en disco no existía, queda escrita para los demás.
+    cargado = cargar_conjunto(id_conjunto, conjunto)
+    llaves = sorted(
+        ((op, inm, dist, len(pos)) for (inm, op, dist), pos in cargado["indice_filtros"]["distrito"].items() if op in OPERACIONES),
+        key=lambda t: -t[3],
+    )
+    del cargado
+
+    destino = Path(salida) / id_conjunto
+    temporal = destino.with_name(f"{destino.name}.tmp-{os.getpid()}")
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+
+    entradas = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(id_conjunto, conjunto)) as pool:
+        futuros = {}
+        for op, inm, dist, _ in llaves:
+            ruta = f"{slug(op)}/{slug(inm)}/{slug(dist)}"
+            futuros[pool.submit(renderizar_reporte, op, inm, dist, temporal / ruta)] = ruta
+        for futuro in as_completed(futuros):
+            entradas.append({**futuro.result(), "ruta": futuros[futuro]})
+    entradas.sort(key=lambda e: (e["operacion"], e["inmueble"], e["distrito"]))
+
+    manifiesto = {
+        "conjunto": id_conjunto,
+        "version": version,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "segundos": round(time.perf_counter() - inicio, 1),
+        "reportes": {clave_reporte(e["operacion"], e["inmueble"], e["distrito"]): e for e in entradas},
+    }
+    with open(temporal / ARCHIVO_MANIFIESTO, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+    with open(temporal / "index.html", "w", encoding="utf-8") as f:
+        f.write(_indice_html(conjunto.get("nombre", id_conjunto), entradas))
+
+    # Se reemplaza la versión anterior de una vez; un lector ve la vieja o la nueva, completa.
+    anterior = destino.with_name(f"{destino.name}.old-{os.getpid()}")
+    if destino.exists():
+        os.rename(destino, anterior)
+    os.rename(temporal, destino)
+    shutil.rmtree(anterior, ignore_errors=True)
+    return manifiesto
+
+
+def leer_manifiesto(id_conjunto: str, salida=DIRECTORIO_REPORTES) -> dict:
+    """Manifiesto de los reportes de `id_conjunto` (vacío si no se generaron)."""
+    ruta = Path(salida) / id_conjunto / ARCHIVO_MANIFIESTO
+    if not ruta.exists():
+        return {}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mapa_precalculado(manifiesto: dict, version: str, operacion, inmueble, distrito, salida=DIRECTORIO_REPORTES):
+    """
+    Ruta del mapa HTML precalculado de (operacion, inmueble, distrito), o None si no hay uno generado
+    con la `version` actual de la data (ver `version_reportes`).
+    """
+    if manifiesto.get("version") != version:
+        return None
+    entrada = manifiesto["reportes"].get(clave_reporte(operacion, inmueble, distrito))
+    if entrada is None or not entrada["mapa"]:
+        return None
+    return Path(salida) / manifiesto["conjunto"] / entrada["ruta"] / "mapa.html"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera los reportes por distrito (KPIs, tabla y mapa) y el export estático.")
+    parser.add_argument("--conjunto", default=CONJUNTO_POR_DEFECTO, help="Id del conjunto de datos (ver conjuntos.py)")
+    parser.add_argument("--salida", default=DIRECTORIO_REPORTES, help="Carpeta de los reportes")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--zip", action="store_true", help="Empaquetar además el export en <salida>/<conjunto>.zip")
+    parser.add_argument("--forzar", action="store_true", help="Generar los reportes aunque ya estén al día con la data")
+    args = parser.parse_args()
+
+    conjunto = leer_registro()[args.conjunto]
+    manifiesto = generar_reportes(args.conjunto, conjunto, args.salida, args.procesos, forzar=args.forzar)
+    print(f"{len(manifiesto['reportes']):,} reportes en {Path(args.salida) / args.conjunto} ({manifiesto['segundos']:,} s)")
+    if args.zip:
+        archivo = shutil.make_archive(str(Path(args.salida) / args.conjunto), "zip", Path(args.salida), args.conjunto)
+        print(f"Export estático: {archivo}")
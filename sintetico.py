@@ -0,0 +1,159 @@
+## Proyecto a Donde Vivir - Generador de anuncios sintéticos
+## =========================================================
+##
+## Genera anuncios ficticios pero realistas (mismas columnas que el CSV scrapeado)
+## repartidos por los distritos de `datos.ZONAS_LIMA`, para benchmarks y pruebas
+## de carga sin depender de la data real.
+##
+## Uso:
+##     python sintetico.py 100000 ./data/sintetico_100k.csv
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from datos import ZONAS_LIMA
+
+
+# Centro aproximado (lat, lon) de cada distrito.
+CENTROS_DISTRITOS = {
+    'Miraflores': (-12.1211, -77.0297), 'San Isidro': (-12.0975, -77.0365), 'La Molina': (-12.0797, -76.9406),
+    'Santiago de Surco': (-12.1450, -76.9917), 'San Borja': (-12.1000, -76.9986), 'Barranco': (-12.1490, -77.0210),
+    'Jesús María': (-12.0761, -77.0497), 'Lince': (-12.0850, -77.0350), 'Magdalena': (-12.0913, -77.0697),
+    'San Miguel': (-12.0772, -77.0900), 'Pueblo Libre': (-12.0750, -77.0630), 'Surquillo': (-12.1150, -77.0150),
+    'Lima Cercado': (-12.0464, -77.0428), 'Breña': (-12.0600, -77.0530), 'La Victoria': (-12.0700, -77.0150),
+    'Rímac': (-12.0300, -77.0300), 'San Luis': (-12.0750, -76.9950),
+    'Ate Vitarte': (-12.0300, -76.9200), 'Cieneguilla': (-12.1100, -76.8100), 'Chaclacayo': (-11.9800, -76.7700),
+    'Chosica Lurigancho': (-11.9400, -76.7000), 'Santa Anita': (-12.0450, -76.9700), 'El Agustino': (-12.0450, -76.9950),
+    'San Juan de Lurigancho': (-11.9800, -77.0000),
+    'Carabayllo': (-11.8500, -77.0300), 'Comas': (-11.9350, -77.0500), 'Independencia': (-11.9900, -77.0550),
+    'Los Olivos': (-11.9700, -77.0700), 'Puente Piedra': (-11.8650, -77.0750), 'San Martín de Porres': (-12.0000, -77.0800),
+    'Ancón': (-11.7700, -77.1700), 'Santa Rosa': (-11.8000, -77.1650),
+    'Chorrillos': (-12.1700, -77.0150), 'Lurín': (-12.2750, -76.8700), 'Pachacámac': (-12.2300, -76.8600),
+    'San Juan de Miraflores': (-12.1600, -76.9700), 'Villa El Salvador': (-12.2100, -76.9400),
+    'Villa María del Triunfo': (-12.1600, -76.9400), 'Pucusana': (-12.4800, -76.8000), 'Punta Hermosa': (-12.3350, -76.8250),
+    'Punta Negra': (-12.3650, -76.7950), 'San Bartolo': (-12.3900, -76.7800), 'Santa María del Mar': (-12.4050, -76.7750),
+}
+
+# Por zona: peso relativo de anuncios por distrito, precio por m² de venta (US$) y de alquiler (S/).
+PERFIL_ZONAS = {
+    'Lima Top': (6.0, 2300, 48),
+    'Lima Moderna': (3.0, 1750, 38),
+    'Lima Centro': (1.5, 1250, 30),
+    'Lima Este': (1.0, 1000, 25),
+    'Lima Norte': (1.0, 950, 24),
+    'Lima Sur': (1.0, 1000, 26),
+}
+
+# Por inmueble: probabilidad, mediana del área (m²) y dispersión (log).
+PERFIL_INMUEBLES = {
+    'departamento': (0.70, 85, 0.45),
+    'casa': (0.20, 180, 0.50),
+    'terreno': (0.10, 300, 0.70),
+}
+
+TIPO_CAMBIO = 3.75
+CALLES = ["Av. Larco", "Av. Pardo", "Jr. Huallaga", "Av. Arequipa", "Calle Los Pinos", "Av. Javier Prado",
+          "Jr. de la Unión", "Av. Brasil", "Calle Las Begonias", "Av. Benavides", "Av. La Marina", "Jr. Ica",
+          "Av. Angamos", "Av. Salaverry", "Calle Los Álamos", "Av. Primavera", "Jr. Junín", "Av. Universitaria",
+          "Av. Túpac Amaru", "Calle Schell", "Av. El Sol", "Jr. Moquegua", "Av. Faucett", "Calle Las Flores"]
+AMENIDADES = ["piscina", "terraza", "amoblado", "vista al mar", "gimnasio", "ascensor", "jardín",
+              "parrilla", "seguridad 24h", "cochera", "pet friendly", "área de juegos"]
+
+
+def generar_anuncios(n: int, seed: int = 0, duplicados: float = 0.05) -> pd.DataFrame:
+    """
+    Genera `n` anuncios con las columnas del CSV scrapeado.
+    Una fracción `duplicados` son re-publicaciones del mismo inmueble en el otro portal, con la
+    dirección escrita de otra forma (como ocurre entre Urbania y Adondevivir).
+    """
+    rng = np.random.default_rng(seed)
+    n_base = n - int(n * duplicados)
+
+    # Distrito, ponderado por la zona.
+    distritos = np.array([d for zona in ZONAS_LIMA.values() for d in zona])
+    zona_de = np.array([z for z, ds in ZONAS_LIMA.items() for _ in ds])
+    pesos = np.array([PERFIL_ZONAS[z][0] for z in zona_de])
+    idx = rng.choice(len(distritos), n_base, p=pesos / pesos.sum())
+    distrito, zona = distritos[idx], zona_de[idx]
+
+    # Inmueble, operación y área.
+    nombres_inm = list(PERFIL_INMUEBLES)
+    p_inm = np.array([PERFIL_INMUEBLES[i][0] for i in nombres_inm])
+    i_inm = rng.choice(len(nombres_inm), n_base, p=p_inm)
+    inmueble = np.array(nombres_inm)[i_inm]
+    operacion = rng.choice(["alquiler", "venta"], n_base, p=[0.45, 0.55])
+    area_mediana = np.array([PERFIL_INMUEBLES[i][1] for i in nombres_inm])[i_inm]
+    area_sigma = np.array([PERFIL_INMUEBLES[i][2] for i in nombres_inm])[i_inm]
+    area = np.maximum(20, np.round(area_mediana * rng.lognormal(0, area_sigma)))
+
+    # Precio según zona y área, con ruido.
+    m2_venta = pd.Series(zona).map({z: p[1] for z, p in PERFIL_ZONAS.items()}).to_numpy()
+    m2_alquiler = pd.Series(zona).map({z: p[2] for z, p in PERFIL_ZONAS.items()}).to_numpy()
+    ruido = rng.lognormal(0, 0.25, n_base)
+    precio_usd = np.round(np.where(operacion == "venta", area * m2_venta * ruido, area * m2_alquiler * ruido / TIPO_CAMBIO), -1)
+    precio_pen = np.round(precio_usd * TIPO_CAMBIO, -1)
+
+    # Ambientes: en terrenos no aplica.
+    es_terreno = inmueble == "terreno"
+    dormitorio = np.where(es_terreno, 0, np.clip(np.round(area / 35 + rng.normal(0, 0.7, n_base)), 1, 8)).astype(int)
+    banos = np.where(es_terreno, 0, np.clip(dormitorio - rng.integers(0, 2, n_base), 1, 6)).astype(int)
+    estacionamientos = np.where(es_terreno, 0, rng.choice([0, 1, 2, 3], n_base, p=[0.35, 0.45, 0.15, 0.05]))
+    mantenimiento = np.where(
+        (inmueble == "departamento") & (operacion == "alquiler"),
+        np.round(area * rng.uniform(2, 6, n_base), -1), np.nan
+    )
+
+    # Características: 0 a 4 amenidades.
+    n_amen = rng.integers(0, 5, n_base)
+    amen = rng.integers(0, len(AMENIDADES), (n_base, 4))
+    caracteristica = [", ".join(sorted({AMENIDADES[a] for a in fila[:k]})) or None for fila, k in zip(amen, n_amen)]
+
+    # Dirección y geolocalización (85% geocodificado alrededor del centro del distrito).
+    calle = np.array(CALLES)[rng.integers(0, len(CALLES), n_base)]
+    numero = rng.integers(100, 10000, n_base)
+    direccion = [f"{c} {num}" for c, num in zip(calle, numero)]
+    centros = np.array([CENTROS_DISTRITOS[d] for d in distrito])
+    geo = rng.random(n_base) < 0.85
+    lat = np.where(geo, centros[:, 0] + rng.normal(0, 0.008, n_base), np.nan)
+    lon = np.where(geo, centros[:, 1] + rng.normal(0, 0.008, n_base), np.nan)
+    status = np.where(geo, "geo", "not_found")
+
+    fuente = rng.choice(["urbania", "adondevivir"], n_base)
+    ids = rng.permutation(n_base * 10)[:n_base] + 10_000_000
+    dominio = np.where(fuente == "urbania", "https://urbania.pe/inmueble/", "https://www.adondevivir.com/propiedades/")
+    enlace = [f"{d}{i}" for d, i in zip(dominio, ids)]
+
+    df = pd.DataFrame({
+        "fuente": fuente, "enlace": enlace, "distrito_oficial": distrito, "direccion": direccion,
+        "inmueble": inmueble, "operacion": operacion, "precio_pen": precio_pen, "precio_usd": precio_usd,
+        "area": area, "dormitorio": dormitorio, "baños": banos, "estacionamientos": estacionamientos,
+        "mantenimiento": mantenimiento, "caracteristica": caracteristica, "status": status, "lat": lat, "lon": lon,
+    })
+
+    # Re-publicaciones en el otro portal con la dirección escrita de otra forma.
+    n_dup = n - n_base
+    if n_dup:
+        dup = df.iloc[rng.integers(0, n_base, n_dup)].copy()
+        dup["fuente"] = np.where(dup["fuente"] == "urbania", "adondevivir", "urbania")
+        dup["direccion"] = (
+            dup["direccion"].str.replace("Av. ", "Avenida ", regex=False)
+            .str.replace("Jr. ", "Jirón ", regex=False)
+            .str.upper()
+        )
+        dup["enlace"] = [f"https://www.adondevivir.com/propiedades/dup-{i}" for i in range(n_dup)]
+        df = pd.concat([df, dup], ignore_index=True)
+
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un CSV de anuncios sintéticos con el formato scrapeado.")
+    parser.add_argument("filas", type=int, help="Cantidad de anuncios (p. ej. 10000, 100000, 1000000)")
+    parser.add_argument("salida", help="Ruta del CSV (separado por '|')")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generar_anuncios(args.filas, seed=args.seed).to_csv(args.salida, sep="|", index=False, encoding="utf-8")
+    print(f"{args.filas:,} anuncios escritos en {args.salida}")
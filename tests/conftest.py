@@ -0,0 +1,47 @@
+## Pruebas - configuración común
+## =============================
+##
+## La app se prueba con `streamlit.testing` (AppTest) sobre data sintética (`sintetico.py`),
+## escrita una sola vez por sesión de pruebas en una carpeta temporal que hace de directorio
+## de trabajo (la app lee `./data`).
+
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+from sintetico import generar_anuncios
+
+APP = RAIZ / "adonde_vivir_oficial.py"
+
+# Distrito al que se mueven los primeros anuncios, para que pase de `MAX_MARCADORES_MAPA`
+# propiedades geolocalizadas y su mapa sea el de la vista (`create_map_ventana`).
+DISTRITO_GRANDE = "Miraflores"
+ANUNCIOS_DISTRITO_GRANDE = 3000
+
+
+@pytest.fixture(scope="session")
+def carpeta_app(tmp_path_factory):
+    """Directorio de trabajo con `data/data_alquiler_venta.csv` sintético."""
+    carpeta = tmp_path_factory.mktemp("app")
+    (carpeta / "data").mkdir()
+    df = generar_anuncios(8000)
+    grandes = df.index[:ANUNCIOS_DISTRITO_GRANDE]
+    df.loc[grandes, ["distrito_oficial", "operacion", "inmueble", "status"]] = [DISTRITO_GRANDE, "alquiler", "departamento", "geo"]
+    df.loc[grandes, "lat"] = df.loc[grandes, "lat"].fillna(-12.12)
+    df.loc[grandes, "lon"] = df.loc[grandes, "lon"].fillna(-77.03)
+    df.to_csv(carpeta / "data" / "data_alquiler_venta.csv", sep="|", index=False, encoding="utf-8")
+    return carpeta
+
+
+@pytest.fixture
+def app(carpeta_app, monkeypatch):
+    """AppTest de la app, sin ejecutar, con `carpeta_app` como directorio de trabajo."""
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.chdir(carpeta_app)
+    return AppTest.from_file(str(APP), default_timeout=300)
@@ -0,0 +1,42 @@
+## Pruebas - búsqueda por palabras
+## ===============================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from busqueda import buscar, construir_indice_busqueda
+
+
+@pytest.fixture(scope="module")
+def indice():
+    df = pd.DataFrame({
+        "direccion": ["Calle Los Pinos 120", "Av. Larco 345", "Avenida Larco 900", "Jr. Tacna 450 Nro 3", "Casa de playa"],
+        "caracteristica": ["piscina, terraza", "ascensor", "terraza", None, "jardin, piscina"],
+    })
+    return construir_indice_busqueda(df)
+
+
+def test_prefijo_que_es_abreviatura_sigue_siendo_prefijo(indice):
+    # "ca" es una variante de "calle", pero a medio escribir también puede ser "casa".
+    assert buscar(indice, "ca").tolist() == [0, 4]
+    assert buscar(indice, "cas").tolist() == [4]
+
+
+def test_palabra_que_el_indice_no_guarda_no_vacia_la_consulta(indice):
+    todas = np.arange(5)
+    assert buscar(indice, "no", dentro=todas).tolist() == []
+    assert buscar(indice, "n", dentro=todas).tolist() == []
+    # Como palabra completa se omite, igual que en el índice.
+    assert buscar(indice, "nro 450", dentro=todas).tolist() == [3]
+
+
+def test_abreviaturas_en_palabras_completas(indice):
+    assert buscar(indice, "avenida larco").tolist() == [1, 2]
+    assert buscar(indice, "larco avenida").tolist() == [1, 2]
+    assert buscar(indice, "calle pinos").tolist() == [0]
+
+
+def test_consulta_vacia_no_filtra(indice):
+    assert buscar(indice, " , ", dentro=np.array([1, 3])).tolist() == [1, 3]
+    assert buscar(indice, "piscina terr").tolist() == [0]
@@ -0,0 +1,79 @@
+## Pruebas - caché de artefactos
+## =============================
+
+import pytest
+
+from cache_artefactos import CacheArtefactos
+
+
+class _Construir:
+    """Construye el artefacto `valor` y cuenta cuántas veces se llamó."""
+
+    def __init__(self, valor):
+        self.valor = valor
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return self.valor
+
+
+def test_hit_no_reconstruye():
+    cache = CacheArtefactos(max_bytes=100)
+    construir = _Construir("a")
+    assert cache.obtener("a", construir, peso=10) == "a"
+    assert cache.obtener("a", construir, peso=10) == "a"
+    assert construir.llamadas == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_desaloja_la_menos_usada_al_pasar_el_tope():
+    cache = CacheArtefactos(max_bytes=100)
+    for clave in "abc":
+        cache.obtener(clave, _Construir(clave), peso=40)
+    # Al entrar "c" (120 bytes en total) sale "a", la menos usada.
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+    cache.obtener("b", _Construir("b"), peso=40)
+    cache.obtener("d", _Construir("d"), peso=40)
+    # "b" se usó después que "c": ahora sale "c".
+    assert "b" in cache and "c" not in cache and "d" in cache
+    stats = cache.estadisticas()
+    assert (stats["evictions"], stats["entradas"], stats["bytes"]) == (2, 2, 80)
+
+
+def test_peso_como_funcion_del_artefacto():
+    cache = CacheArtefactos(max_bytes=100)
+    cache.obtener("a", _Construir("x" * 30), peso=len)
+    assert cache.estadisticas()["bytes"] == 30
+
+
+@pytest.mark.parametrize("peso", [51, 101])
+def test_entrada_mas_pesada_que_el_tope_no_se_guarda(peso):
+    cache = CacheArtefactos(max_bytes=100, max_bytes_entrada=50)
+    cache.obtener("a", _Construir("a"), peso=40)
+    construir = _Construir("grande")
+    assert cache.obtener("grande", construir, peso=peso) == "grande"
+    assert cache.obtener("grande", construir, peso=peso) == "grande"
+
+    # Se devuelve pero no se guarda, y no desaloja a las demás.
+    assert construir.llamadas == 2 and "grande" not in cache and "a" in cache
+    assert cache.estadisticas()["evictions"] == 0
+
+
+def test_tope_de_entradas():
+    cache = CacheArtefactos(max_bytes=1000, max_entradas=1)
+    cache.obtener("a", _Construir("a"), peso=10)
+    cache.obtener("b", _Construir("b"), peso=10)
+    assert "a" not in cache and "b" in cache
+    stats = cache.estadisticas()
+    assert (stats["evictions"], stats["entradas"], stats["bytes"]) == (1, 1, 10)
+
+
+def test_limpiar_conserva_contadores():
+    cache = CacheArtefactos(max_bytes=100)
+    cache.obtener("a", _Construir("a"), peso=10)
+    cache.limpiar()
+    assert "a" not in cache
+    stats = cache.estadisticas()
+    assert (stats["misses"], stats["entradas"], stats["bytes"]) == (1, 0, 0)
@@ -0,0 +1,97 @@
+## Pruebas - caché en disco de la data precalculada
+## ================================================
+
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache_disco
+from conjuntos import construir_conjunto
+from datos import ZONAS_LIMA
+from sintetico import generar_anuncios
+
+
+def _iguales(a, b, ruta="conjunto"):
+    """Compara lo calculado en memoria con lo leído de disco (las tuplas vuelven del JSON como listas)."""
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b, obj=ruta)
+    elif isinstance(a, dict):
+        assert set(a) == set(b), ruta
+        for clave in a:
+            _iguales(a[clave], b[clave], f"{ruta}[{clave!r}]")
+    elif isinstance(a, np.ndarray):
+        b = np.asarray(b)
+        assert a.dtype == b.dtype and a.shape == b.shape, ruta
+        assert np.array_equal(a, b, equal_nan=a.dtype.kind == "f"), ruta
+    elif isinstance(a, tuple):
+        assert list(a) == list(b), ruta
+    else:
+        assert a == b, ruta
+
+
+@pytest.fixture
+def fuente(tmp_path, monkeypatch):
+    """CSV sintético en una carpeta temporal (que también es el directorio de trabajo)."""
+    monkeypatch.chdir(tmp_path)
+    ruta = tmp_path / "anuncios.csv"
+    generar_anuncios(1500).to_csv(ruta, sep="|", index=False, encoding="utf-8")
+    return ruta
+
+
+def test_lo_leido_de_disco_es_igual_a_lo_construido(fuente, tmp_path):
+    construido = construir_conjunto(str(fuente), ZONAS_LIMA)
+    carpeta = tmp_path / "cache" / "entrada"
+    carpeta.parent.mkdir()
+    cache_disco.guardar(carpeta, construido)
+    leido = cache_disco.leer(carpeta)
+
+    assert set(leido) == set(construido)
+    for parte in ["indice_filtros", "cubo_precios", "rangos_orden", "indice_espacial",
+                  "indice_comparables", "indice_busqueda", "geometria_distritos"]:
+        _iguales(construido[parte], leido[parte], parte)
+    pd.testing.assert_frame_equal(construido["data"], leido["data"])
+    # Los arrays se mapean en memoria y son de solo lectura.
+    assert isinstance(leido["indice_comparables"]["matriz"], np.memmap)
+    assert not leido["indice_comparables"]["matriz"].flags.writeable
+
+
+def test_cargar_o_construir_calcula_una_sola_vez(fuente, tmp_path):
+    llamadas = []
+
+    def construir():
+        llamadas.append(1)
+        return construir_conjunto(str(fuente), ZONAS_LIMA)
+
+    primero = cache_disco.cargar_o_construir(fuente, ZONAS_LIMA, construir, directorio=tmp_path / "cache")
+    segundo = cache_disco.cargar_o_construir(fuente, ZONAS_LIMA, construir, directorio=tmp_path / "cache")
+    assert len(llamadas) == 1
+    _iguales(primero["indice_busqueda"], segundo["indice_busqueda"])
+
+
+def test_la_llave_cambia_con_el_archivo_fuente(fuente):
+    antes = cache_disco.clave_cache(fuente, ZONAS_LIMA)
+    assert cache_disco.clave_cache(fuente, ZONAS_LIMA) == antes
+    with open(fuente, "a", encoding="utf-8") as f:
+        f.write(open(fuente, encoding="utf-8").read().splitlines()[1] + "\n")
+    assert cache_disco.clave_cache(fuente, ZONAS_LIMA) != antes
+    # El mapeo de zonas también es parte de la llave.
+    assert cache_disco.clave_cache(fuente, {"Centro": ["Lima"]}) != cache_disco.clave_cache(fuente, ZONAS_LIMA)
+
+
+def test_la_llave_cambia_con_la_version_del_codigo(fuente, tmp_path, monkeypatch):
+    codigo = tmp_path / "codigo"
+    codigo.mkdir()
+    for modulo in cache_disco.MODULOS_CODIGO:
+        shutil.copy(cache_disco._RAIZ / modulo, codigo / modulo)
+    monkeypatch.setattr(cache_disco, "_RAIZ", codigo)
+    cache_disco.version_codigo.cache_clear()
+    try:
+        antes = cache_disco.clave_cache(fuente, ZONAS_LIMA)
+        with open(codigo / "indices.py", "a", encoding="utf-8") as f:
+            f.write("\n# cambio\n")
+        cache_disco.version_codigo.cache_clear()
+        assert cache_disco.clave_cache(fuente, ZONAS_LIMA) != antes
+    finally:
+        cache_disco.version_codigo.cache_clear()
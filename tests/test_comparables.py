@@ -0,0 +1,65 @@
+## Pruebas - propiedades comparables
+## =================================
+
+import numpy as np
+import pytest
+
+from comparables import _matriz, comparables, construir_indice_comparables
+from datos import preparar_datos
+from estadisticas import agregar_columnas_precio
+from sintetico import generar_anuncios
+
+
+@pytest.fixture(scope="module")
+def data():
+    return agregar_columnas_precio(preparar_datos(generar_anuncios(1500)))
+
+
+@pytest.fixture(scope="module")
+def indice(data):
+    return construir_indice_comparables(data)
+
+
+def _fuerza_bruta(data, posicion: int, k: int):
+    """Distancias de `posicion` a todas las demás propiedades indexadas de su grupo, una por una."""
+    valido = data["precio_m2"].notna().to_numpy()
+    mismo = (data["inmueble"] == data["inmueble"].iat[posicion]) & (data["operacion"] == data["operacion"].iat[posicion])
+    pos = np.flatnonzero(mismo.to_numpy() & valido)
+    matriz = _matriz(data, pos).astype("float64")
+    propia = matriz[np.searchsorted(pos, posicion)]
+    distancias = np.sqrt(((matriz - propia) ** 2).sum(axis=1))
+    otras = pos != posicion
+    pos, distancias = pos[otras], distancias[otras]
+    orden = np.argsort(distancias, kind="stable")[:k]
+    return pos, distancias, distancias[orden]
+
+
+@pytest.mark.parametrize("k", [1, 10, 50])
+def test_comparables_como_fuerza_bruta(data, indice, k):
+    for posicion in np.random.default_rng(k).choice(indice["pos"], 25, replace=False):
+        vecinos, distancias = comparables(indice, posicion, k)
+        grupo, todas, esperadas = _fuerza_bruta(data, posicion, k)
+
+        assert len(vecinos) == min(k, len(grupo)) and posicion not in vecinos
+        np.testing.assert_allclose(distancias, esperadas, rtol=1e-4, atol=1e-3)
+        # Con empates en el borde el orden puede variar: cada vecino tiene la distancia que dice tener.
+        np.testing.assert_allclose(distancias, todas[np.searchsorted(grupo, vecinos)], rtol=1e-4, atol=1e-3)
+
+
+def test_comparables_del_mismo_grupo(data, indice):
+    inmueble, operacion = data["inmueble"].to_numpy(), data["operacion"].to_numpy()
+    for posicion in indice["pos"][::7]:
+        vecinos, _ = comparables(indice, posicion, 10)
+        assert len(vecinos)
+        assert (inmueble[vecinos] == inmueble[posicion]).all()
+        assert (operacion[vecinos] == operacion[posicion]).all()
+        assert data["precio_m2"].iloc[vecinos].notna().all()
+
+
+def test_comparables_de_propiedad_sin_indexar(data):
+    sin_area = data.copy()
+    sin_area.loc[sin_area.index[0], "precio_m2"] = np.nan
+    indice = construir_indice_comparables(sin_area)
+    assert indice["fila"][0] == -1
+    vecinos, distancias = comparables(indice, 0)
+    assert len(vecinos) == len(distancias) == 0
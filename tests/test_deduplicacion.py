@@ -0,0 +1,54 @@
+## Pruebas - detección de anuncios casi duplicados
+## ===============================================
+
+import numpy as np
+import pandas as pd
+
+from deduplicacion import asignar_clusters
+
+
+def _anuncios(direcciones, precios=None):
+    n = len(direcciones)
+    precios = precios or [1500] * n
+    return pd.DataFrame({
+        "direccion": direcciones, "distrito_oficial": "Miraflores", "operacion": "alquiler",
+        "inmueble": "departamento", "dormitorio": 2, "area": 80.0,
+        "precio_pen": precios, "precio_usd": np.nan,
+    })
+
+
+def test_no_une_por_cadena_dos_departamentos_distintos():
+    df = _anuncios(["Av. Larco 123", "Av. Larco 123 Dpto 5", "Av. Larco 123 Dpto 7"], [1500, 1510, 1550])
+    cluster = asignar_clusters(df).tolist()
+    # El anuncio sin departamento va con su par más parecido; los departamentos 5 y 7 quedan separados.
+    assert cluster == [0, 0, 2]
+
+
+def test_departamentos_distintos_con_re_publicaciones():
+    df = _anuncios(["Av. Larco 123", "AVENIDA LARCO 123, Dpto 5", "Av. Larco 123 Dpto 7", "Avda Larco 123 dpto 7"])
+    cluster = asignar_clusters(df).tolist()
+    assert cluster[1] != cluster[2]
+    assert cluster[2] == cluster[3]
+    assert cluster[0] in (cluster[1], cluster[2])
+
+
+def test_mismo_inmueble_en_ambos_portales():
+    df = _anuncios(["Av. Larco 123 Dpto 5", "AVENIDA LARCO 123, Departamento 5", "Jr. Tacna 450"])
+    assert asignar_clusters(df).tolist() == [0, 0, 2]
+
+
+def test_no_une_por_cadena_dos_numeros_distintos():
+    df = _anuncios(["Calle Los Pinos 120", "Calle Los Pinos", "Calle Los Pinos 340"], [1500, 1510, 1550])
+    cluster = asignar_clusters(df).tolist()
+    assert cluster[0] != cluster[2]
+    assert cluster == [0, 0, 2]
+
+
+def test_sin_numero_ni_departamento_no_junta_edificios_ni_unidades():
+    df = _anuncios(["Calle Los Pinos 120 Dpto 5", "Calle Los Pinos", "Calle Los Pinos Dpto 7", "Calle Los Pinos 340"])
+    cluster = asignar_clusters(df).tolist()
+    numeros = {"120", "340"}
+    for c in set(cluster):
+        miembros = [d for d, k in zip(df["direccion"], cluster) if k == c]
+        assert len({n for n in numeros if any(n in m for m in miembros)}) <= 1
+        assert not (any("Dpto 5" in m for m in miembros) and any("Dpto 7" in m for m in miembros))
@@ -0,0 +1,78 @@
+## Pruebas - cubo de estadísticas de precios
+## =========================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos import preparar_datos
+from estadisticas import (
+    CUANTILES, NIVELES_CUBO, agregar_columnas_precio, construir_cubo_precios, kpis_precios, precio_operacion,
+    resumen_distritos,
+)
+from filtros import excluir_atipicos
+from sintetico import generar_anuncios
+
+
+@pytest.fixture(scope="module")
+def data():
+    return agregar_columnas_precio(preparar_datos(generar_anuncios(4000)))
+
+
+@pytest.fixture(scope="module")
+def cubo(data):
+    return construir_cubo_precios(data)
+
+
+def _directo(df: pd.DataFrame, columnas: list) -> pd.DataFrame:
+    """Las estadísticas del cubo calculadas directamente con groupby sobre `df`."""
+    agrupado = df.assign(precio=precio_operacion(df)).groupby(columnas, observed=True)["precio"]
+    directo = pd.DataFrame({
+        "n": agrupado.count(), "min": agrupado.min(), "max": agrupado.max(), "mean": agrupado.mean(),
+        "median": agrupado.median(),
+        **{nombre: agrupado.quantile(q) for nombre, q in CUANTILES.items() if nombre != "median"},
+    })
+    directo["precio_m2"] = df.groupby(columnas, observed=True)["precio_m2"].mean().round(2)
+    return directo
+
+
+@pytest.mark.parametrize("nivel", list(NIVELES_CUBO))
+def test_cubo_igual_a_groupby(data, cubo, nivel):
+    directo = _directo(data, NIVELES_CUBO[nivel])
+    tabla = cubo[nivel].loc[directo.index]
+    pd.testing.assert_frame_equal(tabla[directo.columns], directo, check_dtype=False, check_names=False)
+
+
+def test_atipicos_y_bigotes_sin_atipicos(data, cubo):
+    precio = precio_operacion(data)
+    claves = ["inmueble", "operacion", "distrito_oficial"]
+    agrupado = precio.groupby([data[c] for c in claves], observed=True)
+    q1, q3 = agrupado.transform("quantile", 0.25), agrupado.transform("quantile", 0.75)
+    atipico = (precio < q1 - 1.5 * (q3 - q1)) | (precio > q3 + 1.5 * (q3 - q1))
+    np.testing.assert_array_equal(data["atipico"].to_numpy(), atipico.to_numpy())
+    assert data["atipico"].any()
+
+    # Los bigotes del box plot son el mínimo y el máximo de los precios sin atípicos.
+    sin_atipicos = excluir_atipicos(data)
+    columnas = NIVELES_CUBO["distrito"]
+    directo = sin_atipicos.assign(precio=precio_operacion(sin_atipicos)).groupby(columnas, observed=True)["precio"].agg(["min", "max"])
+    tabla = cubo["distrito"].loc[directo.index]
+    np.testing.assert_allclose(tabla["bigote_inf"], directo["min"])
+    np.testing.assert_allclose(tabla["bigote_sup"], directo["max"])
+
+
+@pytest.mark.parametrize("sin_atipicos", [False, True])
+def test_resumen_y_kpis_de_un_grupo(data, cubo, sin_atipicos):
+    inmueble, operacion, zona = "departamento", "alquiler", data["distrito_categoria"].iat[0]
+    grupo = data[(data["inmueble"] == inmueble) & (data["operacion"] == operacion)]
+    directo = _directo(grupo[grupo["distrito_categoria"] == zona], ["distrito_oficial"])
+    resumen = resumen_distritos(cubo, inmueble, operacion, zona).loc[directo.index]
+    pd.testing.assert_frame_equal(resumen[directo.columns], directo, check_dtype=False, check_names=False)
+
+    filas = excluir_atipicos(grupo) if sin_atipicos else grupo
+    precios = filas["precio_pen"]
+    kpis = kpis_precios(precios, cubo, inmueble, operacion)
+    assert kpis["n"] == precios.count()
+    assert kpis["median"] == pytest.approx(precios.median())
+    assert kpis["delta_mean"] == pytest.approx(precios.mean() - grupo["precio_pen"].mean())
+    assert kpis["delta_median"] == pytest.approx(precios.median() - grupo["precio_pen"].median())
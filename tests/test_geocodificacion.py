@@ -0,0 +1,90 @@
+## Pruebas - geocodificación por lotes
+## ===================================
+
+import numpy as np
+import pandas as pd
+
+from geocodificacion import STATUS_ENCONTRADO, STATUS_ERROR, geocodificar, leer_cache, ruta_salida
+
+
+class Geocodificador:
+    """Geocodificador de prueba: coordenadas fijas por dirección; registra las consultas."""
+
+    def __init__(self, coordenadas: dict, fallan=()):
+        self.coordenadas = coordenadas
+        self.fallan = set(fallan)
+        self.consultas = []
+
+    def __call__(self, direccion, distrito):
+        self.consultas.append(direccion)
+        if direccion in self.fallan:
+            raise OSError("sin red")
+        return self.coordenadas.get(direccion)
+
+
+def _anuncios():
+    return pd.DataFrame({
+        "direccion": ["Av. Larco 345", "Jr. Tacna 450", "Calle Los Pinos 120"],
+        "distrito_oficial": ["Miraflores", "Lima", "Miraflores"],
+        "status": ["geo", "not_found", "geo"],
+        "lat": [-12.0, np.nan, -12.5],
+        "lon": [-77.0, np.nan, -77.5],
+    })
+
+
+NUEVAS = {"Av. Larco 345": (-12.12, -77.03), "Jr. Tacna 450": (-12.05, -77.04), "Calle Los Pinos 120": (-12.13, -77.02)}
+
+
+def test_solo_faltantes_usa_las_coordenadas_conocidas(tmp_path):
+    geo = Geocodificador(NUEVAS)
+    df, resumen = geocodificar(_anuncios(), geo, tmp_path / "cache.feather", por_segundo=0)
+    assert geo.consultas == ["Jr. Tacna 450"]
+    assert df["lat"].tolist() == [-12.0, -12.05, -12.5]
+    assert resumen["consultadas"] == 1
+
+
+def test_todas_vuelve_a_consultar_las_filas_con_coordenadas(tmp_path):
+    ruta = tmp_path / "cache.feather"
+    # Una primera corrida deja en la caché las coordenadas que ya traían las filas.
+    geocodificar(_anuncios(), Geocodificador(NUEVAS), ruta, por_segundo=0)
+
+    geo = Geocodificador(NUEVAS)
+    df, resumen = geocodificar(_anuncios(), geo, ruta, por_segundo=0, solo_faltantes=False)
+    assert sorted(geo.consultas) == sorted(NUEVAS)
+    assert list(zip(df["lat"], df["lon"])) == list(NUEVAS.values())
+    assert (df["status"] == STATUS_ENCONTRADO).all()
+    assert resumen["consultadas"] == 3
+
+    cache = leer_cache(ruta)
+    assert not cache.index.duplicated().any()
+    assert sorted(cache["lat"]) == sorted(lat for lat, _ in NUEVAS.values())
+
+
+def test_todas_conserva_la_fila_si_la_consulta_falla(tmp_path):
+    geo = Geocodificador(NUEVAS, fallan=["Av. Larco 345", "Jr. Tacna 450"])
+    df, resumen = geocodificar(_anuncios(), geo, tmp_path / "cache.feather", por_segundo=0, solo_faltantes=False)
+    assert resumen["errores"] == 2
+    assert df["status"].tolist() == [STATUS_ENCONTRADO, STATUS_ERROR, STATUS_ENCONTRADO]
+    assert df["lat"].tolist()[0] == -12.0
+    assert df["lat"].tolist()[2] == -12.13
+
+
+def test_la_salida_por_defecto_no_es_el_csv_de_entrada():
+    assert ruta_salida("data/data_alquiler_venta.csv").as_posix() == "data/data_alquiler_venta.geo.csv"
+
+
+def test_resumen_separa_aciertos_de_cache_y_filas_sin_direccion(tmp_path):
+    ruta = tmp_path / "cache.feather"
+    geocodificar(_anuncios(), Geocodificador(NUEVAS), ruta, por_segundo=0)
+
+    df = pd.concat([_anuncios(), pd.DataFrame({
+        "direccion": ["Jr. Tacna 450", None, "Av. Arequipa 1200"], "distrito_oficial": ["Lima", "Lima", "Lince"],
+        "status": ["not_found"] * 3, "lat": np.nan, "lon": np.nan,
+    })], ignore_index=True)
+    geo = Geocodificador({"Av. Arequipa 1200": (-12.08, -77.03)})
+    _, resumen = geocodificar(df, geo, ruta, por_segundo=0)
+    assert geo.consultas == ["Av. Arequipa 1200"]
+    assert resumen["pendientes"] == 4
+    assert resumen["resueltas_cache"] == 2
+    assert resumen["sin_direccion"] == 1
+    assert resumen["consultadas"] == 1
@@ -0,0 +1,51 @@
+## Pruebas - índices de filtrado
+## =============================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos import preparar_datos
+from indices import construir_indice_filtros, construir_rangos, ordenar_posiciones, pagina, subconjunto
+from sintetico import generar_anuncios
+
+
+def _memoria(serie: pd.Series) -> np.ndarray:
+    """Array con los datos de la columna (los códigos, si es categórica)."""
+    return serie.array.codes if isinstance(serie.dtype, pd.CategoricalDtype) else serie.to_numpy()
+
+
+def test_proyeccion_de_columnas_no_copia():
+    data = preparar_datos(generar_anuncios(2000))
+    columnas = ["distrito_oficial", "precio_pen", "area", "dormitorio", "precio_alquiler_agp", "geo_valido", "lat"]
+    proyeccion = data[columnas]
+    for col in columnas:
+        assert np.shares_memory(_memoria(proyeccion[col]), _memoria(data[col])), col
+
+
+def test_subconjunto_solo_con_las_columnas_pedidas():
+    data = preparar_datos(generar_anuncios(2000)).reset_index(drop=True)
+    indice = construir_indice_filtros(data)
+    df = subconjunto(data, indice, "departamento", "alquiler", columnas=["precio_pen", "area"])
+    assert list(df.columns) == ["precio_pen", "area"]
+    assert len(df) == ((data["inmueble"] == "departamento") & (data["operacion"] == "alquiler")).sum()
+    assert (df["precio_pen"].to_numpy() == data["precio_pen"].to_numpy()[df.index]).all()
+
+
+@pytest.mark.parametrize("ascendente", [True, False])
+@pytest.mark.parametrize("columna", ["precio_pen", "dormitorio", "mantenimiento"])
+def test_paginas_como_sort_values(columna, ascendente):
+    data = preparar_datos(generar_anuncios(1000)).reset_index(drop=True)
+    # Muchos empates (dormitorio) y nulos (mantenimiento, y precios borrados a propósito).
+    data.loc[data.index[::7], "precio_pen"] = np.nan
+    rangos = construir_rangos(data)
+    pos = np.random.default_rng(0).permutation(len(data))[:737]
+
+    esperado = data.take(pos).sort_values(columna, ascending=ascendente, kind="stable", na_position="last").index.to_numpy()
+    tamano = 50
+    paginas = [pagina(data, pos, rangos, columna, numero, tamano, ascendente=ascendente).index.to_numpy()
+               for numero in range(1, -(-len(pos) // tamano) + 1)]
+    assert len(paginas[-1]) == len(pos) % tamano
+    np.testing.assert_array_equal(np.concatenate(paginas), esperado)
+    np.testing.assert_array_equal(ordenar_posiciones(pos, rangos, columna, ascendente), esperado)
+    assert pagina(data, pos, rangos, columna, len(paginas) + 1, tamano, ascendente=ascendente).empty
@@ -0,0 +1,87 @@
+## Pruebas - ingesta incremental de scrapes
+## ========================================
+
+import pandas as pd
+import pytest
+
+from ingesta import ARCHIVO_INDICE, ingerir, leer_almacen, leer_indice
+from sintetico import generar_anuncios
+
+
+@pytest.fixture
+def scrape():
+    return generar_anuncios(200, duplicados=0)
+
+
+def _csv(df: pd.DataFrame, ruta) -> str:
+    df.to_csv(ruta, sep="|", index=False, encoding="utf-8")
+    return str(ruta)
+
+
+def _particiones(almacen):
+    return sorted(p.relative_to(almacen).as_posix() for p in almacen.glob("fecha=*/*.feather"))
+
+
+def test_primera_ingesta_y_anuncio_nuevo(tmp_path, scrape):
+    almacen = tmp_path / "almacen"
+    resumen = ingerir(_csv(scrape.iloc[:150], tmp_path / "d1.csv"), almacen, fecha="2025-08-19")
+    assert (resumen["nuevos"], resumen["cambiados"], resumen["bajas"]) == (150, 0, 0)
+
+    resumen = ingerir(_csv(scrape, tmp_path / "d2.csv"), almacen, fecha="2025-08-20")
+    assert (resumen["nuevos"], resumen["cambiados"], resumen["sin_cambios"]) == (50, 0, 150)
+    # La partición del segundo día solo trae los anuncios nuevos.
+    assert _particiones(almacen) == ["fecha=2025-08-19/anuncios.feather", "fecha=2025-08-20/anuncios.feather"]
+    assert len(pd.read_feather(almacen / "fecha=2025-08-20/anuncios.feather")) == 50
+    assert set(leer_almacen(almacen)["enlace"]) <= set(scrape["enlace"])
+
+
+def test_anuncio_cambiado_guarda_su_version_vigente(tmp_path, scrape):
+    almacen = tmp_path / "almacen"
+    ingerir(_csv(scrape, tmp_path / "d1.csv"), almacen, fecha="2025-08-19")
+
+    cambiado = scrape.copy()
+    enlace = cambiado["enlace"].iat[0]
+    cambiado.loc[0, "precio_pen"] = cambiado["precio_pen"].iat[0] + 1000
+    resumen = ingerir(_csv(cambiado, tmp_path / "d2.csv"), almacen, fecha="2025-08-20")
+    assert (resumen["nuevos"], resumen["cambiados"], resumen["sin_cambios"]) == (0, 1, len(scrape) - 1)
+
+    nueva = pd.read_feather(almacen / "fecha=2025-08-20/anuncios.feather")
+    assert nueva["enlace"].tolist() == [enlace]
+    indice = leer_indice(almacen).set_index("clave")
+    assert indice.loc[enlace, "particion"] == "fecha=2025-08-20/anuncios.feather"
+
+    actual = leer_almacen(almacen, columnas=None).set_index("enlace")
+    assert actual.loc[enlace, "precio_pen"] == cambiado["precio_pen"].iat[0]
+    assert actual.index.is_unique
+
+
+def test_anuncio_que_desaparece_se_da_de_baja(tmp_path, scrape):
+    almacen = tmp_path / "almacen"
+    ingerir(_csv(scrape, tmp_path / "d1.csv"), almacen, fecha="2025-08-19")
+    retirados = set(scrape["enlace"].iloc[:10])
+
+    resumen = ingerir(_csv(scrape.iloc[10:], tmp_path / "d2.csv"), almacen, fecha="2025-08-20")
+    assert resumen["bajas"] == 10
+    assert (resumen["nuevos"], resumen["cambiados"]) == (0, 0)
+    indice = leer_indice(almacen).set_index("clave")
+    assert not indice.loc[sorted(retirados), "activo"].any()
+    assert not retirados & set(leer_almacen(almacen)["enlace"])
+
+    # Con una ingesta parcial lo que falta no se da de baja; si vuelve a aparecer, vuelve como nuevo.
+    resumen = ingerir(_csv(scrape.iloc[:5], tmp_path / "d3.csv"), almacen, fecha="2025-08-21", completo=False)
+    assert (resumen["nuevos"], resumen["bajas"]) == (5, 0)
+    assert leer_indice(almacen)["activo"].sum() == len(scrape) - 5
+
+
+def test_reingerir_el_mismo_scrape_no_escribe_nada(tmp_path, scrape):
+    almacen = tmp_path / "almacen"
+    ruta = _csv(scrape, tmp_path / "d1.csv")
+    ingerir(ruta, almacen, fecha="2025-08-19")
+    particiones = _particiones(almacen)
+    estado = (almacen / ARCHIVO_INDICE).stat().st_mtime_ns
+
+    resumen = ingerir(ruta, almacen, fecha="2025-08-20")
+    assert (resumen["nuevos"], resumen["cambiados"], resumen["bajas"]) == (0, 0, 0)
+    assert resumen["sin_cambios"] == len(scrape)
+    assert _particiones(almacen) == particiones
+    assert (almacen / ARCHIVO_INDICE).stat().st_mtime_ns == estado
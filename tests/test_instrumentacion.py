@@ -0,0 +1,38 @@
+## Pruebas - instrumentación de la app
+## ===================================
+
+import tracemalloc
+
+import pytest
+
+import instrumentacion
+
+
+@pytest.fixture
+def etapas_anidadas(monkeypatch, tmp_path):
+    """Instrumentación activa; devuelve la lista de (etapa de afuera, etapa de adentro) que se anidaron."""
+    monkeypatch.setattr(instrumentacion, "_ACTIVA", True)
+    monkeypatch.setattr(instrumentacion, "_RUTA_LOG", str(tmp_path / "perf.jsonl"))
+    abiertas, anidadas = [], []
+    entrar, salir = instrumentacion._Medidor.__enter__, instrumentacion._Medidor.__exit__
+
+    def entrar_registrando(self):
+        if abiertas:
+            anidadas.append((abiertas[-1], self._etapa.nombre))
+        abiertas.append(self._etapa.nombre)
+        return entrar(self)
+
+    def salir_registrando(self, *exc):
+        abiertas.pop()
+        return salir(self, *exc)
+
+    monkeypatch.setattr(instrumentacion._Medidor, "__enter__", entrar_registrando)
+    monkeypatch.setattr(instrumentacion._Medidor, "__exit__", salir_registrando)
+    yield anidadas
+    tracemalloc.stop()
+
+
+def test_etapas_no_se_anidan(app, etapas_anidadas):
+    app.run()
+    assert not app.exception
+    assert not etapas_anidadas
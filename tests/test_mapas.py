@@ -0,0 +1,104 @@
+## Pruebas - mapas de la app
+## =========================
+
+import copy
+
+import folium
+import pytest
+
+from cache_artefactos import CacheArtefactos, clave_artefacto
+from conftest import DISTRITO_GRANDE
+
+
+def _html(m: folium.Map) -> str:
+    # Se renderiza una copia: en folium, renderizar un mapa también lo modifica.
+    return copy.deepcopy(m).get_root().render()
+
+
+def _tipos(m: folium.Map) -> set:
+    return {type(hijo).__name__ for hijo in m._children.values()}
+
+
+@pytest.fixture
+def mapas_cacheados(monkeypatch):
+    """
+    {id: (mapa, HTML al salir de la caché por primera vez, peso con que se guardó)} de cada mapa de
+    Folium que entrega la caché de artefactos.
+    """
+    mapas = {}
+    obtener = CacheArtefactos.obtener
+
+    def obtener_registrando(self, clave, construir, peso):
+        artefacto = obtener(self, clave, construir, peso)
+        if isinstance(artefacto, folium.Map) and id(artefacto) not in mapas:
+            mapas[id(artefacto)] = (artefacto, _html(artefacto), peso(artefacto) if callable(peso) else peso)
+        return artefacto
+
+    monkeypatch.setattr(CacheArtefactos, "obtener", obtener_registrando)
+    return mapas
+
+
+def test_mapa_ventana_no_modifica_el_mapa_base(app, mapas_cacheados):
+    app.run()
+    app.selectbox(key="alquiler_inmueble").set_value("departamento")
+    app.selectbox(key="alquiler_distrito").set_value(DISTRITO_GRANDE).run()
+    assert not app.exception
+    assert any("propiedades del distrito" in c.value for c in app.caption)
+
+    # Otra ejecución con la vista movida: se dibuja otra capa de marcadores sobre el mismo mapa base.
+    clave = "mapa_" + clave_artefacto("ventana", "alquiler", DISTRITO_GRANDE, "departamento")[:16]
+    app.session_state[clave] = {"bounds": {"_southWest": {"lat": -12.13, "lng": -77.04}, "_northEast": {"lat": -12.11, "lng": -77.02}}}
+    app.run()
+    assert not app.exception
+    assert any("en la vista actual" in c.value for c in app.caption)
+
+    # El mapa base de la vista no trae marcadores ni contornos de distritos.
+    bases = [(m, html) for m, html, _ in mapas_cacheados.values() if not _tipos(m) & {"FastMarkerCluster", "GeoJson"}]
+    assert bases
+    for m, html in bases:
+        assert _html(m) == html
+
+
+def test_mapa_distritos_alejado_no_trae_propiedades(app, mapas_cacheados):
+    app.run()
+    filtros = tuple(app.selectbox(key=k).value for k in ("f_inm", "f_ope", "f_zona"))
+    clave = "mapa_distritos_" + clave_artefacto("distritos", *filtros)[:16]
+    lima = {"_southWest": {"lat": -12.4, "lng": -77.2}, "_northEast": {"lat": -11.8, "lng": -76.8}}
+
+    # Acercado se agregan las propiedades de la vista; al alejar, el mapa de la caché no debe traerlas.
+    app.session_state[clave] = {"zoom": 15, "bounds": lima}
+    app.run()
+    assert not app.exception
+    assert any(c.value.startswith("Mostrando") and "en la vista actual" in c.value for c in app.caption)
+    app.session_state[clave] = {"zoom": 11, "bounds": lima}
+    app.run()
+    assert not app.exception
+    assert any(c.value.startswith("Acerque el mapa") for c in app.caption)
+
+    coropletas = [(m, html) for m, html, _ in mapas_cacheados.values() if "GeoJson" in _tipos(m)]
+    assert coropletas
+    for m, html in coropletas:
+        assert "FeatureGroup" not in _tipos(m)
+        assert _html(m) == html
+
+
+def test_mapa_del_distrito_no_crece_en_cada_ejecucion(app, mapas_cacheados):
+    app.run()
+    app.run()
+    assert not app.exception
+    mapas = [(m, html) for m, html, _ in mapas_cacheados.values() if "FastMarkerCluster" in _tipos(m)]
+    assert mapas
+    for m, html in mapas:
+        assert _html(m) == html
+
+
+def test_mapas_cacheados_pesan_su_html(app, mapas_cacheados):
+    app.run()
+    app.selectbox(key="alquiler_inmueble").set_value("departamento")
+    app.selectbox(key="alquiler_distrito").set_value(DISTRITO_GRANDE).run()
+    assert not app.exception
+
+    tipos = set().union(*(_tipos(m) for m, _, _ in mapas_cacheados.values()))
+    assert {"FastMarkerCluster", "GeoJson"} <= tipos
+    for m, html, peso in mapas_cacheados.values():
+        assert peso == len(html.encode("utf-8"))
@@ -0,0 +1,63 @@
+## Pruebas - reportes por distrito precalculados
+## =============================================
+
+import json
+
+import pandas as pd
+import pytest
+
+import reportes
+from datos import ZONAS_LIMA
+from reportes import clave_reporte, generar_reportes, leer_manifiesto, mapa_precalculado, version_reportes
+from sintetico import generar_anuncios
+
+# Las dos combinaciones (operacion, inmueble, distrito) de la data de prueba.
+COMBINACIONES = [("alquiler", "departamento", "Miraflores"), ("venta", "casa", "Surco")]
+
+
+@pytest.fixture
+def conjunto(tmp_path, monkeypatch):
+    """Conjunto con un CSV sintético de dos combinaciones, en una carpeta temporal que es el directorio de trabajo."""
+    monkeypatch.chdir(tmp_path)
+    df = generar_anuncios(60)
+    for i, (operacion, inmueble, distrito) in enumerate(COMBINACIONES):
+        filas = df.index[i::len(COMBINACIONES)]
+        df.loc[filas, ["operacion", "inmueble", "distrito_oficial", "status"]] = [operacion, inmueble, distrito, "geo"]
+        df.loc[filas, "lat"] = df.loc[filas, "lat"].fillna(-12.12)
+        df.loc[filas, "lon"] = df.loc[filas, "lon"].fillna(-77.03)
+    ruta = tmp_path / "anuncios.csv"
+    df.to_csv(ruta, sep="|", index=False, encoding="utf-8")
+    return {"nombre": "Prueba", "ruta": str(ruta), "zonas": ZONAS_LIMA}
+
+
+def test_generar_reportes(conjunto, tmp_path, monkeypatch):
+    salida = tmp_path / "reportes"
+    manifiesto = generar_reportes("prueba", conjunto, salida, procesos=2)
+
+    assert manifiesto == leer_manifiesto("prueba", salida)
+    assert manifiesto["version"] == version_reportes(conjunto)
+    assert set(manifiesto["reportes"]) == {clave_reporte(*c) for c in COMBINACIONES}
+    for operacion, inmueble, distrito in COMBINACIONES:
+        entrada = manifiesto["reportes"][clave_reporte(operacion, inmueble, distrito)]
+        carpeta = salida / "prueba" / entrada["ruta"]
+        assert entrada["filas"] > 0 and entrada["mapa"]
+        assert {p.name for p in carpeta.iterdir()} == {"index.html", "kpis.json", "tabla.csv", "mapa.html"}
+        assert len(pd.read_csv(carpeta / "tabla.csv")) == entrada["filas"]
+        assert json.loads((carpeta / "kpis.json").read_text(encoding="utf-8"))["n"] > 0
+        assert mapa_precalculado(manifiesto, manifiesto["version"], operacion, inmueble, distrito, salida) == carpeta / "mapa.html"
+        assert mapa_precalculado(manifiesto, "otra version", operacion, inmueble, distrito, salida) is None
+    assert (salida / "prueba" / "index.html").exists()
+
+    # Con la misma llave, la segunda corrida no genera nada (y no abre el pool de procesos).
+    def sin_pool(*args, **kwargs):
+        raise AssertionError("no debería volver a generar los reportes")
+
+    monkeypatch.setattr(reportes, "ProcessPoolExecutor", sin_pool)
+    assert generar_reportes("prueba", conjunto, salida, procesos=2) == manifiesto
+
+    # Con otra data, la llave cambia y se vuelven a generar.
+    with open(conjunto["ruta"], "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert version_reportes(conjunto) != manifiesto["version"]
+    with pytest.raises(AssertionError, match="no debería"):
+        generar_reportes("prueba", conjunto, salida, procesos=2)